@@ -0,0 +1,205 @@
+# ai/actor_pool.py
+
+import pickle
+import queue
+import random
+import multiprocessing as mp
+
+from ai.env          import PacmanEnv
+from ai.lookup_table import lookup_cache
+from ai.rl_utils     import make_state, pack_state, action_index
+from ai.q_table      import DenseQTable
+
+
+def play_episode(env, Q, epsilon, lookup, max_steps=1000, record=False,
+                 alpha=None, gamma=None):
+    """
+    Play one ε-greedy episode on a PacmanEnv. Q's values are left alone
+    unless alpha/gamma are given, in which case every step is also learned
+    from on the spot, like the single-process training loops.
+    Returns (transitions, score, steps, done, traj) where transitions is the
+    list of (state id, move, reward, next state id) with packed state ids and
+    DIRECTIONS moves, and traj the per-step
+    snapshots replay.py expects (only when record=True).
+    """
+    pacman_pos, ghosts, food, fruit, ghost_hunter, _ = env.reset()
+    state = pack_state(make_state(pacman_pos, ghosts, food, fruit, ghost_hunter, lookup))
+
+    transitions, traj = [], []
+    done, steps = False, 0
+    while not done and steps < max_steps:
+        action = Q.choose_action(pacman_pos, state, env.graph, epsilon)
+        move   = action_index(pacman_pos, action)
+        (pacman_pos, ghosts, food, fruit,
+         ghost_hunter, _, done, reward) = env.step(action)
+
+        if record:
+            traj.append({
+                "pacman_pos":   pacman_pos,
+                "ghosts":       ghosts.copy(),
+                "food":         food.copy(),
+                "fruit":        fruit,
+                "ghost_hunter": ghost_hunter
+            })
+
+        next_state = pack_state(make_state(pacman_pos, ghosts, food, fruit, ghost_hunter, lookup))
+        transitions.append((state, move, reward, next_state))
+        if alpha is not None:
+            Q.update(state, move, reward, next_state, alpha, gamma)
+        state = next_state
+        steps += 1
+
+    return transitions, env.score, steps, done, traj
+
+
+# ─── Actor processes ──────────────────────────────────────────────────────────
+
+def _actor(worker_id, game_map, schedule, max_steps, record, seed,
+           tasks, results, snapshots):
+    """
+    Worker loop: take episode numbers off `tasks`, play them with the newest
+    Q snapshot, and send each episode's transitions back to the learner.
+    """
+    random.seed(seed + worker_id)   # choose_action and the ghosts use `random`
+    env    = PacmanEnv(game_map)
+    lookup = lookup_cache.get(game_map)
+    eps_start, eps_decay, min_eps = schedule
+
+    Q = DenseQTable()
+    best, worst = None, None   # (score, traj)
+    while True:
+        # Skip to the latest snapshot the learner has published
+        try:
+            while True:
+                Q = pickle.loads(snapshots.get_nowait())
+        except queue.Empty:
+            pass
+
+        ep = tasks.get()
+        if ep is None:
+            break
+
+        # Same ε the serial loop would use for this episode
+        epsilon = max(min_eps, eps_start * eps_decay ** ep)
+        transitions, score, steps, done, traj = \
+            play_episode(env, Q, epsilon, lookup, max_steps, record)
+        results.put(("episode", ep, transitions, score, steps, done, epsilon))
+
+        if record:
+            if best is None or score > best[0]:
+                best = (score, traj)
+            if worst is None or score < worst[0]:
+                worst = (score, traj)
+
+    results.put(("done", best, worst))
+
+
+# ─── Learner ──────────────────────────────────────────────────────────────────
+
+RESULT_TIMEOUT = 1.0   # seconds to wait for a result before checking on the workers
+
+
+def _check_workers(workers):
+    """Raise (and stop the rest) if any worker exited abnormally."""
+    for i, w in enumerate(workers):
+        if w.exitcode not in (None, 0):
+            for other in workers:
+                other.terminate()
+            raise RuntimeError(f"actor {i} exited (exit code {w.exitcode})")
+
+
+def train_parallel(game_map,
+                   num_episodes,
+                   alpha,
+                   gamma,
+                   eps_decay,
+                   min_eps=0.1,
+                   eps_start=1.0,
+                   max_steps=1000,
+                   n_workers=None,
+                   Q=None,
+                   sync_every=None,
+                   record=False,
+                   seed=0,
+                   label="Episode"):
+    """
+    Tabular Q-learning with a pool of actor processes.
+
+    Each worker runs its own PacmanEnv and streams one batch of
+    (state, action, reward, next_state) per episode back here, where this
+    process applies DenseQTable.update to the one real Q. Every `sync_every` episodes
+    (default: one per worker) a pickled snapshot of Q is sent to every worker,
+    which acts with it from its next episode on.
+
+    Q: table to start from (e.g. the phase-1 table), updated in place.
+    Raises RuntimeError if a worker dies before it's done.
+    Returns (Q, returns, best_traj, worst_traj), where returns[ep] is
+    (score, done, steps) and the trajectories are only kept when record=True.
+    """
+    n_workers  = n_workers or mp.cpu_count()
+    sync_every = sync_every or n_workers
+    Q = DenseQTable() if Q is None else Q
+
+    tasks     = mp.Queue()
+    results   = mp.Queue()
+    snapshots = [mp.Queue() for _ in range(n_workers)]
+
+    for ep in range(num_episodes):
+        tasks.put(ep)
+    for _ in range(n_workers):
+        tasks.put(None)
+
+    # Pickle once, up front: Queue.put serialises later, in a background thread,
+    # and Q keeps changing under it (a DenseQTable snapshot is a fixed 160 KB)
+    blob = pickle.dumps(Q)
+    for inbox in snapshots:
+        inbox.put(blob)
+
+    schedule = (eps_start, eps_decay, min_eps)
+    workers = [
+        mp.Process(target=_actor, daemon=True,
+                   args=(i, game_map, schedule, max_steps, record, seed,
+                         tasks, results, snapshots[i]))
+        for i in range(n_workers)
+    ]
+    for w in workers:
+        w.start()
+
+    returns  = [None] * num_episodes
+    best     = worst = None
+    finished = applied = 0
+    while finished < n_workers:
+        _check_workers(workers)
+        try:
+            msg = results.get(timeout=RESULT_TIMEOUT)
+        except queue.Empty:
+            continue
+        if msg[0] == "done":
+            finished += 1
+            _, w_best, w_worst = msg
+            if w_best is not None and (best is None or w_best[0] > best[0]):
+                best = w_best
+            if w_worst is not None and (worst is None or w_worst[0] < worst[0]):
+                worst = w_worst
+            continue
+
+        _, ep, transitions, score, steps, done, epsilon = msg
+        for state, move, reward, next_state in transitions:
+            Q.update(state, move, reward, next_state, alpha, gamma)
+        returns[ep] = (score, done, steps)
+        print(f"{label} {ep:4d} | Score {int(score):4d} | Steps {steps:4d} | ε={epsilon:.3f}")
+
+        applied += 1
+        if applied % sync_every == 0 and applied < num_episodes:
+            blob = pickle.dumps(Q)
+            for inbox in snapshots:
+                inbox.put(blob)
+
+    for w in workers:
+        w.join()
+    for inbox in snapshots:
+        inbox.cancel_join_thread()   # a late snapshot may never have been read
+
+    return (Q, returns,
+            best[1] if best else None,
+            worst[1] if worst else None)
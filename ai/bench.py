@@ -0,0 +1,352 @@
+# ai/bench.py
+#
+# Headless simulation benchmark: plays N episodes with one policy as fast as
+# the code allows (no pygame, no clock.tick) and reports throughput.
+#
+#   python -m ai.bench --policy rules   --episodes 20
+#   python -m ai.bench --policy tabular --q-table data/q_table.npy --learn
+#   python -m ai.bench --policy dqn     --model checkpoints/dqn_final.pt --json bench.json
+#   python -m ai.bench --policy random  --map level2 --json -
+#
+# Reported: steps/sec, time per phase (ghost moves, search, state encoding,
+# policy, learning, rest of the env step) and p50 / p99 per-step latency.
+# --json writes the same numbers as a JSON document for tracking regressions.
+# With PACMAN_PROFILE=1 the run also collects the ai.profiling timers and
+# counters (added to the report) and writes a Chrome trace per episode.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import importlib
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+import ai.ghosts as gh_module
+from ai.env          import PacmanEnv
+from ai.lookup_table import lookup_cache
+from ai              import profiling
+
+POLICIES = ("rules", "tabular", "dqn", "random")
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time per phase. wrap() swaps a module attribute for a
+    timed version (e.g. the ghost mover) for the length of a `with` block.
+    """
+    def __init__(self):
+        self.totals = defaultdict(float)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - t0
+
+    @contextlib.contextmanager
+    def wrap(self, module, attr, name):
+        original = getattr(module, attr)
+        totals   = self.totals
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                totals[name] += time.perf_counter() - t0
+
+        setattr(module, attr, timed)
+        try:
+            yield
+        finally:
+            setattr(module, attr, original)
+
+
+# ─── Policies ─────────────────────────────────────────────────────────────────
+# Each runner plays one episode and returns (score, steps, per-step seconds).
+# Time spent inside wrapped functions (ghost moves) is taken back out of the
+# enclosing phase, so the phases add up to the step latency.
+
+def _env_step(env, action, timer):
+    """env.step, booking the ghost move separately from the rest."""
+    ghosts_before = timer.totals["ghosts"]
+    t0 = time.perf_counter()
+    out = env.step(action)
+    timer.totals["env"] += time.perf_counter() - t0 - (timer.totals["ghosts"] - ghosts_before)
+    return out
+
+
+def run_random(env, ctx, timer, max_steps):
+    env.reset()
+    latencies, done, steps = [], False, 0
+    while not done and steps < max_steps:
+        profiling.tick()
+        t0 = time.perf_counter()
+        with timer.phase("policy"):
+            action = random.choice(env.graph[env.pacman_pos])
+        done = _env_step(env, action, timer)[6]
+        latencies.append(time.perf_counter() - t0)
+        steps += 1
+    return env.score, steps, latencies
+
+
+def run_tabular(env, ctx, timer, max_steps):
+    from ai.rl_utils import make_state, action_index
+    Q, lookup, learn = ctx["Q"], ctx["lookup"], ctx["learn"]
+    alpha, gamma, epsilon = ctx["alpha"], ctx["gamma"], ctx["epsilon"]
+
+    pacman_pos, ghosts, food, fruit, hunter, _ = env.reset()
+    with timer.phase("encode"):
+        state = make_state(pacman_pos, ghosts, food, fruit, hunter, lookup)
+
+    latencies, done, steps = [], False, 0
+    while not done and steps < max_steps:
+        profiling.tick()
+        t0 = time.perf_counter()
+        with timer.phase("policy"):
+            action = Q.choose_action(pacman_pos, state, env.graph, epsilon)
+            move   = action_index(pacman_pos, action)
+        (pacman_pos, ghosts, food, fruit,
+         hunter, _, done, reward) = _env_step(env, action, timer)
+        with timer.phase("encode"):
+            next_state = make_state(pacman_pos, ghosts, food, fruit, hunter, lookup)
+        if learn:
+            with timer.phase("learn"):
+                Q.update(state, move, reward, next_state, alpha, gamma)
+        state = next_state
+        latencies.append(time.perf_counter() - t0)
+        steps += 1
+    return env.score, steps, latencies
+
+
+def run_dqn(env, ctx, timer, max_steps):
+    import torch
+    from ai.vec_env       import ACTIONS
+    from ai.state_encoder import THREAT
+    agent, encoder, learn, device = ctx["agent"], ctx["encoder"], ctx["learn"], ctx["device"]
+
+    pacman_pos, ghosts, food, fruit, hunter, _ = env.reset()
+    with timer.phase("encode"):
+        state = encoder.reset(pacman_pos, ghosts, food, fruit)
+
+    latencies, done, steps = [], False, 0
+    while not done and steps < max_steps:
+        profiling.tick()
+        t0 = time.perf_counter()
+        with timer.phase("policy"):
+            neighbours = env.graph[pacman_pos]
+            valid = torch.tensor([(pacman_pos[0] + dr, pacman_pos[1] + dc) in neighbours
+                                  for dr, dc in ACTIONS], dtype=torch.bool, device=device)
+            threat = bool(state[0, THREAT, pacman_pos[0], pacman_pos[1]])
+            with torch.no_grad():
+                q_col, q_esc = agent.online(state)
+            a = agent.select_action(q_col, q_esc, valid, hunter, threat)
+            action = (pacman_pos[0] + ACTIONS[a][0], pacman_pos[1] + ACTIONS[a][1])
+            head = int(threat and not hunter)
+        (pacman_pos, ghosts, food, fruit,
+         hunter, _, done, reward) = _env_step(env, action, timer)
+        with timer.phase("encode"):
+            next_state = encoder.encode(pacman_pos, ghosts, food, fruit)
+        if learn:
+            with timer.phase("learn"):
+                next_threat = bool(next_state[0, THREAT, pacman_pos[0], pacman_pos[1]])
+                agent.buffer.push(state, a, reward, next_state, done,
+                                  head, int(next_threat and not hunter))
+                agent.optimise_model()
+        state = next_state
+        latencies.append(time.perf_counter() - t0)
+        steps += 1
+    if learn and not done:
+        agent.buffer.flush()
+    return env.score, steps, latencies
+
+
+def run_rules(env, ctx, timer, max_steps):
+    """The rule-based agent from game_logic (module-global state, so reset first)."""
+    import game.game_logic as logic
+    from game.score_tracker import get_score
+    from ai.path_manager    import get_initial_path
+
+    logic.reset_game(env.game_map)
+    _, pacman_pos, ghosts, food, fruit, graph = get_initial_path(env.game_map)
+
+    latencies, steps = [], 0
+    while steps < max_steps:
+        profiling.tick()
+        ghosts_before = timer.totals["ghosts"]
+        t0 = time.perf_counter()
+        pacman_pos, ghosts, food, fruit, hunter = \
+            logic.update_game(graph, pacman_pos, ghosts, food, fruit)
+        dt = time.perf_counter() - t0
+        timer.totals["search"] += dt - (timer.totals["ghosts"] - ghosts_before)
+        latencies.append(dt)
+        steps += 1
+
+        # Same termination checks as main.py
+        if not food or (pacman_pos in ghosts and not hunter):
+            break
+    return get_score(), steps, latencies
+
+
+@contextlib.contextmanager
+def ghost_lineup(game_map):
+    """
+    ai.ghosts places its ghosts on level1 (Blinky in the top-right corner).
+    Move their start tiles to the same corner of game_map for the duration,
+    so PacmanEnv copies and update_game both start somewhere walkable.
+    """
+    starts = [g.start_pos for g in gh_module.ghosts]
+    for g in gh_module.ghosts:
+        g.start_pos = (1, len(game_map[1]) - 2)
+        g.respawn()
+    try:
+        yield
+    finally:
+        for g, start in zip(gh_module.ghosts, starts):
+            g.start_pos = start
+            g.respawn()
+
+
+RUNNERS = {"random": run_random, "tabular": run_tabular, "dqn": run_dqn, "rules": run_rules}
+
+
+def build_context(args, game_map):
+    """Whatever the chosen policy needs: Q-table, DQN agent + encoder, etc."""
+    ctx = {"learn": args.learn}
+    if args.policy == "tabular":
+        from ai.q_table import DenseQTable
+        have_table = args.q_table and os.path.exists(args.q_table)
+        ctx.update(Q=DenseQTable.load(args.q_table) if have_table else DenseQTable(),
+                   lookup=lookup_cache.get(game_map),
+                   alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon)
+    elif args.policy == "dqn":
+        import torch
+        from ai.dqn.agent     import DQNAgent
+        from ai.state_encoder import StateEncoder
+        agent = DQNAgent(seed=args.seed, arch=args.arch,
+                         board=(len(game_map), len(game_map[0])))
+        if args.model:
+            agent.online.load_state_dict(torch.load(args.model, map_location=agent.device))
+        agent.epsilon = args.epsilon
+        ctx.update(agent=agent, device=agent.device,
+                   encoder=StateEncoder(game_map, agent.device))
+    return ctx
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+def summarise(args, scores, steps, latencies, phases, wall):
+    lat_us = np.asarray(latencies) * 1e6
+    total_steps = int(sum(steps))
+    return {
+        "policy":        args.policy,
+        "map":           args.map,
+        "episodes":      len(scores),
+        "steps":         total_steps,
+        "wall_s":        round(wall, 4),
+        "steps_per_sec": round(total_steps / wall, 1) if wall > 0 else None,
+        "latency_us": {
+            "mean": round(float(lat_us.mean()), 2),
+            "p50":  round(float(np.percentile(lat_us, 50)), 2),
+            "p99":  round(float(np.percentile(lat_us, 99)), 2),
+            "max":  round(float(lat_us.max()), 2),
+        },
+        "phases_s":      {k: round(v, 4) for k, v in sorted(phases.items()) if v > 0},
+        "score": {
+            "mean": round(float(np.mean(scores)), 2),
+            "min":  float(np.min(scores)),
+            "max":  float(np.max(scores)),
+        },
+        "learn":         args.learn,
+        "seed":          args.seed,
+        "python":        platform.python_version(),
+        "numpy":         np.__version__,
+        "pygame_loaded": "pygame" in sys.modules,
+        "timestamp":     time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "profile":       profiling.report() if profiling.ENABLED else None,
+    }
+
+
+def print_report(r):
+    print(f"{r['policy']} on {r['map']}: {r['episodes']} episodes, {r['steps']} steps "
+          f"in {r['wall_s']:.2f}s  →  {r['steps_per_sec']:,.0f} steps/s")
+    lat = r["latency_us"]
+    print(f"  per-step latency  p50 {lat['p50']:.1f}us  p99 {lat['p99']:.1f}us  "
+          f"max {lat['max']:.1f}us")
+    busy = sum(r["phases_s"].values()) or 1.0
+    for name, secs in sorted(r["phases_s"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:8s} {secs:8.3f}s  {100 * secs / busy:5.1f}%")
+    print(f"  score mean {r['score']['mean']:.1f} (min {r['score']['min']:.0f}, "
+          f"max {r['score']['max']:.0f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Pac-Man throughput benchmark")
+    parser.add_argument("--policy",    choices=POLICIES, default="rules")
+    parser.add_argument("--episodes",  type=int, default=20)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--map",       default="level1", help="module under maps/")
+    parser.add_argument("--seed",      type=int, default=0)
+    parser.add_argument("--learn",     action="store_true",
+                        help="tabular/dqn: also run the learning updates")
+    parser.add_argument("--q-table",   default="data/q_table.npy")
+    parser.add_argument("--model",     default=None, help="DQN state_dict checkpoint")
+    parser.add_argument("--arch",      default="classic", help="DQN architecture the checkpoint uses")
+    parser.add_argument("--epsilon",   type=float, default=0.0)
+    parser.add_argument("--alpha",     type=float, default=0.1)
+    parser.add_argument("--gamma",     type=float, default=0.9)
+    parser.add_argument("--json",      default=None, help="write results here ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    game_map = importlib.import_module(f"maps.{args.map}").game_map
+    ctx   = build_context(args, game_map)
+    timer = PhaseTimer()
+    run   = RUNNERS[args.policy]
+
+    # The rule-based agent prints every frame; keep that out of the timings' way
+    # (and out of memory: a long run prints far too much to buffer)
+    quiet = contextlib.ExitStack()
+    if args.policy == "rules":
+        quiet.enter_context(contextlib.redirect_stdout(quiet.enter_context(open(os.devnull, "w"))))
+
+    import game.game_logic as logic
+    scores, steps, latencies = [], [], []
+    t0 = time.perf_counter()
+    with ghost_lineup(game_map), \
+         timer.wrap(gh_module, "move_ghosts", "ghosts"), \
+         timer.wrap(logic, "update_ghosts", "ghosts"), quiet:
+        env = PacmanEnv(game_map)
+        for ep in range(args.episodes):
+            score, n, lat = run(env, ctx, timer, args.max_steps)
+            profiling.end_episode(ep)
+            scores.append(score)
+            steps.append(n)
+            latencies.extend(lat)
+    wall = time.perf_counter() - t0
+
+    report = summarise(args, scores, steps, latencies, timer.totals, wall)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return report
+
+    print_report(report)
+    profiling.print_report()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# ai/danger.py
+
+import numpy as np
+
+from ai.search     import is_threat_clear
+from ai.maze_index import get_maze_index
+from ai import profiling
+
+NO_GHOST = np.iinfo(np.int16).max   # "distance" of tiles no ghost can reach
+
+# compute_ghost_penalty's cost for a tile 0..3 steps from a ghost
+PENALTY_BY_DISTANCE = [100, 50, 20, 10]
+
+
+def ghost_penalty(maze, ghost_positions, game_map=None):
+    """
+    compute_ghost_penalty for every tile of the maze, as a list by node id.
+    Ghosts off the maze are ignored.
+    """
+    penalty = [0] * len(maze.nodes)
+    for ghost in ghost_positions:
+        g = maze.index.get(ghost)
+        if g is not None:
+            for v, points in _ghost_scores(maze, g, game_map):
+                penalty[v] += points
+    return penalty
+
+
+# (maze, game_map, ghost node id) -> what a ghost there adds to each tile it
+# threatens; keyed on ids, so each entry also keeps the objects to check against
+_scores = {}
+
+def _ghost_scores(maze, g, game_map):
+    """
+    [(v, points), ...] for the tiles a ghost on node g scores against. Only
+    tiles within 3 steps can score (heuristic() falls back to Manhattan for
+    tiles the ghost can't reach), so the line-of-sight check runs on just
+    those, once per ghost tile and map.
+    """
+    key = (id(maze), id(game_map), g)
+    hit = _scores.get(key)
+    if hit is not None and hit[0] is maze and hit[1] is game_map:
+        return hit[2]
+
+    ghost = maze.nodes[g]
+    row   = maze.dist[g]
+    dist  = np.where(row >= 0, row, np.abs(maze.rows - ghost[0]) + np.abs(maze.cols - ghost[1]))
+    near  = np.flatnonzero(dist < len(PENALTY_BY_DISTANCE))
+    scores = [(v, PENALTY_BY_DISTANCE[d]) for v, d in zip(near.tolist(), dist[near].tolist())
+              if game_map is None or is_threat_clear(maze.nodes[v], ghost, game_map)]
+    _scores[key] = (maze, game_map, scores)
+    return scores
+
+
+class DangerField:
+    """
+    How dangerous every tile is this tick, worked out once from the ghost
+    positions and then shared by everything that asks (escape_path,
+    smarter_a_star, risk_aware_bfs, calculate_priorities, the DQN threat plane).
+
+    All arrays are indexed by MazeIndex node id:
+      - ghost_dist : (G, V) maze distance from each ghost (-1 = unreachable)
+      - nearest    : (V,)   distance to the closest ghost (NO_GHOST if none);
+                            the min over ghost rows *is* the multi-source BFS
+      - proximity  : (V,)   sum of max(0, 5 - path_len) over ghosts (risk_aware_bfs)
+      - penalty    : (V,)   compute_ghost_penalty for every tile (smarter_a_star)
+
+    Ghost positions that aren't open tiles of this maze are ignored.
+    """
+    @profiling.timed("danger.field")
+    def __init__(self, maze, ghost_positions, game_map=None):
+        self.maze            = maze
+        self.ghost_positions = [g for g in ghost_positions if g in maze.index]
+        V = len(maze.nodes)
+
+        ids = [maze.index[g] for g in self.ghost_positions]
+        self.ghost_dist = maze.dist[ids].astype(np.int32).reshape(len(ids), V)
+
+        reachable = np.where(self.ghost_dist >= 0, self.ghost_dist, NO_GHOST)
+        self.nearest = reachable.min(axis=0) if ids else np.full(V, NO_GHOST, dtype=np.int32)
+
+        # Path lengths counted like len(a_star(...)): tiles incl. both ends, 0 if unreachable
+        self.ghost_path_len = self.ghost_dist + 1
+        self.proximity = np.maximum(0, 5 - self.ghost_path_len).sum(axis=0)
+
+        self.penalty = np.array(ghost_penalty(maze, self.ghost_positions, game_map), dtype=np.int32)
+
+    @classmethod
+    def for_graph(cls, graph, ghost_positions, game_map=None):
+        return cls(get_maze_index(graph), ghost_positions, game_map)
+
+    def threat_mask(self, radius=3):
+        """(V,) bool: tiles within `radius` steps of some ghost."""
+        return self.nearest <= radius
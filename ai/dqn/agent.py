@@ -5,9 +5,28 @@ import torch
 import torch.optim as optim
 import numpy as np
 
-from ai.dqn.model import DQNCNN
-from ai.dqn.replay_buffer import ReplayBuffer
+from ai.dqn.model import build_model
+from ai.dqn.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 from ai.dqn.utils import get_device, sync_target_network, huber_loss
+from ai import profiling
+
+def masked_epsilon_greedy(q_collect, q_escape, valid_mask, power_mode, threat, epsilon):
+    """
+    Batched epsilon-greedy over the chosen head (escape if in threat & not powered).
+    q_collect, q_escape: (N, n_actions)
+    valid_mask:          (N, n_actions) bool
+    power_mode, threat:  (N,) bool
+    epsilon:             float or (N,) tensor
+    Returns an (N,) long tensor on the same device as the Q-values.
+    """
+    escape = threat & ~power_mode
+    q = torch.where(escape.unsqueeze(1), q_escape, q_collect)
+    greedy = q.masked_fill(~valid_mask, -1e9).argmax(dim=1)
+
+    # A uniformly random valid move: argmax of random scores over the legal ones
+    noise = torch.rand(q.shape, device=q.device).masked_fill(~valid_mask, -1.0)
+    explore = torch.rand(len(q), device=q.device) < epsilon
+    return torch.where(explore, noise.argmax(dim=1), greedy)
 
 class DQNAgent:
     """
@@ -22,27 +41,42 @@ class DQNAgent:
                  batch_size: int = 32,
                  buffer_size: int = 50_000,
                  target_update_freq: int = 1_000,
+                 prioritized: bool = False,
+                 per_alpha: float = 0.6,
+                 per_beta: float = 0.4,
+                 n_step: int = 1,
+                 double: bool = False,
+                 arch: str = "classic",
+                 board: tuple = (15, 15),
                  seed: int = 42):
         random.seed(seed)
         np.random.seed(seed)
         torch.manual_seed(seed)
 
         self.device = get_device()
-        # Networks
-        self.online = DQNCNN(in_channels, n_actions).to(self.device)
-        self.target = DQNCNN(in_channels, n_actions).to(self.device)
+        # Networks (arch: see ai/dqn/model.py:ARCHITECTURES; board = map's H, W)
+        self.arch = arch
+        self.online = build_model(arch, in_channels, n_actions, *board).to(self.device)
+        self.target = build_model(arch, in_channels, n_actions, *board).to(self.device)
         sync_target_network(self.online, self.target)
 
         # Optimiser
         self.optimizer = optim.Adam(self.online.parameters(), lr=lr)
 
-        # Replay buffer
-        self.buffer = ReplayBuffer(capacity=buffer_size)
+        # Replay buffer (prioritized replays rare big-reward events more often),
+        # which also turns pushed steps into n-step transitions
+        self.prioritized = prioritized
+        if prioritized:
+            self.buffer = PrioritizedReplayBuffer(capacity=buffer_size, n_step=n_step, gamma=gamma,
+                                                  alpha=per_alpha, beta=per_beta)
+        else:
+            self.buffer = ReplayBuffer(capacity=buffer_size, n_step=n_step, gamma=gamma)
 
         # Hyperparams
         self.gamma = gamma
         self.batch_size = batch_size
         self.target_update_freq = target_update_freq
+        self.double = double   # Double DQN: online net picks the next action, target net scores it
 
         self.steps_done = 0
         self.epsilon = 1.0  # will be decayed externally
@@ -74,37 +108,83 @@ class DQNAgent:
         else:
             return int(q.argmax(dim=1).item())
 
+    def select_actions(self,
+                       q_collect: torch.Tensor,
+                       q_escape:  torch.Tensor,
+                       valid_mask: torch.Tensor,
+                       power_mode: torch.Tensor,
+                       threat: torch.Tensor,
+                       epsilon=None) -> torch.Tensor:
+        """
+        select_action for a whole batch, without leaving the device
+        (see masked_epsilon_greedy; epsilon defaults to self.epsilon).
+        Returns an (N,) long tensor of action indices.
+        """
+        eps = self.epsilon if epsilon is None else epsilon
+        return masked_epsilon_greedy(q_collect, q_escape, valid_mask, power_mode, threat, eps)
+
+    @profiling.timed("dqn.act_batch")
+    def act_batch(self, states, valid_mask, power_mode, threat, epsilon=None) -> np.ndarray:
+        """
+        One forward pass for N observations and one device sync for the
+        answer. Arguments as in select_actions, but may be NumPy arrays;
+        states is (N, C, H, W). Returns an (N,) int64 array.
+        """
+        dev = self.device
+        with torch.inference_mode():
+            states = torch.as_tensor(states).to(dev, torch.float32, non_blocking=True)
+            valid  = torch.as_tensor(valid_mask).to(dev, non_blocking=True)
+            power  = torch.as_tensor(power_mode).to(dev, non_blocking=True)
+            threat = torch.as_tensor(threat).to(dev, non_blocking=True)
+            if epsilon is not None and not np.isscalar(epsilon):
+                epsilon = torch.as_tensor(epsilon).to(dev)
+            q_col, q_esc = self.online(states)
+            actions = self.select_actions(q_col, q_esc, valid, power, threat, epsilon)
+            return actions.cpu().numpy()
+
+    @profiling.timed("dqn.optimise_model")
     def optimise_model(self):
         """
-        Sample a batch, compute DQN loss with Huber, backpropagate,
-        and occasionally sync the target net.
+        Sample a batch, compute the n-step (Double) DQN loss with Huber,
+        backpropagate, and occasionally sync the target net.
+
+        Each transition is scored on the head that acted in its state, and
+        bootstraps from the head that would act in its n-step successor:
+          target = R + γ^k · (1 - done) · Q_target,h'(s', a*)
+          a*     = argmax_a Q_online,h'(s', a)  (Double DQN; Q_target,h' otherwise)
+        with R, γ^k, h, h' as stored by the replay buffer. Everything is
+        batched tensor ops, no per-sample branching.
         """
         if len(self.buffer) < self.batch_size:
             return None
 
-        states, actions, rewards, next_states, dones = \
-            self.buffer.sample(self.batch_size)
-        states      = states.to(self.device)
-        actions     = actions.to(self.device)
-        rewards     = rewards.to(self.device)
-        next_states = next_states.to(self.device)
-        dones       = dones.to(self.device)
+        weights, indices = None, None
+        batch = self.buffer.sample(self.batch_size)
+        if self.prioritized:
+            weights, indices = batch[-2:]
+            weights = weights.to(self.device)
+        (states, actions, rewards, next_states,
+         dones, heads, next_heads, discounts) = (t.to(self.device, non_blocking=True) for t in batch[:8])
 
-        # Compute current Q-values
+        # Current Q of the action taken, on the head that took it
         q_col, q_esc = self.online(states)
-        # We only used the chosen head's Q for the action taken
-        q_pred = torch.where(dones.unsqueeze(1)==1,
-                             torch.zeros_like(q_col),
-                             q_col).gather(1, actions.unsqueeze(1)).squeeze(1)
-        # Next-state max Q from target net (we pick max over collect head)
-        with torch.no_grad():
-            next_q_col, next_q_esc = self.target(next_states)
-            # We take max over next_q_col if not in threat, but for simplicity we use collect head
-            q_next = next_q_col.max(1)[0]
-            target = rewards + self.gamma * (1.0 - dones) * q_next
+        q = torch.where(heads.unsqueeze(1) == 1, q_esc, q_col)
+        q_pred = q.gather(1, actions.unsqueeze(1)).squeeze(1)
 
-        # Huber loss
-        loss = huber_loss(q_pred, target)
+        with torch.no_grad():
+            next_col, next_esc = self.target(next_states)
+            escape = next_heads.unsqueeze(1) == 1
+            q_next_all = torch.where(escape, next_esc, next_col)
+            if self.double:
+                on_col, on_esc = self.online(next_states)
+                best = torch.where(escape, on_esc, on_col).argmax(dim=1, keepdim=True)
+            else:
+                best = q_next_all.argmax(dim=1, keepdim=True)
+            q_next = q_next_all.gather(1, best).squeeze(1)
+            target = rewards + discounts * (1.0 - dones) * q_next
+
+        # Huber loss (importance-weighted under prioritized replay)
+        loss = huber_loss(q_pred, target, weights=weights)
 
         self.optimizer.zero_grad()
         loss.backward()
@@ -112,6 +192,11 @@ class DQNAgent:
         torch.nn.utils.clip_grad_norm_(self.online.parameters(), 1.0)
         self.optimizer.step()
 
+        # Re-prioritise the sampled transitions by their new TD errors
+        if self.prioritized:
+            td_errors = (q_pred - target).detach().cpu().numpy()
+            self.buffer.update_priorities(indices, td_errors)
+
         # Update target network?
         self.steps_done += 1
         if self.steps_done % self.target_update_freq == 0:
@@ -0,0 +1,194 @@
+# ai/dqn/apex.py
+#
+# Ape-X style training on one machine: actor processes play and fill a
+# shared replay buffer, the learner (this process) trains from it
+# non-stop and publishes its weights back to the actors every K updates.
+
+import os
+import copy
+import time
+import queue
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from ai.dqn.agent import masked_epsilon_greedy
+from ai.dqn.replay_buffer import SharedReplayBuffer
+from ai.dqn.inference import pacman_threat
+from ai.state_encoder import StateEncoder, N_PLANES
+from ai.vec_env import VecPacmanEnv
+from ai import profiling
+
+
+def actor_epsilons(n_actors, base=0.4, alpha=7.0):
+    """Ape-X exploration ladder: actor i explores with base ** (1 + alpha * i / (n - 1))."""
+    if n_actors == 1:
+        return [base]
+    return [base ** (1 + alpha * i / (n_actors - 1)) for i in range(n_actors)]
+
+
+class WeightStore:
+    """
+    The learner's latest weights in shared memory, plus a version number
+    that actors poll to know when there's something new to copy.
+    """
+    def __init__(self, net, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.net     = copy.deepcopy(net).cpu().share_memory()
+        self.version = ctx.Value("l", 0, lock=False)
+        self.lock    = ctx.Lock()
+
+    def publish(self, net):
+        with self.lock, torch.no_grad():
+            for dst, src in zip(self.net.state_dict().values(), net.state_dict().values()):
+                dst.copy_(src)
+            self.version.value += 1
+
+    def pull(self, net, seen=-1):
+        """Copy the weights into net if they're newer than version `seen`; returns the version net holds."""
+        if self.version.value == seen:
+            return seen
+        with self.lock:
+            net.load_state_dict(self.net.state_dict())
+            return self.version.value
+
+
+def run_actor(actor_id, game_map, replay, weights, epsilon, results, stop,
+              n_envs=16, max_steps=1000, clear_bonus=0, seed=0):
+    """
+    Actor process: plays n_envs games on a VecPacmanEnv with a private CPU
+    copy of the network, picking all n_envs moves with one forward pass,
+    and pushes every step's transitions into the shared replay buffer.
+    Finished games are reported on `results` as (actor_id, return, steps).
+    """
+    torch.set_num_threads(1)
+    torch.manual_seed(seed)
+    env     = VecPacmanEnv(game_map, n_envs, seed=seed)
+    encoder = StateEncoder(game_map)
+    net     = copy.deepcopy(weights.net)
+    version = weights.pull(net)
+
+    obs     = encoder.encode_batch(env).copy()
+    slots   = np.full(n_envs, -1, dtype=np.int64)    # replay frame holding each game's obs
+    returns = np.zeros(n_envs, dtype=np.float32)
+
+    while not stop.is_set():
+        version = weights.pull(net, version)
+        threat = pacman_threat(obs, encoder.cell[env.pacman])
+        heads  = threat & ~env.hunter
+        with torch.inference_mode():
+            q_col, q_esc = net(torch.from_numpy(obs))
+            actions = masked_epsilon_greedy(q_col, q_esc,
+                                            torch.from_numpy(env.valid_actions()),
+                                            torch.from_numpy(env.hunter),
+                                            torch.from_numpy(threat), epsilon).numpy()
+
+        rewards, dones = env.step(actions)
+        rewards[dones & ~env.pellets.any(axis=1)] += clear_bonus
+        returns += rewards
+        next_obs = encoder.encode_batch(env)
+        next_heads = pacman_threat(next_obs, encoder.cell[env.pacman]) & ~env.hunter
+        slots = replay.push_batch(obs, actions, rewards, next_obs, dones, slots, heads, next_heads)
+
+        finished = np.flatnonzero(dones | (env.steps >= max_steps))
+        if len(finished):
+            replay.flush(finished[~dones[finished]])   # out of steps, not over
+            for i in finished:
+                results.put((actor_id, float(returns[i]), int(env.steps[i])))
+            env.reset(finished)
+            returns[finished] = 0.0
+            slots[finished]   = -1
+            next_obs = encoder.encode_batch(env)
+        obs[:] = next_obs
+
+
+def train_apex(agent, game_map, n_actors=4, envs_per_actor=16, publish_every=100,
+               num_episodes=500, max_steps=1000, clear_bonus=0, learn_start=1000,
+               ckpt_dir=None, seed=0):
+    """
+    Train agent (non-prioritized) with n_actors actor processes until they
+    have finished num_episodes games between them.
+
+    The agent's buffer is swapped for a SharedReplayBuffer of the same
+    capacity and n-step horizon; actors build their n-step returns locally.
+    The learner runs optimise_model back to back once the buffer holds
+    learn_start transitions, so it's never waiting on an environment step,
+    and copies its weights to the actors every publish_every updates.
+    Returns a dict of throughput stats; raises ValueError for a prioritized agent.
+    """
+    if agent.prioritized:
+        raise ValueError("train_apex needs a uniform-replay agent (prioritized=False): "
+                         "the shared buffer has no priorities")
+    ctx = mp.get_context("spawn")   # no forking a process that already runs torch threads
+    H, W = len(game_map), len(game_map[0])
+    replay = SharedReplayBuffer(agent.buffer.capacity, (N_PLANES, H, W),
+                                agent.buffer.n_step, agent.buffer.gamma,
+                                streams=n_actors * envs_per_actor, ctx=ctx)
+    agent.buffer = replay
+    weights = WeightStore(agent.online, ctx)
+    results = ctx.Queue()
+    stop    = ctx.Event()
+
+    actors = []
+    for i, eps in enumerate(actor_epsilons(n_actors)):
+        proc = ctx.Process(target=run_actor, daemon=True,
+                           args=(i, game_map, replay, weights, eps, results, stop,
+                                 envs_per_actor, max_steps, clear_bonus, seed * 1000 + i + 1))
+        proc.start()
+        actors.append(proc)
+        print(f"Actor {i} | ε {eps:.4f} | {envs_per_actor} games")
+
+    t0 = time.perf_counter()
+    episodes, updates, learn_t0 = 0, 0, None
+    try:
+        while episodes < num_episodes:
+            # Log whatever games finished since we last looked
+            while episodes < num_episodes:
+                try:
+                    actor_id, ret, steps = results.get_nowait()
+                except queue.Empty:
+                    break
+                episodes += 1
+                print(f"Episode {episodes:3d} | Actor {actor_id} | Return {ret:5.0f} | "
+                      f"Steps {steps} | Updates {updates}")
+                profiling.end_episode(episodes)
+                if ckpt_dir and episodes % 10 == 0:
+                    fname = os.path.join(ckpt_dir, f"dqn_ep{episodes:03d}_ret{int(ret)}.pt")
+                    torch.save(agent.online.state_dict(), fname)
+
+            # Actors only stop when told to, so any exit is a crash
+            for i, p in enumerate(actors):
+                if not p.is_alive():
+                    raise RuntimeError(f"actor {i} exited (exit code {p.exitcode})")
+
+            if len(replay) < learn_start:
+                time.sleep(0.01)
+                continue
+            if learn_t0 is None:
+                learn_t0 = time.perf_counter()
+
+            profiling.tick()
+            agent.optimise_model()
+            updates += 1
+            if updates % publish_every == 0:
+                weights.publish(agent.online)
+    finally:
+        stop.set()
+        while any(p.is_alive() for p in actors):   # keep the queue drained so actors can exit
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for p in actors:
+            p.join()
+
+    elapsed = time.perf_counter() - t0
+    learning = time.perf_counter() - learn_t0 if learn_t0 else 0.0
+    return {
+        "episodes":           episodes,
+        "updates":            updates,
+        "transitions":        replay.added,
+        "seconds":            round(elapsed, 2),
+        "updates_per_sec":    round(updates / learning, 1) if learning else 0.0,
+        "transitions_per_sec": round(replay.added / elapsed, 1),
+    }
@@ -0,0 +1,94 @@
+# ai/dqn/export.py
+#
+# Trained DQN → standalone TorchScript file for CPU play, and back.
+# The file carries its own architecture, board size and quantisation flag,
+# so loading it needs neither ai/dqn/model.py nor the training settings.
+
+import json
+import warnings
+import torch
+
+from ai.dqn.model import build_model
+from ai.dqn.agent import masked_epsilon_greedy
+from ai.state_encoder import N_PLANES
+
+META_FILE = "pacman_dqn.json"   # extra file inside the TorchScript archive
+
+
+def load_checkpoint(path, arch="classic", board=(15, 15), n_actions=4):
+    """Eager network (eval mode, CPU) from a train_dqn.py state_dict checkpoint."""
+    net = build_model(arch, N_PLANES, n_actions, *board)
+    net.load_state_dict(torch.load(path, map_location="cpu"))
+    return net.eval()
+
+
+def quantize_fc(net):
+    """
+    Copy of net with fc_shared's Linear as dynamic int8 (weights stored int8,
+    activations quantised on the fly). That layer holds nearly all of
+    DQNCNN's weights; the convs and the small heads stay float.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")   # eager-mode quantisation is deprecated, still works
+        return torch.ao.quantization.quantize_dynamic(
+            net, {"fc_shared": torch.ao.quantization.default_dynamic_qconfig}, dtype=torch.qint8)
+
+
+def script(net, board=(15, 15)):
+    """Trace net on one dummy board and freeze it (weights inlined as constants)."""
+    example = torch.zeros(1, N_PLANES, *board)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)   # torch.jit is deprecated, still works
+        traced = torch.jit.trace(net.eval(), example)
+        return torch.jit.freeze(traced)
+
+
+def export(net, path, arch="classic", board=(15, 15), quantize=False):
+    """Write net as a TorchScript file that load_policy() can play from."""
+    if quantize:
+        net = quantize_fc(net)
+    meta = {"arch": arch, "board": list(board), "quantized": bool(quantize)}
+    module = script(net, board)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        torch.jit.save(module, path, _extra_files={META_FILE: json.dumps(meta)})
+    return meta
+
+
+class ScriptedPolicy:
+    """
+    Greedy player on an exported network: escape head when threatened and
+    not powered, collect head otherwise, never into a wall.
+    """
+    def __init__(self, module, meta):
+        self.module = module
+        self.meta   = meta
+        self.board  = tuple(meta["board"])
+
+    def q_values(self, states):
+        """(q_collect, q_escape) for a (N, 6, H, W) batch."""
+        with torch.inference_mode():
+            return self.module(states)
+
+    def act(self, state, valid_mask, power_mode, threat):
+        """One move: state (1, 6, H, W), valid_mask 4 bools. Returns an ACTIONS index."""
+        q_col, q_esc = self.q_values(state)
+        q = q_esc if threat and not power_mode else q_col
+        invalid = ~torch.as_tensor(valid_mask, dtype=torch.bool)
+        return int(q[0].masked_fill(invalid, -1e9).argmax())
+
+    def act_batch(self, states, valid_mask, power_mode, threat):
+        """Greedy moves for a batch (DQNAgent.act_batch arguments, on CPU)."""
+        q_col, q_esc = self.q_values(torch.as_tensor(states, dtype=torch.float32))
+        return masked_epsilon_greedy(q_col, q_esc, torch.as_tensor(valid_mask),
+                                     torch.as_tensor(power_mode), torch.as_tensor(threat),
+                                     0.0).numpy()
+
+
+def load_policy(path):
+    """ScriptedPolicy from a file written by export()."""
+    extra = {META_FILE: ""}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        module = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+    return ScriptedPolicy(module.eval(), json.loads(extra[META_FILE]))
@@ -0,0 +1,179 @@
+# ai/dqn/inference.py
+
+import time
+import queue
+import threading
+import numpy as np
+import torch
+import torch.multiprocessing as mp   # registers torch's shared-memory pickling
+
+from ai.state_encoder import THREAT, N_PLANES
+from ai import profiling
+
+
+def pacman_threat(obs, cells):
+    """
+    (N,) bool: is the tile under Pac-Man on the threat plane?
+    obs: (N, 6, H, W) observations, cells: flat cell (r * W + c) of each Pac-Man.
+    """
+    N = len(obs)
+    return obs.reshape(N, N_PLANES, -1)[np.arange(N), THREAT, cells] > 0
+
+
+class BatchedPolicy:
+    """
+    Acts for every game of a VecPacmanEnv at once: the observations come
+    from StateEncoder.encode_batch, the valid moves from env.valid_actions(),
+    and all N actions from a single forward pass (DQNAgent.act_batch).
+    """
+    def __init__(self, agent, encoder):
+        self.agent   = agent
+        self.encoder = encoder
+
+    def act(self, env, obs=None, epsilon=None):
+        """(N,) actions for env; pass obs if you already encoded this step."""
+        if obs is None:
+            obs = self.encoder.encode_batch(env)
+        threat = pacman_threat(obs, self.encoder.cell[env.pacman])
+        return self.agent.act_batch(obs, env.valid_actions(), env.hunter, threat, epsilon)
+
+
+# ─── Shared-memory inference service ─────────────────────────────────────────
+
+class InferenceServer:
+    """
+    Serves actions to actor processes from the agent living in this process.
+
+    Every actor owns a slot of `rows` observations in shared memory (one row
+    per game it runs). To act it writes its rows, puts its slot number on the
+    request queue and waits on its slot's semaphore. A server thread takes
+    the first request, gathers whatever else arrives within max_wait_ms,
+    runs all of it as one batch through agent.act_batch, writes the actions
+    back into shared memory and wakes the actors up.
+
+    Observations are 0/1 planes, so they travel as uint8. Hold server.lock
+    while changing the weights (e.g. around optimise_model) so a batch never
+    runs on a half-applied update.
+
+        server = InferenceServer(agent, (6, 15, 15), n_slots=4, rows=16).start()
+        mp.Process(target=actor, args=(server.client(0), ...)).start()
+        ...
+        server.close()
+    """
+    def __init__(self, agent, obs_shape, n_slots, rows=1, n_actions=4, max_wait_ms=1.0, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.agent    = agent
+        self.n_slots  = n_slots
+        self.rows     = rows
+        self.max_wait = max_wait_ms / 1000
+
+        shape = (n_slots, rows)
+        self.obs     = torch.zeros(shape + tuple(obs_shape), dtype=torch.uint8).share_memory_()
+        self.valid   = torch.zeros(shape + (n_actions,), dtype=torch.bool).share_memory_()
+        self.power   = torch.zeros(shape, dtype=torch.bool).share_memory_()
+        self.threat  = torch.zeros(shape, dtype=torch.bool).share_memory_()
+        self.epsilon = torch.zeros(shape, dtype=torch.float32).share_memory_()
+        self.actions = torch.zeros(shape, dtype=torch.int64).share_memory_()
+
+        self.requests = ctx.Queue()
+        self.ready    = [ctx.Semaphore(0) for _ in range(n_slots)]
+        self.lock     = threading.Lock()
+        self._thread  = None
+
+        self.batches = 0   # forward passes run
+        self.served  = 0   # observations answered
+
+    def client(self, slot):
+        """Handle for the actor using `slot`; pass it to the actor process."""
+        return InferenceClient(self, slot)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mean_batch(self):
+        return self.served / self.batches if self.batches else 0.0
+
+    def _serve(self):
+        while True:
+            msg = self.requests.get()
+            if msg is None:
+                return
+            pending, stop = [msg], False
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.n_slots:
+                try:
+                    msg = self.requests.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if msg is None:
+                    stop = True
+                    break
+                pending.append(msg)
+            self._answer(pending)
+            if stop:
+                return
+
+    @profiling.timed("dqn.inference_server.batch")
+    def _answer(self, pending):
+        """One forward pass over every pending (slot, n_rows) request."""
+        def rows(t):
+            return torch.cat([t[slot, :n] for slot, n in pending])
+
+        with self.lock:
+            actions = self.agent.act_batch(rows(self.obs), rows(self.valid), rows(self.power),
+                                           rows(self.threat), rows(self.epsilon))
+        actions = torch.from_numpy(actions)
+
+        start = 0
+        for slot, n in pending:
+            self.actions[slot, :n] = actions[start:start + n]
+            start += n
+            self.ready[slot].release()
+        self.batches += 1
+        self.served  += start
+
+
+class InferenceClient:
+    """Actor-side handle on one InferenceServer slot (picklable)."""
+    def __init__(self, server, slot):
+        self.slot     = slot
+        self.obs      = server.obs[slot]
+        self.valid    = server.valid[slot]
+        self.power    = server.power[slot]
+        self.threat   = server.threat[slot]
+        self.epsilon  = server.epsilon[slot]
+        self.actions  = server.actions[slot]
+        self.requests = server.requests
+        self.ready    = server.ready[slot]
+
+    def act(self, obs, valid_mask, power_mode, threat, epsilon):
+        """Same arguments as DQNAgent.act_batch (NumPy); blocks for the actions."""
+        n = len(obs)
+        self.obs[:n]     = torch.from_numpy(np.asarray(obs))
+        self.valid[:n]   = torch.from_numpy(np.asarray(valid_mask))
+        self.power[:n]   = torch.from_numpy(np.asarray(power_mode))
+        self.threat[:n]  = torch.from_numpy(np.asarray(threat))
+        self.epsilon[:n] = float(epsilon) if np.isscalar(epsilon) else torch.from_numpy(np.asarray(epsilon))
+        self.requests.put((self.slot, n))
+        self.ready.acquire()
+        return self.actions[:n].numpy().copy()
+
+    def act_env(self, env, encoder, epsilon):
+        """act() for every game of a VecPacmanEnv, encoded with encoder."""
+        obs = encoder.encode_batch(env)
+        threat = pacman_threat(obs, encoder.cell[env.pacman])
+        return self.act(obs, env.valid_actions(), env.hunter, threat, epsilon)
@@ -9,13 +9,15 @@ class DQNCNN(nn.Module):
       - collect head: learns Q-values for pellet-gathering
       - escape head: learns Q-values for ghost-avoidance
     
-    Input shape: (batch, in_channels, H=15, W=15)
+    Input shape: (batch, in_channels, H, W), H×W fixed at construction
+    (15×15 = level1 by default, since the flattened trunk feeds a Linear)
     Output: two tensors of shape (batch, n_actions)
     """
-    def __init__(self, in_channels: int = 6, n_actions: int = 4):
+    def __init__(self, in_channels: int = 6, n_actions: int = 4,
+                 height: int = 15, width: int = 15):
         super().__init__()
         # --- Shared convolutional backbone ---
-        # 3 × (Conv3x3 → ReLU), padding=1 keeps spatial dim 15×15
+        # 3 × (Conv3x3 → ReLU), padding=1 keeps spatial dim H×W
         self.conv = nn.Sequential(
             nn.Conv2d(in_channels, 32, kernel_size=3, padding=1),
             nn.ReLU(inplace=True),
@@ -24,11 +26,11 @@ class DQNCNN(nn.Module):
             nn.Conv2d(64, 64, kernel_size=3, padding=1),
             nn.ReLU(inplace=True),
         )
-        # Flatten 64×15×15 → 14400
+        # Flatten 64×H×W (14400 on 15×15)
         self.flatten = nn.Flatten()
         # Shared bottleneck
         self.fc_shared = nn.Sequential(
-            nn.Linear(64 * 15 * 15, 512),
+            nn.Linear(64 * height * width, 512),
             nn.ReLU(inplace=True),
         )
         # Two separate heads (each → n_actions Q-values)
@@ -37,10 +39,80 @@ class DQNCNN(nn.Module):
 
     def forward(self, x: torch.Tensor):
         """
-        x: (batch, in_channels, 15, 15)
+        x: (batch, in_channels, H, W)
         returns: (q_collect, q_escape), each (batch, n_actions)
         """
-        z = self.conv(x)              # → (batch, 64,15,15)
-        z = self.flatten(z)           # → (batch, 64*15*15)
+        z = self.conv(x)              # → (batch, 64, H, W)
+        z = self.flatten(z)           # → (batch, 64*H*W)
         h = self.fc_shared(z)         # → (batch, 512)
         return self.head_collect(h), self.head_escape(h)
+
+
+class DuelingHead(nn.Module):
+    """Q(s, a) = V(s) + A(s, a) - mean_a A(s, a), from one shared feature vector."""
+    def __init__(self, hidden: int, n_actions: int):
+        super().__init__()
+        self.value     = nn.Linear(hidden, 1)
+        self.advantage = nn.Linear(hidden, n_actions)
+
+    def forward(self, h: torch.Tensor):
+        a = self.advantage(h)
+        return self.value(h) + a - a.mean(dim=1, keepdim=True)
+
+
+class CompactDQN(nn.Module):
+    """
+    DQNCNN's two heads on a much smaller network that runs on any board size:
+      - conv trunk that halves the board twice with stride-2 convs
+        (15×15 → 8×8 → 4×4, level2's 30×28 → 15×14 → 8×7)
+      - adaptive average pool to a fixed pool×pool grid, so fc_shared has
+        the same size whatever the map (pool=1 is plain global pooling,
+        which throws away where things are, so keep it > 1)
+      - a dueling head each for collect and escape
+
+    About 0.3M parameters at the defaults, against DQNCNN's 7.4M on 15×15.
+    height / width are accepted so build_model can pass them, but unused.
+    """
+    def __init__(self, in_channels: int = 6, n_actions: int = 4,
+                 height: int = None, width: int = None,
+                 channels: int = 32, pool: int = 4, hidden: int = 256):
+        super().__init__()
+        self.conv = nn.Sequential(
+            nn.Conv2d(in_channels, channels, kernel_size=3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(channels, 2 * channels, kernel_size=3, stride=2, padding=1),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(2 * channels, 2 * channels, kernel_size=3, stride=2, padding=1),
+            nn.ReLU(inplace=True),
+        )
+        self.pool    = nn.AdaptiveAvgPool2d(pool)
+        self.flatten = nn.Flatten()
+        self.fc_shared = nn.Sequential(
+            nn.Linear(2 * channels * pool * pool, hidden),
+            nn.ReLU(inplace=True),
+        )
+        self.head_collect = DuelingHead(hidden, n_actions)
+        self.head_escape  = DuelingHead(hidden, n_actions)
+
+    def forward(self, x: torch.Tensor):
+        """
+        x: (batch, in_channels, H, W), any H×W
+        returns: (q_collect, q_escape), each (batch, n_actions)
+        """
+        h = self.fc_shared(self.flatten(self.pool(self.conv(x))))
+        return self.head_collect(h), self.head_escape(h)
+
+
+# Selectable architectures (DQNAgent(arch=...), train_dqn.py --arch)
+ARCHITECTURES = {
+    "classic": DQNCNN,
+    "compact": CompactDQN,
+}
+
+
+def build_model(arch: str = "classic", in_channels: int = 6, n_actions: int = 4,
+                height: int = 15, width: int = 15, **kwargs) -> nn.Module:
+    """A fresh network of the named architecture for an H×W board."""
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"unknown architecture {arch!r}, expected one of {sorted(ARCHITECTURES)}")
+    return ARCHITECTURES[arch](in_channels, n_actions, height, width, **kwargs)
@@ -1,36 +1,482 @@
 # ai/dqn/replay_buffer.py
 
-import random
-from collections import deque
+import numpy as np
 import torch
+import torch.multiprocessing as mp   # registers torch's shared-memory pickling
 
 class ReplayBuffer:
     """
-    A fixed-size ring buffer of transitions for experience replay.
-    Stores tuples: (state, action, reward, next_state, done)
-    All elements are PyTorch tensors or primitives.
+    A fixed-size ring buffer of transitions for experience replay, backed by
+    preallocated NumPy arrays instead of a deque of tensors.
+
+    Observations are 0/1 planes (see build_state_tensor), so every frame is
+    bit-packed into C·H·W/8 bytes and stored once: a transition only keeps
+    the slot numbers of its state and next_state frames, and when next push's
+    state is the frame we just stored as next_state, it reuses that slot.
+    The frame ring has two slots per transition plus room for the frames of
+    steps still waiting on their n-step return, for `streams` games pushed
+    side by side (push_batch rows; sized from the first push_batch unless
+    given). A transition whose frames are already older than that when it
+    completes (a stalled producer on a shared ring) is dropped rather than
+    stored pointing at frames that will be overwritten while it's live.
+
+    With n_step > 1 the buffer builds n-step transitions itself: pushes are
+    one-step as usual, and each becomes (s_t, a_t, r_t + γ r_t+1 + … +
+    γ^(n-1) r_t+n-1, s_t+n) once n more steps (or the end of the game) have
+    come in. Every transition also records
+      - head / next_head: which Q head (0 collect, 1 escape) acted in s_t
+        and would act in s_t+n
+      - discount: γ^k for the k steps to the bootstrap state, k < n when a
+        game was cut short (see flush)
+    Games that end without done (step limit) must be flush()ed, or their
+    last steps would be chained onto the next game's.
+
+    sample() draws indices with one vectorised call and gathers the batch
+    with array indexing, so its cost doesn't grow with the buffer size.
     """
-    def __init__(self, capacity: int = 50000):
-        self.buffer = deque(maxlen=capacity)
+    def __init__(self, capacity: int = 50000, n_step: int = 1, gamma: float = 0.99,
+                 streams: int = 1):
+        self.capacity = capacity
+        self.n_step   = n_step
+        self.gamma    = gamma
+        self.streams  = streams
+        self.size     = 0      # live transitions
+        self.pos      = 0      # next transition slot to write
+        self.frame_pos  = 0    # frames written so far; frame id i lives in slot i % len(frames)
+        self.last_frame = -1   # frame id of the previous push's next_state
+        self._pending   = None # steps still waiting on their n-step return
+
+        # Transition arrays
+        self.state_slot = np.zeros(capacity, dtype=np.int64)
+        self.next_slot  = np.zeros(capacity, dtype=np.int64)
+        self.actions    = np.zeros(capacity, dtype=np.int64)
+        self.rewards    = np.zeros(capacity, dtype=np.float32)
+        self.dones      = np.zeros(capacity, dtype=np.float32)
+        self.heads      = np.zeros(capacity, dtype=np.int64)
+        self.next_heads = np.zeros(capacity, dtype=np.int64)
+        self.discounts  = np.zeros(capacity, dtype=np.float32)
+
+        # Frame storage is allocated on the first push, once the shape is known
+        self.obs_shape = None
+        self.frames    = None
+        self._pinned   = {}
+
+    def _pack(self, obs):
+        """Tensor/array of 0/1 planes → packed uint8 row (allocating storage on first use)."""
+        if isinstance(obs, torch.Tensor):
+            obs = obs.detach().cpu().numpy()
+        obs = np.asarray(obs)
+        if self.frames is None:
+            self.obs_shape = obs.shape[-3:]               # drop any leading batch dim of 1
+            n_bits = int(np.prod(self.obs_shape))
+            self.frames = np.zeros((self._ring_size(), (n_bits + 7) // 8), dtype=np.uint8)
+        return np.packbits(obs.reshape(-1) > 0)
+
+    def _max_age(self):
+        """
+        Frames that may be written between a step's state frame and its
+        transition being stored: up to 2 per stream per push_batch over the
+        n pushes of the window, plus the one before it when the state frame
+        is the previous push's next_state.
+        """
+        return 2 * self.streams * (self.n_step + 1)
+
+    def _ring_size(self):
+        # Live transitions write at most 2 frames each after they're stored,
+        # plus those of the steps still pending: max_age covers both
+        return 2 * self.capacity + 2 * self._max_age()
+
+    def _write_frame(self, packed):
+        frame = self.frame_pos
+        self.frames[frame % len(self.frames)] = packed
+        self.frame_pos = frame + 1
+        return frame
+
+    def _write_frames(self, packed):
+        """Store packed rows in consecutive frame slots; returns their frame ids."""
+        frames = self.frame_pos + np.arange(len(packed))
+        self.frames[frames % len(self.frames)] = packed
+        self.frame_pos = int(self.frame_pos + len(packed))
+        return frames
+
+    def push(self, state, action, reward, next_state, done, head=0, next_head=0):
+        """Add one step of a game."""
+        packed = self._pack(state)
+        if self.last_frame >= 0 and np.array_equal(self.frames[self.last_frame % len(self.frames)], packed):
+            s_slot = self.last_frame                       # continuing the same episode
+        else:
+            s_slot = self._write_frame(packed)
+        n_slot = self._write_frame(self._pack(next_state))
+        self.last_frame = n_slot
+
+        self._accumulate(np.array([s_slot]), np.array([action]), np.array([reward]),
+                         np.array([n_slot]), np.array([bool(done)]),
+                         np.array([head]), np.array([next_head]))
+
+    def push_batch(self, states, actions, rewards, next_states, dones,
+                   state_slots=None, heads=0, next_heads=0):
+        """
+        Add one step of N games at once (e.g. every game of a VecPacmanEnv);
+        row i must be the same game from call to call when n_step > 1.
+        states, next_states: (N, C, H, W); the rest (N,) (heads may be scalars).
+        state_slots: optional (N,) frame ids already holding each state,
+                     i.e. what the previous call returned for that game
+                     (-1 where it has to be stored, e.g. after a reset).
+        Returns the (N,) frame ids of next_states.
+        """
+        states, next_states = (x.detach().cpu().numpy() if isinstance(x, torch.Tensor)
+                               else np.asarray(x) for x in (states, next_states))
+        n = len(states)
+        if self.frames is None:
+            self.streams = max(self.streams, n)
+            self._pack(states[0])                         # allocate storage
+        elif n > self.streams:
+            raise ValueError(f"push_batch got {n} games but the frame ring was sized "
+                             f"for {self.streams}; pass streams={n} or more")
+
+        s_slots = np.full(n, -1, dtype=np.int64) if state_slots is None \
+            else np.array(state_slots, dtype=np.int64)
+        fresh = s_slots < 0
+        if fresh.any():
+            s_slots[fresh] = self._write_frames(
+                np.packbits(states[fresh].reshape(int(fresh.sum()), -1) > 0, axis=1))
+        n_slots = self._write_frames(np.packbits(next_states.reshape(n, -1) > 0, axis=1))
+        self.last_frame = -1   # single pushes don't chain onto a batch
+
+        self._accumulate(s_slots, np.asarray(actions), np.asarray(rewards), n_slots,
+                         np.asarray(dones, dtype=bool),
+                         np.broadcast_to(heads, n), np.broadcast_to(next_heads, n))
+        return n_slots
 
-    def push(self, state, action, reward, next_state, done):
-        """Add one transition to the buffer."""
-        self.buffer.append((state, action, reward, next_state, done))
+    # ─── n-step accumulation ─────────────────────────────────────────────────
+
+    def _accumulate(self, s_slots, actions, rewards, n_slots, dones, heads, next_heads):
+        """Queue one step of N games; store every transition whose n-step return is complete."""
+        N, n = len(s_slots), self.n_step
+        if n == 1:
+            self._commit(s_slots, actions, rewards, n_slots, dones, heads, next_heads,
+                        np.full(N, self.gamma, dtype=np.float32))
+            return
+
+        p = self._pending
+        if p is None or len(p["len"]) != N:
+            p = self._pending = {
+                "slot":   np.zeros((N, n), dtype=np.int64),
+                "action": np.zeros((N, n), dtype=np.int64),
+                "reward": np.zeros((N, n), dtype=np.float32),
+                "head":   np.zeros((N, n), dtype=np.int64),
+                "len":    np.zeros(N, dtype=np.int64),
+                "next":      np.zeros(N, dtype=np.int64),   # latest next_state slot / head
+                "next_head": np.zeros(N, dtype=np.int64),
+            }
+        rows, L = np.arange(N), p["len"]
+        p["slot"][rows, L]   = s_slots
+        p["action"][rows, L] = actions
+        p["reward"][rows, L] = rewards
+        p["head"][rows, L]   = heads
+        p["next"][:]      = n_slots
+        p["next_head"][:] = next_heads
+        L += 1
+
+        # Finished games store everything they have; full windows store their oldest step
+        emit = np.where(dones[:, None], np.arange(n) < L[:, None],
+                        (np.arange(n) == 0) & (L == n)[:, None])
+        self._emit(emit, dones)
+
+        L[dones] = 0
+        full = L == n
+        if full.any():
+            for key in ("slot", "action", "reward", "head"):
+                p[key][full] = np.roll(p[key][full], -1, axis=1)
+            L[full] = n - 1
+
+    def _emit(self, emit, dones):
+        """Store the pending steps marked in emit (N, n), bootstrapping from each game's latest state."""
+        p, n = self._pending, self.n_step
+        r, j = np.nonzero(emit)
+        if not len(r):
+            return
+        # returns[i, j] = Σ_{j ≤ k < len_i} γ^(k-j) reward[i, k]
+        k = np.arange(n)
+        power = k[:, None] - k[None, :]
+        weights = np.where(power >= 0, self.gamma ** np.maximum(power, 0), 0.0)
+        returns = np.where(k < p["len"][:, None], p["reward"], 0.0) @ weights
+        steps = p["len"][r] - j
+        self._commit(p["slot"][r, j], p["action"][r, j], returns[r, j], p["next"][r],
+                    dones[r], p["head"][r, j], p["next_head"][r],
+                    (self.gamma ** steps).astype(np.float32))
+
+    def flush(self, rows=None):
+        """
+        Store the pending steps of games that stopped without done (e.g. hit
+        the step limit), bootstrapping from their last next_state. rows: the
+        push_batch rows to flush (default all); call before resetting them.
+        """
+        p = self._pending
+        if p is None:
+            return
+        stop = np.zeros(len(p["len"]), dtype=bool)
+        stop[slice(None) if rows is None else np.asarray(rows)] = True
+        self._emit(stop[:, None] & (np.arange(self.n_step) < p["len"][:, None]),
+                   np.zeros(len(stop), dtype=bool))
+        p["len"][stop] = 0
+
+    def _commit(self, s_frames, actions, rewards, n_frames, *rest):
+        """
+        Store finished transitions given by frame ids, dropping any whose
+        frames are older than _max_age (they'd be overwritten while live).
+        """
+        fresh = self.frame_pos - np.minimum(s_frames, n_frames) <= self._max_age()
+        if not fresh.all():
+            s_frames, actions, rewards, n_frames, *rest = (
+                np.asarray(x)[fresh] for x in (s_frames, actions, rewards, n_frames, *rest))
+        if len(s_frames):
+            F = len(self.frames)
+            self._store(s_frames % F, actions, rewards, n_frames % F, *rest)
+
+    def _store(self, s_slots, actions, rewards, n_slots, dones, heads, next_heads, discounts):
+        """Write k finished transitions at the ring position."""
+        idx = (self.pos + np.arange(len(s_slots))) % self.capacity
+        self.state_slot[idx] = s_slots
+        self.next_slot[idx]  = n_slots
+        self.actions[idx]    = actions
+        self.rewards[idx]    = rewards
+        self.dones[idx]      = dones
+        self.heads[idx]      = heads
+        self.next_heads[idx] = next_heads
+        self.discounts[idx]  = discounts
+
+        self.pos  = int((self.pos + len(idx)) % self.capacity)
+        self.size = min(self.size + len(idx), self.capacity)
+
+    # ─── Sampling ────────────────────────────────────────────────────────────
+
+    def _unpack(self, slots, name):
+        """Gather packed frames and expand them into a (B, C, H, W) float tensor."""
+        n_bits = int(np.prod(self.obs_shape))
+        bits = np.unpackbits(self.frames[slots], axis=1, count=n_bits)
+        batch = torch.from_numpy(bits.reshape(len(slots), *self.obs_shape))
+
+        if not torch.cuda.is_available():
+            return batch.float()
+        # Reuse a page-locked staging tensor so .to(device, non_blocking=True) can overlap
+        out = self._pinned.get(name)
+        if out is None or out.shape != batch.shape:
+            out = self._pinned[name] = torch.empty(batch.shape, dtype=torch.float32).pin_memory()
+        return out.copy_(batch)
 
     def sample(self, batch_size: int):
         """
         Randomly sample a batch of transitions.
-        Returns five tensors, each with leading dim = batch_size.
+        Returns eight tensors, each with leading dim = batch_size:
+          states, actions, rewards, next_states, dones, heads, next_heads, discounts
+        (With CUDA the state tensors are pinned buffers reused by the next call.)
         """
-        batch = random.sample(self.buffer, batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
+        idx = np.random.randint(0, self.size, size=batch_size)
+        return self._gather(idx)
+
+    def _gather(self, idx):
+        """The eight batch tensors for the transitions at idx."""
         return (
-            torch.stack(states),
-            torch.tensor(actions, dtype=torch.int64),
-            torch.tensor(rewards, dtype=torch.float32),
-            torch.stack(next_states),
-            torch.tensor(dones, dtype=torch.float32),
+            self._unpack(self.state_slot[idx], "states"),
+            torch.from_numpy(self.actions[idx]),
+            torch.from_numpy(self.rewards[idx]),
+            self._unpack(self.next_slot[idx], "next_states"),
+            torch.from_numpy(self.dones[idx]),
+            torch.from_numpy(self.heads[idx]),
+            torch.from_numpy(self.next_heads[idx]),
+            torch.from_numpy(self.discounts[idx]),
         )
 
     def __len__(self):
-        return len(self.buffer)
+        return self.size
+
+
+class SumTree:
+    """
+    Binary tree over `capacity` leaf priorities where every internal node holds
+    the sum of its children, so the root is the total priority mass.
+    Stored flat (root at 1, children of i at 2i and 2i+1); updates and
+    prefix-sum lookups walk one root-to-leaf path, O(log n), and both are
+    vectorised over a whole batch of leaves at once.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.n_leaves = 1 << max(0, capacity - 1).bit_length()
+        self.tree     = np.zeros(2 * self.n_leaves, dtype=np.float64)
+
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.n_leaves]
+
+    def update(self, idx, priorities):
+        """Set the priority of leaves idx and refresh their ancestors level by level."""
+        nodes = np.asarray(idx, dtype=np.int64) + self.n_leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while len(nodes) and nodes[-1] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """For each prefix-sum value in [0, total), the leaf whose range contains it."""
+        values = np.array(values, dtype=np.float64)
+        nodes  = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.n_leaves.bit_length() - 1):   # one step per tree level
+            left     = 2 * nodes
+            go_right = values > self.tree[left]
+            values   = np.where(go_right, values - self.tree[left], values)
+            nodes    = np.where(go_right, left + 1, left)
+        return nodes - self.n_leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay (Schaul et al.) on top of ReplayBuffer.
+
+    Transitions are drawn with probability p_i^alpha / sum_k p_k^alpha from a
+    SumTree, using one stratified draw per batch slot. New transitions get the
+    current max priority so each is replayed at least once. sample() also
+    returns importance-sampling weights (normalised by the batch max) and the
+    indices to pass back to update_priorities() with the new TD errors.
+    beta is annealed towards 1 by beta_increment on every sample.
+    """
+    def __init__(self,
+                 capacity: int = 50000,
+                 n_step: int = 1,
+                 gamma: float = 0.99,
+                 alpha: float = 0.6,
+                 beta: float = 0.4,
+                 beta_increment: float = 1e-5,
+                 eps: float = 1e-6,
+                 streams: int = 1):
+        super().__init__(capacity, n_step, gamma, streams)
+        self.tree  = SumTree(capacity)
+        self.alpha = alpha
+        self.beta  = beta
+        self.beta_increment = beta_increment
+        self.eps   = eps
+        self.max_priority = 1.0
+
+    def _store(self, s_slots, *rest):
+        """Store transitions with the highest priority seen so far."""
+        idx = (self.pos + np.arange(len(s_slots))) % self.capacity
+        super()._store(s_slots, *rest)
+        self.tree.update(idx, np.full(len(idx), self.max_priority))
+
+    def sample(self, batch_size: int):
+        """
+        Sample a batch in proportion to priority.
+        Returns the eight ReplayBuffer tensors plus (weights, indices).
+        """
+        total   = self.tree.total()
+        segment = total / batch_size
+        values  = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        idx = self.tree.find(np.minimum(values, np.nextafter(total, 0)))
+        idx = np.minimum(idx, self.size - 1)   # guard against float round-off
+
+        probs   = self.tree.get(idx) / total
+        weights = (self.size * probs) ** (-self.beta)
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return self._gather(idx) + (torch.from_numpy(weights), idx)
+
+    def update_priorities(self, indices, td_errors):
+        """Re-prioritise sampled transitions from their latest absolute TD errors."""
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+
+class SharedReplayBuffer(ReplayBuffer):
+    """
+    Uniform ReplayBuffer whose storage lives in shared memory, so actor
+    processes can push into it while a learner process samples from it.
+
+    Every array (frames included, hence obs_shape up front) is a shared torch
+    tensor seen through a NumPy view, the write positions are kept in a
+    shared counter tensor, and push / push_batch / flush / sample hold one
+    process-shared lock. Hand it to other processes as an mp.Process
+    argument; they get views onto the same memory. Steps still waiting on
+    their n-step return stay in the process that pushed them. streams is
+    the number of games pushing into it across all processes.
+    """
+    def __init__(self, capacity: int = 50000, obs_shape=(6, 15, 15),
+                 n_step: int = 1, gamma: float = 0.99, streams: int = 1, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.capacity   = capacity
+        self.n_step     = n_step
+        self.gamma      = gamma
+        self.streams    = streams
+        self.obs_shape  = tuple(obs_shape)
+        self.last_frame = -1   # per process
+        self._pending   = None
+        self._pinned    = {}
+        n_bytes = (int(np.prod(self.obs_shape)) + 7) // 8
+
+        self._shared = {
+            "state_slot": torch.zeros(capacity, dtype=torch.int64),
+            "next_slot":  torch.zeros(capacity, dtype=torch.int64),
+            "actions":    torch.zeros(capacity, dtype=torch.int64),
+            "rewards":    torch.zeros(capacity, dtype=torch.float32),
+            "dones":      torch.zeros(capacity, dtype=torch.float32),
+            "heads":      torch.zeros(capacity, dtype=torch.int64),
+            "next_heads": torch.zeros(capacity, dtype=torch.int64),
+            "discounts":  torch.zeros(capacity, dtype=torch.float32),
+            "frames":     torch.zeros((self._ring_size(), n_bytes), dtype=torch.uint8),
+            "counters":   torch.zeros(4, dtype=torch.int64),   # size, pos, frame_pos, added
+        }
+        for t in self._shared.values():
+            t.share_memory_()
+        self.lock = ctx.Lock()
+        self._bind()
+
+    def _bind(self):
+        for name, t in self._shared.items():
+            setattr(self, name, t.numpy())
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "n_step": self.n_step, "gamma": self.gamma,
+                "streams": self.streams, "obs_shape": self.obs_shape, "_shared": self._shared, "lock": self.lock}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.last_frame = -1
+        self._pending   = None
+        self._pinned    = {}
+        self._bind()
+
+    def _counter(i):
+        return property(lambda self: int(self.counters[i]),
+                        lambda self, v: self.counters.__setitem__(i, v))
+
+    size      = _counter(0)
+    pos       = _counter(1)
+    frame_pos = _counter(2)
+    added     = _counter(3)   # transitions pushed so far, by everyone
+    del _counter
+
+    def _store(self, s_slots, *rest):
+        super()._store(s_slots, *rest)
+        self.added += len(s_slots)
+
+    def push(self, *args, **kwargs):
+        with self.lock:
+            super().push(*args, **kwargs)
+
+    def push_batch(self, *args, **kwargs):
+        with self.lock:
+            return super().push_batch(*args, **kwargs)
+
+    def flush(self, rows=None):
+        with self.lock:
+            super().flush(rows)
+
+    def sample(self, batch_size: int):
+        with self.lock:
+            return super().sample(batch_size)
@@ -20,9 +20,13 @@ def sync_target_network(source: torch.nn.Module,
     """
     target.load_state_dict(source.state_dict())
 
-def huber_loss(predictions, targets, delta: float = 1.0):
+def huber_loss(predictions, targets, delta: float = 1.0, weights=None):
     """
-    Smooth L1 / Huber loss, robust to outliers.
-    Equivalent to PyTorch's nn.SmoothL1Loss(reduction='none') with beta=delta.
+    Smooth L1 / Huber loss, robust to outliers, averaged over the batch.
+    Equivalent to PyTorch's nn.SmoothL1Loss() with beta=delta.
+    weights: optional per-sample importance-sampling weights (prioritized replay).
     """
-    return F.smooth_l1_loss(predictions, targets, beta=delta)
+    if weights is None:
+        return F.smooth_l1_loss(predictions, targets, beta=delta)
+    per_sample = F.smooth_l1_loss(predictions, targets, beta=delta, reduction='none')
+    return (weights * per_sample).mean()
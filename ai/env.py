@@ -1,11 +1,174 @@
 # ai/env.py
 
-from game.score_tracker import update_score, get_score
-from ai.ghosts        import update_ghosts
+from game.score_tracker import update_score, get_score, event_points
+from ai.search          import build_graph
+import ai.ghosts        as gh_module
+from ai                 import profiling
 
-# History for backtracking (same as before)
-_prev_pos  = None
-_prev2_pos = None
+
+class PacmanEnv:
+    """
+    One game of Pac-Man whose state all lives on the instance: board, score,
+    back-and-forth history and its own Ghost objects. Several can run side
+    by side (e.g. one per worker process), which the module-global
+    step_environment can't do.
+
+    reset() returns the same 6-tuple get_initial_path hands out
+    (minus the path); step() returns the same 8-tuple as step_environment.
+
+    rewards: optional {event: points} overriding score_tracker.event_points
+    for this env only, e.g. {"step": -0.2} while tuning the step penalty.
+    score (and each step's reward) uses the overrides; game_score tallies
+    the same events at the default points, so games played under different
+    rewards can still be compared.
+
+    ghosts: a list of Ghost objects (default: copies of ai.ghosts' line-up),
+    or a single-game GhostTeam, e.g. GhostTeam(game_map) for one ghost per
+    'G' tile of this map with the four classic personalities.
+    """
+    def __init__(self, game_map, hunter_duration=50, ghosts=None, rewards=None):
+        self.game_map        = game_map
+        self.hunter_duration = hunter_duration
+        self.rewards         = dict(rewards or {})
+        self.graph, self.start_pos, _ = build_graph(game_map)
+
+        # Same ghost line-up as ai.ghosts, but private copies
+        if ghosts is None:
+            ghosts = [gh_module.Ghost(g.name, g.start_pos) for g in gh_module.ghosts]
+        self.ghosts = ghosts
+
+        self.reset()
+
+    def reset(self):
+        """Fresh board, score 0, ghosts back in their house."""
+        game_map = self.game_map
+        self.pacman_pos      = self.start_pos
+        self.food_positions  = {(r, c) for r, row in enumerate(game_map)
+                                for c, ch in enumerate(row) if ch == "."}
+        self.super_fruit_pos = next(((r, c) for r, row in enumerate(game_map)
+                                     for c, ch in enumerate(row) if ch == "F"), None)
+        self.ghost_positions = [(r, c) for r, row in enumerate(game_map)
+                                for c, ch in enumerate(row) if ch == "G"]
+        self.ghost_hunter    = False
+        self.hunter_timer    = 0
+        self.score           = 0
+        self.game_score      = 0
+        self.steps           = 0
+        self.prev_pos        = None
+        self.prev2_pos       = None
+        if isinstance(self.ghosts, gh_module.GhostTeam):
+            self.ghosts.reset()
+        else:
+            for g in self.ghosts:
+                g.respawn()
+
+        return (self.pacman_pos, self.ghost_positions, self.food_positions,
+                self.super_fruit_pos, self.ghost_hunter, self.hunter_timer)
+
+    def _event(self, event):
+        default = event_points(event)
+        points  = self.rewards.get(event)
+        self.score      += default if points is None else points
+        self.game_score += default
+
+    @profiling.timed("env.step")
+    def step(self, new_pacman_pos):
+        """
+        One timestep:
+         - scores every event on this env
+         - returns ( ... , done, reward)
+        """
+        old_score = self.score
+        done = False
+
+        # 0) back-and-forth penalty
+        if self.prev2_pos is not None and new_pacman_pos == self.prev2_pos:
+            self._event("backtrack")
+
+        # shift history
+        self.prev2_pos = self.prev_pos
+        self.prev_pos  = new_pacman_pos
+
+        # 1) step penalty
+        self._event("step")
+
+        # 2) move Pac-Man
+        pacman_pos = self.pacman_pos = new_pacman_pos
+
+        # 3) food pellet
+        if pacman_pos in self.food_positions:
+            self.food_positions.remove(pacman_pos)
+            self._event("food")
+
+        # 4) super-fruit
+        if self.super_fruit_pos is not None and pacman_pos == self.super_fruit_pos:
+            self.super_fruit_pos = None
+            self._event("super_fruit")
+            self.ghost_hunter = True
+            self.hunter_timer = self.hunter_duration
+
+        # 5) hunter countdown
+        if self.ghost_hunter:
+            self.hunter_timer -= 1
+            if self.hunter_timer <= 0:
+                self.ghost_hunter = False
+
+        # 6) move ghosts
+        if isinstance(self.ghosts, gh_module.GhostTeam):
+            self.ghost_positions = self.ghosts.move(pacman_pos, self.ghost_hunter)
+        else:
+            self.ghost_positions = gh_module.move_ghosts(self.ghosts, self.graph,
+                                                         pacman_pos, self.ghost_hunter)
+
+        # 7) collision
+        if pacman_pos in self.ghost_positions:
+            if self.ghost_hunter:
+                self._event("ghost_eaten")
+            else:
+                self._event("collision")
+                done = True
+
+        # 8) level-complete
+        if not self.food_positions:
+            done = True
+
+        # how much score changed this step
+        reward = self.score - old_score
+        self.steps += 1
+
+        return (
+            pacman_pos,
+            self.ghost_positions,
+            self.food_positions,
+            self.super_fruit_pos,
+            self.ghost_hunter,
+            self.hunter_timer,
+            done,
+            reward
+        )
+
+
+class _GlobalEnv(PacmanEnv):
+    """
+    The env behind step_environment: module-level ghosts, global score,
+    and the board state passed in by the caller on every call.
+    """
+    def __init__(self):
+        self.ghosts    = gh_module.ghosts
+        self.prev_pos  = None
+        self.prev2_pos = None
+        self.steps     = 0
+
+    def _event(self, event):
+        update_score(event)
+
+    @property
+    def score(self):
+        return get_score()
+
+
+# History for backtracking lives on this shared instance (same as before)
+_global_env = _GlobalEnv()
 
 def step_environment(graph,
                      new_pacman_pos,
@@ -20,72 +183,12 @@ def step_environment(graph,
      - applies all update_score(...) calls internally
      - returns ( ... , done, reward)
     """
-
-    global _prev_pos, _prev2_pos
-
-    # Remember score before any events
-    old_score = get_score()
-
-    done = False
-
-    # 0) back-and-forth penalty
-    if _prev2_pos is not None and new_pacman_pos == _prev2_pos:
-        update_score("backtrack")
-
-    # shift history
-    _prev2_pos = _prev_pos
-    _prev_pos  = new_pacman_pos
-
-    # 1) step penalty
-    update_score("step")
-
-    # 2) move Pac-Man
-    pacman_pos = new_pacman_pos
-
-    # 3) food pellet
-    if pacman_pos in food_positions:
-        food_positions.remove(pacman_pos)
-        update_score("food")
-
-    # 4) super-fruit
-    if super_fruit_pos is not None and pacman_pos == super_fruit_pos:
-        super_fruit_pos = None
-        update_score("super_fruit")
-        ghost_hunter = True
-        hunter_timer = HUNTER_DURATION
-
-    # 5) hunter countdown
-    if ghost_hunter:
-        hunter_timer -= 1
-        if hunter_timer <= 0:
-            ghost_hunter = False
-
-    # 6) move ghosts
-    ghost_positions = update_ghosts(graph, pacman_pos, ghost_hunter)
-
-    # 7) collision
-    if pacman_pos in ghost_positions:
-        if ghost_hunter:
-            update_score("ghost_eaten")
-        else:
-            update_score("collision")
-            done = True
-
-    # 8) level-complete
-    if not food_positions:
-        done = True
-
-    # compute how much score changed this step
-    new_score = get_score()
-    reward    = new_score - old_score
-
-    return (
-        pacman_pos,
-        ghost_positions,
-        food_positions,
-        super_fruit_pos,
-        ghost_hunter,
-        hunter_timer,
-        done,
-        reward
-    )
+    env = _global_env
+    env.graph           = graph
+    env.hunter_duration = HUNTER_DURATION
+    env.pacman_pos      = new_pacman_pos
+    env.food_positions  = food_positions      # updated in place, as callers expect
+    env.super_fruit_pos = super_fruit_pos
+    env.ghost_hunter    = ghost_hunter
+    env.hunter_timer    = hunter_timer
+    return env.step(new_pacman_pos)
@@ -0,0 +1,327 @@
+# ai/game_state.py
+#
+# The whole state of one game as a small immutable value, and a pure step
+# function over it — for planners that want to try thousands of futures:
+#
+#   model = GameModel(game_map)
+#   state = model.initial_state(seed=0)
+#   for a in model.legal_actions(state):
+#       child, reward, done = step(state, a)      # state itself is untouched
+#
+# Same rules and scoring as PacmanEnv / VecPacmanEnv with the same ghost
+# line-up (default, as for both: ai.ghosts' lone Blinky). Randomness
+# (wandering ghosts) comes from a xorshift seed carried in the state, so a
+# state + action always leads to the same child.
+
+from collections import namedtuple
+
+import numpy as np
+
+from ai.ghosts          import (GhostTeam, PERSONALITIES, SCATTER, CHASE, BLINKY, PINKY, CLYDE,
+                                CLYDE_RADIUS, SCATTER_FRAMES, CHASE_FRAMES, WANDER_FRAMES)
+import ai.ghosts        as gh_module
+from ai.search          import build_graph
+from ai.vec_env         import ACTIONS
+from game.score_tracker import event_points
+
+# ─── Packed ghost ────────────────────────────────────────────────────────────
+# One int per ghost: node id | mode | mode counter | wander counter
+_POS_BITS, _CNT_BITS = 16, 12
+_POS_MASK = (1 << _POS_BITS) - 1
+_CNT_MASK = (1 << _CNT_BITS) - 1
+_MODE_SHIFT   = _POS_BITS
+_CNT_SHIFT    = _POS_BITS + 1
+_WANDER_SHIFT = _POS_BITS + 1 + _CNT_BITS
+
+def pack_ghost(pos, mode, counter, wander):
+    return pos | mode << _MODE_SHIFT | counter << _CNT_SHIFT | wander << _WANDER_SHIFT
+
+def unpack_ghost(g):
+    """(pos, mode, counter, wander) of a packed ghost."""
+    return (g & _POS_MASK, g >> _MODE_SHIFT & 1,
+            g >> _CNT_SHIFT & _CNT_MASK, g >> _WANDER_SHIFT & _CNT_MASK)
+
+# Pac-Man's heading, for Pinky and Inky: index into HEADINGS (0 = not moved yet)
+HEADINGS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+GameState = namedtuple("GameState", [
+    "pacman",        # node id
+    "pellets",       # int bitmask over node ids
+    "fruit",         # node id of the super-fruit, -1 once eaten (or none on the map)
+    "hunter_timer",  # power mode frames left (> 0 means hunting)
+    "ghosts",        # tuple of packed ghosts (pack_ghost)
+    "heading",       # Pac-Man's last move, index into HEADINGS
+    "prev",          # last two Pac-Man positions, for the backtrack penalty (-1 = none)
+    "prev2",
+    "score",
+    "steps",
+    "done",
+    "seed",          # xorshift64 state for wandering ghosts
+    "model",         # the GameModel this state belongs to (shared, never copied)
+])
+GameState.__doc__ = """
+Immutable snapshot of one game. All fields are ints (plus the shared
+model), so copying a state — or keeping thousands of them in a tree —
+costs a tuple, never a dict or set.
+"""
+
+def _clone(state):
+    """States never change, so a clone is the state itself."""
+    return state
+
+GameState.clone  = _clone
+GameState.hunter = property(lambda s: s.hunter_timer > 0)
+
+
+def _xorshift(x):
+    x ^= (x << 13) & 0xFFFFFFFFFFFFFFFF
+    x ^= x >> 7
+    x ^= (x << 17) & 0xFFFFFFFFFFFFFFFF
+    return x
+
+
+class GameModel:
+    """
+    Everything about a game that never changes while it's played: the maze
+    tables, ghost line-up and scoring. Built once per map and shared by every
+    GameState of it.
+
+    personalities / starts / hunter_duration / rewards mean the same as for
+    GhostTeam and PacmanEnv (rewards overrides score_tracker.event_points per
+    event). With neither personalities nor starts the ghosts are ai.ghosts'
+    line-up, like PacmanEnv's and VecPacmanEnv's defaults; to snapshot an
+    env, give both the same line-up.
+    """
+    def __init__(self, game_map, personalities=None, hunter_duration=50, rewards=None,
+                 starts=None):
+        if max(SCATTER_FRAMES, CHASE_FRAMES, WANDER_FRAMES) > _CNT_MASK:
+            raise ValueError("ghost frame counters don't fit the packed ghost layout")
+
+        self.game_map        = game_map
+        self.hunter_duration = hunter_duration
+        if personalities is None and starts is None:
+            personalities = [g.name for g in gh_module.ghosts]
+            starts        = [g.start_pos for g in gh_module.ghosts]
+        self.team = team     = GhostTeam(game_map, 1, personalities, starts=starts)
+        self.maze = maze     = team.maze
+        self.nodes, self.index = maze.nodes, maze.index
+        V = len(self.nodes)
+
+        # Plain-Python tables: list indexing beats NumPy scalars in the step loop
+        self.next_hop  = maze.next_hop.tolist()
+        self.neighbours = maze.neighbours
+        self.rows, self.cols = maze.rows.tolist(), maze.cols.tolist()
+        self.snap      = team.snap.tolist()
+        self.H, self.W = team.H, team.W
+        self.kind      = team.kind.tolist()
+        self.ghost_start    = team.start.tolist()
+        self.scatter_target = team.scatter_target.tolist()
+        self.blinky         = team._blinky
+
+        # move[v][a] -> node reached by action a from v (v itself into a wall)
+        self.move = [[self.index.get((r + dr, c + dc), v) for dr, dc in ACTIONS]
+                     for v, (r, c) in enumerate(self.nodes)]
+        self.heading_of = [HEADINGS.index(d) for d in ACTIONS]
+
+        _, start, fruit = build_graph(game_map)
+        self.start_node = self.index[start]
+        self.fruit_node = self.index[fruit] if fruit is not None else -1
+        self.start_pellets = 0
+        for r, row in enumerate(game_map):
+            for c, ch in enumerate(row):
+                if ch == ".":
+                    self.start_pellets |= 1 << self.index[(r, c)]
+
+        points = dict(rewards or {})
+        self.points = {e: points.get(e, event_points(e))
+                       for e in ("step", "backtrack", "food", "super_fruit",
+                                 "ghost_eaten", "collision")}
+        self.n_nodes = V
+
+    # ─── States ───────────────────────────────────────────────────────────────
+
+    def initial_state(self, seed=0):
+        ghosts = tuple(pack_ghost(s, SCATTER, SCATTER_FRAMES, 0) for s in self.ghost_start)
+        return GameState(self.start_node, self.start_pellets, self.fruit_node, 0, ghosts,
+                         0, -1, -1, 0, 0, False, seed & 0xFFFFFFFFFFFFFFFF or 1, self)
+
+    def legal_actions(self, state):
+        """Action indices (into ACTIONS) that don't walk into a wall."""
+        row = self.move[state.pacman]
+        return [a for a in range(len(ACTIONS)) if row[a] != state.pacman]
+
+    def step(self, state, action):
+        """
+        One tick from state with action (an ACTIONS index).
+        Returns (next_state, reward, done); state itself is left alone.
+        A finished game stays finished: stepping it returns it unchanged.
+        """
+        if state.done:
+            return state, 0, True
+        pts = self.points
+
+        # 0) back-and-forth penalty, then shift history; 1) step penalty
+        new = self.move[state.pacman][action]
+        reward = pts["step"]
+        if new == state.prev2:
+            reward += pts["backtrack"]
+        # (like GhostTeam, the very first move of a game sets no heading yet)
+        heading = state.heading
+        if new != state.pacman and state.prev >= 0:
+            heading = self.heading_of[action]
+
+        # 3) food pellet
+        pellets = state.pellets
+        if pellets >> new & 1:
+            pellets &= ~(1 << new)
+            reward += pts["food"]
+
+        # 4) super-fruit, 5) hunter countdown
+        fruit, timer = state.fruit, state.hunter_timer
+        if new == fruit:
+            fruit = -1
+            reward += pts["super_fruit"]
+            timer = self.hunter_duration
+        if timer > 0:
+            timer -= 1
+        hunter = timer > 0
+
+        # 6) ghosts
+        ghosts, seed = self._move_ghosts(state.ghosts, new, heading, hunter, state.seed)
+
+        # 7) collision, 8) level complete
+        done = False
+        if any(g & _POS_MASK == new for g in ghosts):
+            if hunter:
+                reward += pts["ghost_eaten"]
+            else:
+                reward += pts["collision"]
+                done = True
+        if not pellets:
+            done = True
+
+        return GameState(new, pellets, fruit, timer, ghosts, heading, new, state.prev,
+                         state.score + reward, state.steps + 1, done, seed, self), reward, done
+
+    def _chase_target(self, i, pos, pacman, heading, ghosts):
+        """Same targets as GhostTeam.chase_targets, for one ghost."""
+        kind = self.kind[i]
+        pr, pc = self.rows[pacman], self.cols[pacman]
+        if kind == BLINKY:
+            return pacman
+        if kind == CLYDE:
+            gr, gc = self.rows[pos], self.cols[pos]
+            if (gr - pr) ** 2 + (gc - pc) ** 2 < CLYDE_RADIUS ** 2:
+                return self.scatter_target[i]
+            return pacman
+        dr, dc = HEADINGS[heading]
+        if kind == PINKY:
+            r, c = pr + 4 * dr, pc + 4 * dc
+        else:  # INKY
+            ref = ghosts[self.blinky] & _POS_MASK if self.blinky >= 0 else pos
+            r = 2 * (pr + 2 * dr) - self.rows[ref]
+            c = 2 * (pc + 2 * dc) - self.cols[ref]
+        return self.snap[min(max(r, 0), self.H - 1)][min(max(c, 0), self.W - 1)]
+
+    def _move_ghosts(self, ghosts, pacman, heading, hunter, seed):
+        """GhostTeam.step for one game of packed ghosts; returns (ghosts, seed)."""
+        out = []
+        for i, g in enumerate(ghosts):
+            pos, mode, counter, wander = unpack_ghost(g)
+
+            counter -= 1
+            if counter <= 0:
+                mode, counter = (CHASE, CHASE_FRAMES) if mode == SCATTER else (SCATTER, SCATTER_FRAMES)
+
+            if wander > 0:
+                wander -= 1
+                nbrs = self.neighbours[pos]
+                if nbrs:
+                    seed = _xorshift(seed)
+                    pos = nbrs[seed % len(nbrs)]
+            else:
+                if mode == SCATTER:
+                    target = self.scatter_target[i]
+                else:
+                    # Inky reads Blinky's position before this tick's moves, like the team
+                    target = self._chase_target(i, pos, pacman, heading, ghosts)
+                if mode == SCATTER and pos == target:
+                    wander = WANDER_FRAMES
+                else:
+                    hop = self.next_hop[pos][target]
+                    if hop >= 0:
+                        pos = hop
+
+            if hunter and pos == pacman:
+                pos, mode, counter, wander = self.ghost_start[i], SCATTER, SCATTER_FRAMES, 0
+            out.append(pack_ghost(pos, mode, counter, wander))
+        return tuple(out), seed
+
+    # ─── Conversions ─────────────────────────────────────────────────────────
+
+    def to_tuple(self, state):
+        """
+        The 6-tuple the planners and step_environment use:
+          (pacman_pos, ghost_positions, food_positions,
+           super_fruit_pos, ghost_hunter, hunter_timer)
+        """
+        nodes, pellets = self.nodes, state.pellets
+        return (
+            nodes[state.pacman],
+            [nodes[g & _POS_MASK] for g in state.ghosts],
+            {nodes[v] for v in range(self.n_nodes) if pellets >> v & 1},
+            nodes[state.fruit] if state.fruit >= 0 else None,
+            state.hunter,
+            state.hunter_timer,
+        )
+
+    def snapshot(self, env, i=0, seed=0):
+        """
+        Capture game i of a VecPacmanEnv, or of a PacmanEnv playing with a
+        GhostTeam or a list of Ghost objects (the scalar game), as a GameState
+        (score and steps included). The env's ghosts must be this model's
+        line-up. For a Ghost list, Pac-Man's heading is taken from his last
+        two tiles.
+        """
+        if hasattr(env, "n_envs"):   # VecPacmanEnv
+            team = env.ghosts
+            pacman, pellet_mask = int(env.pacman[i]), env.pellets[i]
+            fruit, timer = int(env.fruit[i]), int(env.hunter_timer[i]) if env.hunter[i] else 0
+            prev, prev2 = int(env.prev_pos[i]), int(env.prev2_pos[i])
+            score, steps, done = float(env.score[i]), int(env.steps[i]), bool(env.done[i])
+        else:                        # PacmanEnv
+            team, index = env.ghosts, self.index
+            pacman = index[env.pacman_pos]
+            pellet_mask = np.zeros(self.n_nodes, dtype=bool)
+            pellet_mask[[index[p] for p in env.food_positions]] = True
+            fruit = index[env.super_fruit_pos] if env.super_fruit_pos is not None else -1
+            timer = env.hunter_timer if env.ghost_hunter else 0
+            prev  = index[env.prev_pos] if env.prev_pos is not None else -1
+            prev2 = index[env.prev2_pos] if env.prev2_pos is not None else -1
+            score, steps, done, i = env.score, env.steps, False, 0
+
+        pellets = int.from_bytes(np.packbits(pellet_mask, bitorder="little").tobytes(), "little")
+        if isinstance(team, GhostTeam):
+            ghosts = tuple(pack_ghost(int(team.pos[i, g]), int(team.mode[i, g]),
+                                      int(team.counter[i, g]), int(team.wander[i, g]))
+                           for g in range(len(team)))
+            dr, dc = (int(d) for d in team.pac_dir[i])
+        else:                        # Ghost objects
+            names = [PERSONALITIES[k] for k in self.kind]
+            if [g.name for g in team] != names:
+                raise ValueError(f"env's ghosts {[g.name for g in team]} aren't this model's {names}")
+            ghosts = tuple(pack_ghost(index[g.position], SCATTER if g.mode == "scatter" else CHASE,
+                                      g.mode_counter, g.wander_counter)
+                           for g in team)
+            dr = dc = 0
+            if prev2 >= 0:
+                dr = int(np.sign(self.rows[pacman] - self.rows[prev2]))
+                dc = int(np.sign(self.cols[pacman] - self.cols[prev2]))
+        return GameState(pacman, pellets, fruit, timer, ghosts, HEADINGS.index((dr, dc)),
+                         prev, prev2, score, steps, done, seed & 0xFFFFFFFFFFFFFFFF or 1, self)
+
+
+def step(state, action):
+    """Pure transition: (state, action) -> (next_state, reward, done)."""
+    return state.model.step(state, action)
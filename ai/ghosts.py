@@ -1,8 +1,11 @@
 # ai/ghosts.py
 
 import random
+import numpy as np
 from maps.level1 import game_map
-from ai.search     import a_star
+from ai.maze_index import get_maze_index
+from ai.search import build_graph
+from ai import profiling
 
 # ─── FRAME COUNTERS ───────────────────────────────────────────────────────────
 # Now these are in *frames*, not seconds
@@ -61,31 +64,42 @@ class Ghost:
             return
 
         if self.mode == "scatter":
-            # once we reach the corner, start wandering
-            if self.position == self.scatter_target:
-                self.wander_counter = WANDER_FRAMES
-                return
-            # otherwise pathfind there
-            path = a_star(graph, self.position, self.scatter_target)
+            target = self.scatter_target
         else:  # chase
-            path = a_star(graph, self.position, pacman_pos)
+            target = pacman_pos
 
-        if path and len(path) > 1:
-            self.position = path[1]
+        # First step of a shortest path, looked up instead of searched.
+        # Corners that are walls on this map are headed for via the open
+        # tile nearest to them (MazeIndex.target_tree).
+        step = get_maze_index(graph).step_towards(self.position, target)
 
+        # once we reach the corner (or as close as the maze gets), start wandering
+        if self.mode == "scatter" and step == self.position:
+            self.wander_counter = WANDER_FRAMES
+            return
 
-def update_ghosts(graph, pacman_pos, ghost_hunter):
+        if step is not None:
+            self.position = step
+
+
+@profiling.timed("ghosts.move")
+def move_ghosts(ghost_list, graph, pacman_pos, ghost_hunter):
     """
-    Moves each ghost, and if collision+hunter, calls respawn().
+    Moves each ghost in ghost_list, and if collision+hunter, calls respawn().
     """
-    for ghost in ghosts:
-        old = ghost.position
+    for ghost in ghost_list:
         ghost.move_ghost(graph, pacman_pos)
 
         if ghost.position == pacman_pos and ghost_hunter:
             ghost.respawn()
 
-    return [g.position for g in ghosts]
+    return [g.position for g in ghost_list]
+
+def update_ghosts(graph, pacman_pos, ghost_hunter):
+    """
+    Moves the module-level ghosts (see move_ghosts).
+    """
+    return move_ghosts(ghosts, graph, pacman_pos, ghost_hunter)
 
 def reset_ghosts():
     """
@@ -95,6 +109,198 @@ def reset_ghosts():
     for g in ghosts:
         g.respawn()
 
+# ─── GhostTeam: every ghost of a batch of games in arrays ─────────────────────
+
+# Personalities, in the order 'G' tiles are handed out (row-major)
+BLINKY, PINKY, INKY, CLYDE = range(4)
+PERSONALITIES = ("Blinky", "Pinky", "Inky", "Clyde")
+
+# Modes stored in the int8 mode array
+SCATTER = 0
+CHASE   = 1
+
+CLYDE_RADIUS = 8   # Clyde gives up the chase inside this (straight-line) distance
+
+
+class GhostTeam:
+    """
+    The ghosts of one map for n_games games at once. Nothing is shared with
+    the module-level `ghosts` list, so any number of teams can run side by side.
+
+    One ghost per 'G' tile of game_map, or per (row, col) tile in starts
+    (snapped to the nearest open tile). Personalities (names or
+    BLINKY..CLYDE, one per ghost) default to the classic line-up in order:
+      - Blinky chases Pac-Man's tile
+      - Pinky  chases 4 tiles ahead of Pac-Man
+      - Inky   chases Blinky's position mirrored through 2 tiles ahead of Pac-Man
+      - Clyde  chases Pac-Man until he's within CLYDE_RADIUS, then heads home
+    and each scatters to its own corner of this map (Blinky top-right, Pinky
+    top-left, Inky bottom-right, Clyde bottom-left). Targets off the maze are
+    snapped to the nearest open tile, then looked up in the next_hop table.
+
+    Mode timers, wandering and respawning follow Ghost.move_ghost.
+    State (all node ids, row-major over open tiles):
+      - pos     : (N, G) ghost positions
+      - mode    : (N, G) SCATTER / CHASE
+      - counter : (N, G) frames left in the current mode
+      - wander  : (N, G) frames left wandering at a corner
+      - pac_dir : (N, 2) Pac-Man's last (drow, dcol), for Pinky and Inky
+    """
+    def __init__(self, game_map, n_games=1, personalities=None, rng=None, starts=None):
+        self.graph = build_graph(game_map)[0]
+        self.maze  = maze = get_maze_index(self.graph)
+        self.rng   = rng if rng is not None else np.random.default_rng()
+
+        # Nearest open tile to every board tile, for snapping off-maze targets
+        H, W = len(game_map), max(len(row) for row in game_map)
+        self.H, self.W = H, W
+        rr, cc = np.mgrid[0:H, 0:W]
+        manhattan = (np.abs(rr[..., None] - maze.rows) + np.abs(cc[..., None] - maze.cols))
+        self.snap = manhattan.argmin(axis=2).astype(np.int32)
+
+        tiles = starts if starts is not None else [
+            (r, c) for r, row in enumerate(game_map) for c, ch in enumerate(row) if ch == "G"]
+        G = len(tiles)
+        if personalities is None:
+            personalities = [i % len(PERSONALITIES) for i in range(G)]
+        if len(personalities) != G:
+            raise ValueError(f"{G} ghost tiles but {len(personalities)} personalities")
+        self.kind  = np.array([PERSONALITIES.index(p) if isinstance(p, str) else int(p)
+                               for p in personalities], dtype=np.int8)
+        self.names = [PERSONALITIES[k] for k in self.kind]
+        self.start = np.array([self.snap[t] for t in tiles], dtype=np.int32)
+
+        corners = [(1, W - 2), (1, 1), (H - 2, W - 2), (H - 2, 1)]
+        self.scatter_target = np.array([self.snap[corners[k]] for k in self.kind], dtype=np.int32)
+        blinkies = np.flatnonzero(self.kind == BLINKY)
+        self._blinky = int(blinkies[0]) if len(blinkies) else -1
+
+        N = self.n_games = n_games
+        self.pos      = np.empty((N, G), dtype=np.int32)
+        self.mode     = np.empty((N, G), dtype=np.int8)
+        self.counter  = np.empty((N, G), dtype=np.int32)
+        self.wander   = np.empty((N, G), dtype=np.int32)
+        self.pac_dir  = np.zeros((N, 2), dtype=np.int32)
+        self._pac_last = np.empty(N, dtype=np.int32)
+        self.reset()
+
+    def __len__(self):
+        return len(self.start)
+
+    def reset(self, game_ids=None):
+        """All ghosts of the given games (default: all) back home in scatter mode."""
+        ids = slice(None) if game_ids is None else np.asarray(game_ids)
+        self.pos[ids]       = self.start
+        self.mode[ids]      = SCATTER
+        self.counter[ids]   = SCATTER_FRAMES
+        self.wander[ids]    = 0
+        self.pac_dir[ids]   = 0
+        self._pac_last[ids] = -1
+
+    def chase_targets(self, pacman):
+        """(N, G) node each ghost heads for in chase mode."""
+        maze = self.maze
+        pr, pc = maze.rows[pacman][:, None], maze.cols[pacman][:, None]
+        dr, dc = self.pac_dir[:, :1], self.pac_dir[:, 1:]
+        kind = self.kind[None, :]
+
+        row = np.broadcast_to(pr, self.pos.shape).copy()
+        col = np.broadcast_to(pc, self.pos.shape).copy()
+
+        # Pinky: 4 ahead
+        pinky = kind == PINKY
+        row = np.where(pinky, pr + 4 * dr, row)
+        col = np.where(pinky, pc + 4 * dc, col)
+
+        # Inky: double the vector from Blinky (or himself, if there's no Blinky) to 2 ahead
+        inky = kind == INKY
+        if inky.any():
+            ref = self.pos[:, [self._blinky]] if self._blinky >= 0 else self.pos
+            row = np.where(inky, 2 * (pr + 2 * dr) - maze.rows[ref], row)
+            col = np.where(inky, 2 * (pc + 2 * dc) - maze.cols[ref], col)
+
+        target = self.snap[np.clip(row, 0, self.H - 1), np.clip(col, 0, self.W - 1)]
+
+        # Clyde: back to his corner when he gets close
+        clyde = kind == CLYDE
+        if clyde.any():
+            gr, gc = maze.rows[self.pos], maze.cols[self.pos]
+            near = (gr - pr) ** 2 + (gc - pc) ** 2 < CLYDE_RADIUS ** 2
+            target = np.where(clyde & near, self.scatter_target[None, :], target)
+        return target
+
+    @profiling.timed("ghosts.team_step")
+    def step(self, pacman, hunter):
+        """
+        Move every ghost one tick.
+        pacman: (N,) Pac-Man node ids (after his move), hunter: (N,) power-mode flags.
+        Returns pos, the (N, G) new ghost positions (updated in place).
+        """
+        maze = self.maze
+        pos  = self.pos
+        pacman = np.asarray(pacman)
+
+        # Remember which way Pac-Man last moved
+        moved = (self._pac_last >= 0) & (pacman != self._pac_last)
+        if moved.any():
+            last = self._pac_last[moved]
+            self.pac_dir[moved, 0] = np.sign(maze.rows[pacman[moved]] - maze.rows[last])
+            self.pac_dir[moved, 1] = np.sign(maze.cols[pacman[moved]] - maze.cols[last])
+        self._pac_last[:] = pacman
+
+        # Count down the mode timer and flip scatter <-> chase when it runs out
+        self.counter -= 1
+        flip = self.counter <= 0
+        to_chase   = flip & (self.mode == SCATTER)
+        to_scatter = flip & (self.mode == CHASE)
+        self.mode[to_chase]       = CHASE
+        self.counter[to_chase]    = CHASE_FRAMES
+        self.mode[to_scatter]     = SCATTER
+        self.counter[to_scatter]  = SCATTER_FRAMES
+
+        # Wandering ghosts take a random neighbour
+        wander = self.wander > 0
+        self.wander[wander] -= 1
+        deg  = maze.deg[pos]
+        pick = (self.rng.random(pos.shape) * deg).astype(np.int32)
+        random_step = np.where(deg > 0, maze.adj[pos, pick], pos)
+
+        # Scatter ghosts sitting on their corner start wandering (no move this tick)
+        scatter = self.mode == SCATTER
+        target  = np.where(scatter, self.scatter_target[None, :], self.chase_targets(pacman))
+        arrived = ~wander & scatter & (pos == target)
+        self.wander[arrived] = WANDER_FRAMES
+
+        # Everyone else takes one step along a shortest path to their target
+        hop = maze.next_hop[pos, target]
+        path_step = np.where(hop >= 0, hop, pos)
+        new_pos = np.where(wander, random_step, np.where(arrived, pos, path_step))
+
+        # Hunted ghosts that land on Pac-Man go back to their house
+        eaten = np.asarray(hunter)[:, None] & (new_pos == pacman[:, None])
+        new_pos[eaten] = np.broadcast_to(self.start, pos.shape)[eaten]
+        self.mode[eaten]    = SCATTER
+        self.counter[eaten] = SCATTER_FRAMES
+        self.wander[eaten]  = 0
+
+        pos[:] = new_pos
+        return pos
+
+    # ─── Single-game helpers (tuple positions, like move_ghosts) ──────────────
+
+    def positions(self, game=0):
+        """Ghost tiles of one game as (row, col) tuples."""
+        nodes = self.maze.nodes
+        return [nodes[v] for v in self.pos[game]]
+
+    def move(self, pacman_pos, ghost_hunter):
+        """move_ghosts for a one-game team: takes and returns (row, col) tiles."""
+        if self.n_games != 1:
+            raise ValueError("move() is for single-game teams, use step() for batches")
+        self.step(np.array([self.maze.index[pacman_pos]]), np.array([ghost_hunter]))
+        return self.positions()
+
+
 # Instantiate your ghosts
 ghosts = [
     Ghost("Blinky", (1, len(game_map[1]) - 2)),
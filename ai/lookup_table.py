@@ -1,13 +1,50 @@
 # ai/lookup_table.py
 
 import os
-import pickle
-from collections import deque
+import struct
+import hashlib
+from collections import deque, OrderedDict
+
+import numpy as np
+
+from ai.maze_index import MazeIndex, graph_from_tiles
 
 # ─── Paths ─────────────────────────────────────────────────────────────────────
 BASE_DIR      = os.path.abspath(os.path.dirname(__file__))
 DATA_DIR      = os.path.join(BASE_DIR, '..', 'data')
-DEFAULT_FILE  = os.path.join(DATA_DIR, 'distance_lookup.pkl')
+DEFAULT_FILE  = os.path.join(DATA_DIR, 'distance_lookup.bin')
+LOOKUP_DIR    = os.path.join(DATA_DIR, 'lookup')   # one file per map layout
+
+# ─── On-disk format ────────────────────────────────────────────────────────────
+# [header][node table: V × (row, col) uint16][distances: V × V uint16, row-major]
+# Header = magic, format version, sha1 of the map layout, node count.
+# Unreachable pairs are stored as 0xFFFF, which reads back as -1 through an
+# int16 view, so the memory-mapped array drops straight into MazeIndex.dist.
+MAGIC          = b"PMLT"
+FORMAT_VERSION = 1
+HEADER         = struct.Struct("<4sH20sI")
+UNREACHABLE    = 0xFFFF
+
+
+def layout_hash(nodes):
+    """
+    sha1 digest of a maze's open tiles. Distances only depend on which tiles
+    are open, so pellets / fruit / spawn markers don't change the hash.
+    """
+    tiles = np.asarray(sorted(nodes), dtype=np.uint16)
+    return hashlib.sha1(tiles.tobytes()).digest()
+
+
+def open_tiles(game_map):
+    """Every non-wall (row, col) of a map, i.e. the nodes build_graph creates."""
+    return [(r, c)
+            for r, row in enumerate(game_map)
+            for c, ch in enumerate(row) if ch != "#"]
+
+
+def map_hash(game_map):
+    """layout_hash of a map given as its list of row strings."""
+    return layout_hash(open_tiles(game_map))
 
 
 def compute_distance_lookup(graph):
@@ -35,44 +72,145 @@ def compute_distance_lookup(graph):
 
 def save_lookup_table(lookup_table, filename=None):
     """
-    Save the lookup_table to disk using pickle.
-    Defaults to 'data/distance_lookup.pkl'.
+    Save the lookup_table (as built by compute_distance_lookup) in the binary
+    format above. Defaults to 'data/distance_lookup.bin'.
     """
+    nodes = sorted(lookup_table)
+    index = {pos: i for i, pos in enumerate(nodes)}
+
+    dist = np.full((len(nodes), len(nodes)), UNREACHABLE, dtype=np.uint16)
+    for start, row in lookup_table.items():
+        s = index[start]
+        for dest, d in row.items():
+            dist[s, index[dest]] = d
+
     # ensure data dir exists
     out = filename or DEFAULT_FILE
     os.makedirs(os.path.dirname(out), exist_ok=True)
 
     with open(out, 'wb') as f:
-        pickle.dump(lookup_table, f)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, layout_hash(nodes), len(nodes)))
+        f.write(np.asarray(nodes, dtype='<u2').tobytes())
+        f.write(dist.astype('<u2').tobytes())
 
 
-def load_lookup_table(filename=None):
+def load_lookup_table(filename=None, game_map=None):
     """
-    Load the lookup table from disk.
-    Returns the dict, or None if the file doesn’t exist.
+    Memory-map the lookup table from disk and wrap it in a MazeIndex.
+    Only the header and node table are actually read; the distance pages are
+    shared between every process that maps the same file.
+
+    If game_map is given, a file built for a different layout raises
+    ValueError rather than quietly serving the wrong distances.
+    Returns None if the file doesn't exist.
     """
     inp = filename or DEFAULT_FILE
+    return _open_table(inp, map_hash(game_map) if game_map is not None else None)
+
+
+def _open_table(inp, expected_hash):
+    """load_lookup_table against a raw layout digest (None = don't check)."""
     try:
         with open(inp, 'rb') as f:
-            return pickle.load(f)
+            magic, version, digest, n_nodes = HEADER.unpack(f.read(HEADER.size))
+            nodes = np.frombuffer(f.read(4 * n_nodes), dtype='<u2').reshape(-1, 2)
     except FileNotFoundError:
         return None
 
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{inp}: not a version {FORMAT_VERSION} lookup table")
+    if expected_hash is not None and digest != expected_hash:
+        raise ValueError(f"{inp}: lookup table was built for a different map")
+
+    dist = np.memmap(inp, dtype='<u2', mode='r',
+                     offset=HEADER.size + 4 * n_nodes,
+                     shape=(n_nodes, n_nodes))
+
+    nodes = [tuple(int(x) for x in rc) for rc in nodes]
+    return MazeIndex.from_distances(nodes, dist.view('<i2'))
+
+
+class LookupCache:
+    """
+    Distance tables for every map we've played, keyed by layout hash.
+
+    A table is looked for in memory first (LRU of the last `max_maps` layouts),
+    then at <directory>/<hash>.bin, and only built with compute_distance_lookup
+    when neither has it. Fresh tables are written to disk so the next process
+    (or the next map switch) just memory-maps them.
+    """
+    def __init__(self, directory=LOOKUP_DIR, max_maps=8):
+        self.directory = directory
+        self.max_maps  = max_maps
+        self._tables   = OrderedDict()   # digest -> MazeIndex
+
+    def get(self, game_map):
+        """MazeIndex for a map given as its list of row strings."""
+        tiles = open_tiles(game_map)
+        return self._get(layout_hash(tiles), tiles)
+
+    def for_graph(self, graph):
+        """MazeIndex for an adjacency dict built by build_graph."""
+        return self._get(layout_hash(graph), graph)
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest.hex() + '.bin')
+
+    def _get(self, digest, tiles):
+        table = self._tables.get(digest)
+        if table is not None:
+            self._tables.move_to_end(digest)
+            return table
+
+        path = self.path_for(digest)
+        try:
+            table = _open_table(path, digest)
+        except ValueError:
+            table = None   # corrupt or stale file: rebuild it below
+        if table is None:
+            table = self._build(digest, tiles, path)
+
+        self._tables[digest] = table
+        if len(self._tables) > self.max_maps:
+            self._tables.popitem(last=False)
+        return table
+
+    def _build(self, digest, tiles, path):
+        graph  = graph_from_tiles(tiles)
+        lookup = compute_distance_lookup(graph)
+
+        # Write to a private temp file and rename, so parallel workers that
+        # build the same map at once never see a half-written table.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            save_lookup_table(lookup, tmp)
+            os.replace(tmp, path)
+            return _open_table(path, digest)
+        except OSError:
+            # Read-only or full data dir: keep the table in memory only
+            return MazeIndex(graph)
+        finally:
+            # Don't leave a half-written table behind if the save failed
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+# Shared by search.heuristic, get_maze_index and the training scripts
+lookup_cache = LookupCache()
+
 
 if __name__ == "__main__":
     # If you run `python -m ai.lookup_table`, this will:
-    # 1) Build the graph from level1
-    # 2) Compute the BFS lookup
-    # 3) Save it under data/distance_lookup.pkl
-    # 4) Reload and print a sample entry
-    from ai.search     import build_graph
-    from maps.level1   import game_map
-
-    graph, _, _    = build_graph(game_map)
-    lookup_table   = compute_distance_lookup(graph)
-    save_lookup_table(lookup_table)
-
-    loaded = load_lookup_table()
-    print("Lookup Table Loaded. Sample entry:")
-    sample = next(iter(loaded))
-    print(f"From node {sample}: {loaded[sample]}")
+    # 1) Build (or load) the lookup table of every bundled map
+    # 2) Save them under data/lookup/<hash>.bin
+    # 3) Print a sample entry of each
+    from maps.level1 import game_map as level1
+    from maps.level2 import game_map as level2
+
+    for name, game_map in (("level1", level1), ("level2", level2)):
+        loaded = lookup_cache.get(game_map)
+        print(f"{name}: {lookup_cache.path_for(map_hash(game_map))}")
+        sample = loaded.nodes[0]
+        print(f"  From node {sample}: {dict(zip(loaded.nodes[:10], loaded.dist[0, :10].tolist()))} ...")
@@ -0,0 +1,238 @@
+# ai/maze_index.py
+
+import numpy as np
+from collections import OrderedDict
+
+# Neighbour order used by ai.search.build_graph (right, left, down, up)
+MOVES = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+# How many off-maze targets keep their BFS tree around (see target_tree)
+TARGET_TREES = 64
+
+
+def graph_from_tiles(tiles):
+    """Adjacency dict over a set of open tiles, laid out exactly like build_graph's."""
+    open_tiles = set(tiles)
+    return {
+        (r, c): [(r + dr, c + dc) for dr, dc in MOVES if (r + dr, c + dc) in open_tiles]
+        for r, c in sorted(open_tiles)
+    }
+
+
+class MazeIndex:
+    """
+    All-pairs shortest paths for one maze, built once and queried in O(1).
+
+    Nodes are the graph's open tiles numbered in row-major order, and:
+      - dist[s, t]     : int16 shortest path length (-1 if unreachable)
+      - next_hop[s, t] : int16 id of the first node on a shortest path from
+                         s to t (s itself when s == t, -1 if unreachable)
+      - adj[v, :deg[v]]: neighbour ids of v, in the graph's own order
+
+    Full paths are rebuilt by following next_hop, so they have the same length
+    as the one a_star finds (ties between equally short routes may differ).
+    Targets that aren't open tiles get a BFS tree of their own instead
+    (target_tree), kept in a small LRU.
+
+    `dist` can be handed in precomputed (e.g. memory-mapped from a lookup file).
+    next_hop is only built the first time a caller needs it, so distance-only
+    users never touch more of the matrix than they query.
+    """
+    def __init__(self, graph, dist=None):
+        self.nodes = sorted(graph)
+        self.index = {pos: i for i, pos in enumerate(self.nodes)}
+        V = len(self.nodes)
+
+        self.adj = np.zeros((V, 4), dtype=np.int16)
+        self.deg = np.zeros(V, dtype=np.int16)
+        for v, pos in enumerate(self.nodes):
+            nbrs = [self.index[n] for n in graph[pos]]
+            self.deg[v] = len(nbrs)
+            self.adj[v, :len(nbrs)] = nbrs
+            self.adj[v, len(nbrs):] = v  # pad with self so gathers stay in range
+
+        self.dist      = self._all_pairs_bfs() if dist is None else dist
+        self._next_hop = None
+
+        # Plain-Python views for the search loops (list indexing beats NumPy scalars)
+        self.neighbours = [[self.index[n] for n in graph[pos]] for pos in self.nodes]
+        self.rows = np.array([r for r, _ in self.nodes], dtype=np.int32)
+        self.cols = np.array([c for _, c in self.nodes], dtype=np.int32)
+        self._h_rows = {}   # goal -> heuristic_row(goal), filled on demand
+        self._trees  = OrderedDict()   # off-maze target -> target_tree(target)
+
+    @classmethod
+    def from_distances(cls, nodes, dist):
+        """Rebuild the index for a maze known only by its open tiles and distance matrix."""
+        return cls(graph_from_tiles(nodes), dist)
+
+    def _all_pairs_bfs(self):
+        """
+        BFS from every node at once: row s of `frontier` is the BFS frontier
+        of source s, and one gather through adj expands all of them a level.
+        """
+        V = len(self.nodes)
+        dist     = np.full((V, V), -1, dtype=np.int16)
+        reached  = np.eye(V, dtype=bool)
+        frontier = reached.copy()
+        dist[reached] = 0
+
+        d = 0
+        while frontier.any():
+            d += 1
+            frontier = frontier[:, self.adj].any(axis=2) & ~reached
+            dist[frontier] = d
+            reached |= frontier
+
+        return dist
+
+    @property
+    def next_hop(self):
+        if self._next_hop is None:
+            self._next_hop = self._next_hops()
+        return self._next_hop
+
+    def _next_hops(self):
+        """
+        First step from s towards t: the first neighbour (in graph order)
+        that is one step closer to t.
+        """
+        V = len(self.nodes)
+        dist     = self.dist
+        next_hop = np.full((V, V), -1, dtype=np.int16)
+        closer   = dist - 1
+
+        # Walk neighbour slots backwards so the earliest slot wins ties
+        for k in reversed(range(self.adj.shape[1])):
+            cand  = self.adj[:, k]
+            valid = (k < self.deg)[:, None] & (dist > 0)
+            ok    = valid & (dist[cand, :] == closer)
+            next_hop = np.where(ok, cand[:, None], next_hop)
+
+        next_hop[np.arange(V), np.arange(V)] = np.arange(V)
+        return next_hop
+
+    def target_tree(self, target):
+        """
+        Next-hop column for a target that needn't be an open tile (a corner
+        in the wall, a tile in front of Pac-Man that runs off the maze...).
+        Such a target is reached by getting to the open tile(s) closest to it
+        by Manhattan distance; tree[v] is the first node on the way there from
+        v (v itself once it's there, -1 if none is reachable). Open-tile
+        targets just return their next_hop column.
+        The last TARGET_TREES off-maze targets are cached, least recent out.
+        """
+        t = self.index.get(target)
+        if t is not None:
+            return self.next_hop[:, t]
+
+        tree = self._trees.get(target)
+        if tree is not None:
+            self._trees.move_to_end(target)
+            return tree
+
+        tree = self._trees[target] = self._target_tree(target)
+        if len(self._trees) > TARGET_TREES:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _target_tree(self, target):
+        manhattan = np.abs(self.rows - target[0]) + np.abs(self.cols - target[1])
+        goals = np.flatnonzero(manhattan == manhattan.min())
+
+        # Distance from every node to the nearest goal (one multi-source BFS)
+        d = self.dist[:, goals].astype(np.int32)
+        d[d < 0] = np.iinfo(np.int32).max
+        d = d.min(axis=1)
+        unreachable = d == np.iinfo(np.int32).max
+
+        # Same tie-break as _next_hops: the earliest neighbour slot that's closer
+        V = len(self.nodes)
+        tree = np.full(V, -1, dtype=np.int16)
+        for k in reversed(range(self.adj.shape[1])):
+            cand = self.adj[:, k]
+            ok   = (k < self.deg) & (d[cand] == d - 1) & ~unreachable
+            tree = np.where(ok, cand, tree)
+        tree[goals] = goals
+        tree[unreachable] = -1
+        return tree
+
+    def heuristic_row(self, goal):
+        """
+        Estimated distance from every node to goal, as a list indexed by node id:
+        the exact maze distance, or Manhattan where the goal can't be reached.
+        Rows are cached per goal, since searches keep heading for the same tiles.
+        """
+        row = self._h_rows.get(goal)
+        if row is None:
+            row = self._h_rows[goal] = self._heuristic_row(goal)
+        return row
+
+    def _heuristic_row(self, goal):
+        manhattan = np.abs(self.rows - goal[0]) + np.abs(self.cols - goal[1])
+        t = self.index.get(goal)
+        if t is None:
+            return manhattan.tolist()
+        col = self.dist[:, t]
+        return np.where(col >= 0, col, manhattan).tolist()
+
+    # ─── Queries on (row, col) positions ──────────────────────────────────────
+    # Like a_star, a target that isn't an open tile simply counts as unreachable.
+
+    def distance(self, a, b):
+        """Shortest path length from a to b, or -1 if b can't be reached."""
+        t = self.index.get(b)
+        return int(self.dist[self.index[a], t]) if t is not None else -1
+
+    def path_len(self, a, b):
+        """
+        Number of tiles on the shortest path, both ends included.
+        Drop-in for len(a_star(graph, a, b)): 0 when b is unreachable.
+        """
+        return self.distance(a, b) + 1
+
+    def next_step(self, a, b):
+        """First tile to move to when heading from a to b (a if already there, None if unreachable)."""
+        t = self.index.get(b)
+        hop = self.next_hop[self.index[a], t] if t is not None else -1
+        return self.nodes[hop] if hop >= 0 else None
+
+    def step_towards(self, a, target):
+        """
+        next_step for any target tile, on the maze or not: off-maze targets
+        are headed for via their (cached) target_tree. O(1) once cached.
+        """
+        t = self.index.get(target)
+        s = self.index[a]
+        hop = self.next_hop[s, t] if t is not None else self.target_tree(target)[s]
+        return self.nodes[hop] if hop >= 0 else None
+
+    def path(self, a, b):
+        """Shortest path from a to b as a list of tiles (a and b included), [] if unreachable."""
+        s, t = self.index[a], self.index.get(b)
+        if t is None or self.dist[s, t] < 0:
+            return []
+        path = [a]
+        while s != t:
+            s = self.next_hop[s, t]
+            path.append(self.nodes[s])
+        return path
+
+
+# ─── Per-graph lookup ─────────────────────────────────────────────────────────
+# Graphs get rebuilt every episode by get_initial_path; the shared LookupCache
+# recognises the maze from its open tiles, and we keep a fast path for callers
+# that keep passing the very same graph object.
+_last = (None, None)
+
+def get_maze_index(graph):
+    """Return the MazeIndex for this graph's maze (built and cached on first use)."""
+    global _last
+    if _last[0] is graph:
+        return _last[1]
+
+    from ai.lookup_table import lookup_cache  # lookup_table imports this module
+    index = lookup_cache.for_graph(graph)
+
+    _last = (graph, index)
+    return index
@@ -0,0 +1,239 @@
+# ai/mcts.py
+
+import math
+import time
+import random
+import multiprocessing as mp
+
+from ai.game_state import GameModel, GameState
+
+# Fields that tell two states apart for tree reuse (not score, steps or seed)
+_KEY_FIELDS = slice(0, 8)
+
+
+def state_key(state):
+    return state[_KEY_FIELDS]
+
+
+class Node:
+    """One state in the search tree, reached from its parent by `action`."""
+    __slots__ = ("state", "action", "reward", "children", "untried", "visits", "total")
+
+    def __init__(self, state, action=None, reward=0.0, legal=()):
+        self.state    = state
+        self.action   = action
+        self.reward   = reward        # reward collected on the edge into this node
+        self.children = {}            # action -> Node
+        self.untried  = list(legal)   # actions not expanded yet
+        self.visits   = 0
+        self.total    = 0.0           # sum of discounted returns from this node's edge on
+
+    def value(self):
+        return self.total / self.visits if self.visits else 0.0
+
+
+class MCTSAgent:
+    """
+    UCT search over GameModel's pure step function.
+
+    Every decision runs until the budget is spent:
+      - iterations: number of select / expand / rollout / backup passes
+      - time_ms:    wall-clock milliseconds per move; no iteration starts
+                    that the mean one so far says won't finish in time,
+                    but the first always runs
+    (either or both; with neither, 200 iterations). Rollouts play random
+    moves that don't reverse, for up to rollout_depth ticks.
+
+    The subtree under the chosen move is kept and becomes the next root
+    when the state we're handed next matches the one we predicted (ghosts
+    that wander at random can make it differ, in which case we start over).
+
+    workers > 1 runs root-parallel search: each worker process keeps its own
+    tree with its own seed, gets the same budget, and root visit counts are
+    summed to pick the move. Call close() (or use `with`) to stop them.
+
+    The agent plans with its own random seed in place of the game's, so it
+    never peeks at how the real ghosts will wander.
+    """
+    def __init__(self, model, iterations=None, time_ms=None, rollout_depth=20,
+                 gamma=0.97, c=1.4, reward_scale=100.0, workers=1, seed=0):
+        if iterations is None and time_ms is None:
+            iterations = 200
+        self.model         = model
+        self.iterations    = iterations
+        self.time_ms       = time_ms
+        self.rollout_depth = rollout_depth
+        self.gamma         = gamma
+        self.c             = c * reward_scale   # exploration in reward units
+        self.rng           = random.Random(seed)
+        self.root          = None
+        self.last_iterations = 0
+
+        self.workers = []
+        if workers > 1:
+            self._start_workers(workers, seed)
+
+    # ─── Public API ──────────────────────────────────────────────────────────
+
+    def choose_action(self, state):
+        """Best ACTIONS index from state, within the budget."""
+        if self.workers:
+            return self._choose_parallel(state)
+        visits = self.search(state)
+        action = max(visits, key=visits.get)
+        self.advance(action)
+        return action
+
+    def search(self, state):
+        """
+        Grow the tree from state for one budget.
+        Returns {action: root visit count}.
+        """
+        deadline = (time.perf_counter() + self.time_ms / 1000) if self.time_ms else None
+        root = self._root_for(state)
+        # Stop once the mean iteration so far no longer fits before the deadline
+        n, now = 0, time.perf_counter()
+        t0 = now
+        while (self.iterations is None or n < self.iterations) and \
+              (deadline is None or now + (now - t0) / max(n, 1) < deadline):
+            self._iterate(root)
+            n += 1
+            now = time.perf_counter()
+        self.last_iterations = n
+
+        visits = {a: child.visits for a, child in root.children.items()}
+        if not visits:   # budget too small to expand anything: any legal move
+            visits = {a: 0 for a in root.untried}
+        self.root = root
+        return visits
+
+    def advance(self, action):
+        """Keep the subtree under `action` for the next search (done by choose_action)."""
+        self.root = self.root.children.get(action) if self.root is not None else None
+
+    def reset(self):
+        """Forget the tree, e.g. at the start of an episode."""
+        self.root = None
+
+    def close(self):
+        for conn, proc in self.workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):   # worker already gone
+                pass
+            proc.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Search ──────────────────────────────────────────────────────────────
+
+    def _root_for(self, state):
+        """Reuse the kept subtree if it's this state, otherwise start afresh."""
+        root = self.root
+        if root is not None and state_key(root.state) == state_key(state):
+            root.action, root.reward = None, 0.0
+            return root
+        state = state._replace(seed=self.rng.getrandbits(64) or 1)
+        return Node(state, legal=self.model.legal_actions(state))
+
+    def _iterate(self, root):
+        model, gamma = self.model, self.gamma
+
+        # 1) Select: descend through fully expanded nodes by UCB1
+        node, path = root, [root]
+        while not node.untried and node.children and not node.state.done:
+            log_n = math.log(node.visits)
+            c = self.c
+            node = max(node.children.values(),
+                       key=lambda ch: ch.total / ch.visits + c * math.sqrt(log_n / ch.visits))
+            path.append(node)
+
+        # 2) Expand one untried move
+        if node.untried and not node.state.done:
+            action = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child_state, reward, done = model.step(node.state, action)
+            child = Node(child_state, action, reward,
+                         () if done else model.legal_actions(child_state))
+            node.children[action] = child
+            node = child
+            path.append(node)
+
+        # 3) Rollout, 4) back the discounted return up the path
+        ret = self._rollout(node.state)
+        for n in reversed(path):
+            ret = n.reward + gamma * ret
+            n.visits += 1
+            n.total  += ret
+
+    def _rollout(self, state):
+        """Random non-reversing playout; returns the discounted return from state."""
+        model, rng, gamma = self.model, self.rng, self.gamma
+        ret, discount = 0.0, 1.0
+        for _ in range(self.rollout_depth):
+            if state.done:
+                break
+            moves = model.legal_actions(state)
+            if len(moves) > 1:
+                moves = [a for a in moves if model.move[state.pacman][a] != state.prev2] or moves
+            state, reward, _ = model.step(state, rng.choice(moves))
+            ret += discount * reward
+            discount *= gamma
+        return ret
+
+    # ─── Root-parallel workers ───────────────────────────────────────────────
+
+    def _start_workers(self, n, seed):
+        params = dict(iterations=self.iterations, time_ms=self.time_ms,
+                      rollout_depth=self.rollout_depth, gamma=self.gamma,
+                      c=self.c, reward_scale=1.0)
+        model = self.model
+        starts = [model.nodes[v] for v in model.ghost_start]
+        for w in range(n):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_worker, daemon=True,
+                              args=(child, model.game_map, model.hunter_duration,
+                                    model.points, [int(k) for k in model.kind], starts,
+                                    params, seed * 1000 + w + 1))
+            proc.start()
+            self.workers.append((parent, proc))
+
+    def _choose_parallel(self, state):
+        # The model stays behind: workers built their own copy once at start-up
+        fields = tuple(state[:-1])
+        for conn, _ in self.workers:
+            conn.send(("search", fields))
+        totals = {}
+        self.last_iterations = 0
+        for i, (conn, _) in enumerate(self.workers):
+            try:
+                visits, iterations = conn.recv()
+            except EOFError:
+                raise RuntimeError(f"MCTS worker {i} exited") from None
+            self.last_iterations += iterations
+            for a, v in visits.items():
+                totals[a] = totals.get(a, 0) + v
+        action = max(totals, key=totals.get)
+        for conn, _ in self.workers:
+            conn.send(("advance", action))
+        return action
+
+
+def _worker(conn, game_map, hunter_duration, points, personalities, starts, params, seed):
+    """Root-parallel worker: a serial MCTSAgent answering search requests."""
+    model = GameModel(game_map, personalities, hunter_duration, points, starts)
+    agent = MCTSAgent(model, seed=seed, **params)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        kind, arg = msg
+        if kind == "advance":
+            agent.advance(arg)
+            continue
+        visits = agent.search(GameState(*arg, model))
+        conn.send((visits, agent.last_iterations))
@@ -1,8 +1,13 @@
 from ai.search import smarter_a_star, build_graph, compute_partial_mst
+from ai.maze_index import get_maze_index
+from ai.danger import DangerField, NO_GHOST
 from game.settings import TILE_SIZE
 from maps.level1 import game_map
+from ai import profiling
 import heapq
+from collections import deque
 from heapq import heappop, heappush  # Min-heap for priority queue
+import numpy as np
 
 def get_initial_path(game_map):
     """ Initializes the game and gets Pac-Man's starting path """
@@ -31,81 +36,125 @@ def find_frontiers(graph, visited):
 
     return frontiers
 
-def get_exploration_path(graph, pacman_pos, visited, ghost_positions, food_positions, super_fruit_pos=None):
+class FrontierTracker:
+    """
+    Keeps the set of unexplored tiles (frontiers) up to date as Pac-Man visits
+    them, instead of rescanning the whole graph every frame.
+
+    Frontiers are a bytearray over MazeIndex node ids, so nearest() can run a
+    single BFS out from Pac-Man and stop at the first unexplored tile it meets.
+    """
+    def __init__(self, graph, visited=()):
+        self.graph = graph
+        self.maze  = get_maze_index(graph)
+        self.unexplored = bytearray([1]) * len(self.maze.nodes)
+        self.remaining  = len(self.maze.nodes)
+        for pos in visited:
+            self.visit(pos)
+
+    def visit(self, pos):
+        """Mark one tile as explored."""
+        v = self.maze.index.get(pos)
+        if v is not None and self.unexplored[v]:
+            self.unexplored[v] = 0
+            self.remaining -= 1
+
+    def frontiers(self):
+        """Same set find_frontiers(graph, visited) would return."""
+        return {self.maze.nodes[v] for v, left in enumerate(self.unexplored) if left}
+
+    @profiling.timed("search.frontier_nearest")
+    def nearest(self, start, avoid=()):
+        """
+        Closest reachable frontier to start (ties go to BFS order), skipping any
+        tile in avoid. Returns None when nothing unexplored can be reached.
+        """
+        if not self.remaining:
+            return None
+
+        maze    = self.maze
+        blocked = {maze.index[p] for p in avoid if p in maze.index}
+        s = maze.index[start]
+        seen  = bytearray(len(maze.nodes))
+        seen[s] = 1
+        queue = deque([s])
+
+        while queue:
+            current = queue.popleft()
+            if self.unexplored[current] and current not in blocked:
+                if profiling.ENABLED:
+                    profiling.count("search.frontier_nearest.expanded", seen.count(1) - len(queue))
+                return maze.nodes[current]
+            for nbr in maze.neighbours[current]:
+                if not seen[nbr]:
+                    seen[nbr] = 1
+                    queue.append(nbr)
+
+        if profiling.ENABLED:
+            profiling.count("search.frontier_nearest.expanded", seen.count(1))
+        return None
+
+@profiling.timed("search.exploration_path")
+def get_exploration_path(graph, pacman_pos, visited, ghost_positions, food_positions, super_fruit_pos=None,
+                         danger=None, frontier=None):
     """
     Determines the safest path to an unexplored frontier while avoiding ghosts.
+    danger:   this tick's DangerField (built here if not given)
+    frontier: a FrontierTracker kept in sync with visited (built here if not given)
     """
-    frontiers = find_frontiers(graph, visited)
-    if not frontiers:
-        return []  # If no frontiers left, the maze is fully explored
-
-    # Select the closest and safest frontier
-    safest_frontier = None
-    min_distance = float('inf')
-
-    for frontier in frontiers:
-        if frontier not in ghost_positions:  # Ensure we do not pick a ghost tile
-            # distance = abs(frontier[0] - pacman_pos[0]) + abs(frontier[1] - pacman_pos[1])
-            distance = len(a_star(graph, pacman_pos, frontier))
-            if distance < min_distance:
-                min_distance = distance
-                safest_frontier = frontier
-                # print("Safest frontier;", safest_frontier)
+    if frontier is None:
+        frontier = FrontierTracker(graph, visited)
+
+    # Select the closest unexplored tile that isn't a ghost tile
+    safest_frontier = frontier.nearest(pacman_pos, avoid=ghost_positions)
 
     # Use A* search to reach the safest unexplored tile
     if safest_frontier:
-        return smarter_a_star(graph, pacman_pos, {safest_frontier}, ghost_positions, game_map)
+        return smarter_a_star(graph, pacman_pos, {safest_frontier}, ghost_positions, game_map, danger=danger)
     
     return []
 
 from ai.search import a_star
 
-def escape_path(graph, pacman_pos, ghost_positions):
+@profiling.timed("search.escape_path")
+def escape_path(graph, pacman_pos, ghost_positions, danger=None):
     """
     Uses a modified A* search where tiles near ghosts have higher movement costs.
     Ensures Pac-Man prioritizes paths that avoid danger instead of just taking the shortest path.
+    danger: this tick's DangerField (built here if not given)
     """
-    danger_map = {}
-
-    # Assign dynamic weights to each tile based on proximity to ghosts
-    for ghost in ghost_positions:
-        for tile in graph.keys():  # Iterate over all valid tiles in the graph
-            if tile == ghost:
-                danger_map[tile] = float('inf')  # Ghost location is deadly
-            else:
-                ghost_distance = len(a_star(graph, tile, ghost))  # Use real movement distance
-
-                # Assign weights: Closer tiles to ghosts have higher penalties
-                if ghost_distance == 1:
-                    danger_map[tile] = 100  # Immediate danger
-                elif ghost_distance == 2:
-                    danger_map[tile] = 50  # High risk
-                elif ghost_distance <= 4:
-                    danger_map[tile] = 20  # Moderate risk
-                else:
-                    danger_map[tile] = 1  # Low risk, normal movement
-
-    # Modify A* to factor in danger weights
-    def weighted_heuristic(tile, goal):
-        return len(a_star(graph, tile, goal)) + danger_map.get(tile, 0)
-
-    # Find the safest tile (furthest from all ghosts)
-    safe_zones = [tile for tile in graph if tile not in danger_map or danger_map[tile] < 20]
-
-    if not safe_zones:
+    if danger is None:
+        danger = DangerField.for_graph(graph, ghost_positions, game_map)
+    index = danger.maze
+    from_pacman = index.dist[index.index[pacman_pos]]
+
+    # Tiles within 3 steps of the nearest ghost are too risky to run to
+    # (every tile in the field is scored against its *closest* ghost),
+    # and tiles Pac-Man can't get to are no escape at all
+    safe_zones = np.flatnonzero((danger.nearest > 3) & (from_pacman >= 0))
+
+    if len(safe_zones) == 0:
         return []  # No escape route available
 
-    # Pick the safest tile that is farthest from ghosts
-    best_escape_tile = max(safe_zones, key=lambda tile: min(len(a_star(graph, tile, ghost)) for ghost in ghost_positions))
+    # Tiles no ghost can reach all score NO_GHOST: run to the closest of those,
+    # else pick the safest tile, the one farthest from ghosts
+    out_of_reach = safe_zones[danger.nearest[safe_zones] == NO_GHOST]
+    if len(out_of_reach):
+        best = out_of_reach[np.argmin(from_pacman[out_of_reach])]
+    else:
+        best = safe_zones[np.argmax(danger.nearest[safe_zones])]
+    best_escape_tile = index.nodes[best]
 
     # Compute and return the best path to escape
-    return a_star(graph, pacman_pos, best_escape_tile)
+    return index.path(pacman_pos, best_escape_tile)
 
 # Used to find our path to the superfruit
-def risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_positions):
+@profiling.timed("search.risk_aware_bfs")
+def risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_positions, danger=None):
     """
     Uses Risk-Aware Best-First Search to guide Pac-Man towards the super fruit efficiently,
     while avoiding high-risk ghost areas.
+    danger: this tick's DangerField (built here if not given)
     """
     if not super_fruit_pos:
         return []  # No fruit available
@@ -114,25 +163,32 @@ def risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_pos
     open_set = []
     heapq.heappush(open_set, (0, pacman_pos))  # (priority, position)
 
+    if danger is None:
+        danger = DangerField.for_graph(graph, ghost_positions, game_map)
+    index = danger.maze
     came_from = {}  # Stores paths
     cost_so_far = {pacman_pos: 0}  # Stores cost to reach each position
+    expanded = 0
 
     while open_set:
         _, current = heapq.heappop(open_set)  # Get node with lowest priority
+        expanded += 1
 
         if current == super_fruit_pos:
+            profiling.count("search.risk_aware_bfs.expanded", expanded)
             # Reconstruct path
             path = []
             while current != pacman_pos:
                 path.append(current)
                 current = came_from[current]
+            path.append(pacman_pos)  # start tile first, like every other planner
             path.reverse()
             return path
 
         for neighbor in graph.get(current, []):
             # Calculate risk-aware heuristic
-            distance_to_fruit = len(a_star(graph, neighbor, super_fruit_pos))
-            ghost_penalty = sum(max(0, 5 - len(a_star(graph, neighbor, ghost))) for ghost in ghost_positions)
+            distance_to_fruit = index.path_len(neighbor, super_fruit_pos)
+            ghost_penalty = int(danger.proximity[index.index[neighbor]])
             food_bonus = -2 if neighbor in food_positions else 0  # Prioritize paths that include food
             
             priority = distance_to_fruit + ghost_penalty + food_bonus  # Total weighted cost
@@ -142,6 +198,7 @@ def risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_pos
                 came_from[neighbor] = current
                 heapq.heappush(open_set, (priority, neighbor))
 
+    profiling.count("search.risk_aware_bfs.expanded", expanded)
     return []  # No valid path found
 
 
@@ -0,0 +1,188 @@
+# ai/profiling.py
+#
+# Named timers and counters for finding out where a tick goes.
+# Off unless PACMAN_PROFILE is set when the process starts:
+#
+#   PACMAN_PROFILE=1 python train_dqn.py
+#   PACMAN_PROFILE=1 PACMAN_PROFILE_DIR=data/profile python -m ai.bench --policy rules
+#
+# While off, @timed hands the function back untouched and span()/count() do
+# nothing, so the hooks can stay on the hot paths for good.
+#
+# While on:
+#  - every @timed call, span() and tick() is recorded as a Chrome-trace event;
+#    end_episode() writes them to PACMAN_PROFILE_DIR/trace_epNNNNN.json
+#    (every PACMAN_PROFILE_EVERY-th episode) and clears them — open the file
+#    in chrome://tracing or ui.perfetto.dev for a per-tick flame chart
+#  - calls, total / max time and counters (e.g. nodes expanded per search)
+#    add up for the whole run: report() / print_report()
+
+import os
+import json
+import time
+import functools
+import contextlib
+
+ENABLED     = os.environ.get("PACMAN_PROFILE", "") not in ("", "0")
+PROFILE_DIR = os.environ.get("PACMAN_PROFILE_DIR", "data/profile")
+TRACE_EVERY = int(os.environ.get("PACMAN_PROFILE_EVERY", "1"))
+MAX_EVENTS  = 1_000_000   # per episode; later events are counted, not stored
+
+_timers   = {}    # name -> [calls, total_ns, max_ns]
+_counters = {}    # name -> total
+_events   = []    # Chrome "complete" events for the current episode
+_dropped  = 0
+_tick     = None  # start of the open "tick" event, see tick()
+_t0       = time.perf_counter_ns()
+_pid      = os.getpid()
+
+
+def _record(name, start, end):
+    global _dropped
+    dur = end - start
+    t = _timers.get(name)
+    if t is None:
+        _timers[name] = [1, dur, dur]
+    else:
+        t[0] += 1
+        t[1] += dur
+        if dur > t[2]:
+            t[2] = dur
+    if len(_events) < MAX_EVENTS:
+        # trace timestamps are microseconds since the profiler was loaded
+        _events.append((name, (start - _t0) / 1000, dur / 1000))
+    else:
+        _dropped += 1
+
+
+# ─── Hooks ───────────────────────────────────────────────────────────────────
+
+def timed(name):
+    """
+    Decorator: time every call as `name`.
+    Returns the function unchanged when profiling is off.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def _span(name):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter_ns())
+
+_NULL = contextlib.nullcontext()
+
+def span(name):
+    """`with span("tick"):` times a block (a shared no-op context when off)."""
+    return _span(name) if ENABLED else _NULL
+
+
+def tick():
+    """
+    Mark the start of a game tick: closes the previous "tick" event (if any)
+    and opens the next, so loops get one bar per tick without re-indenting.
+    end_episode() closes the last one.
+    """
+    global _tick
+    if ENABLED:
+        now = time.perf_counter_ns()
+        if _tick is not None:
+            _record("tick", _tick, now)
+        _tick = now
+
+
+def count(name, n=1):
+    """Add n to counter `name`. Callers that have to work out n should check ENABLED first."""
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+# ─── Output ──────────────────────────────────────────────────────────────────
+
+def trace_events():
+    """The current episode's events in Chrome trace format."""
+    return [{"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": _pid, "tid": 0}
+            for name, ts, dur in _events]
+
+
+def dump_trace(filename):
+    """Write the current episode's events as a Chrome-trace JSON file."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms",
+                   "otherData": {"dropped_events": _dropped}}, f)
+
+
+def end_episode(episode):
+    """
+    Call once per finished episode: writes its trace (every TRACE_EVERY-th
+    episode) and starts a fresh one. The aggregated totals carry on.
+    Returns the trace file written, if any.
+    """
+    global _dropped, _tick
+    if not ENABLED:
+        return None
+    if _tick is not None:
+        _record("tick", _tick, time.perf_counter_ns())
+        _tick = None
+    filename = None
+    if TRACE_EVERY > 0 and episode % TRACE_EVERY == 0:
+        filename = os.path.join(PROFILE_DIR, f"trace_ep{episode:05d}.json")
+        dump_trace(filename)
+    _events.clear()
+    _dropped = 0
+    return filename
+
+
+def report():
+    """
+    Totals so far:
+      {"timers":   {name: {calls, total_ms, mean_us, max_us}},
+       "counters": {name: total}}
+    """
+    timers = {}
+    for name, (calls, total, longest) in sorted(_timers.items(), key=lambda kv: -kv[1][1]):
+        timers[name] = {"calls":    calls,
+                        "total_ms": round(total / 1e6, 3),
+                        "mean_us":  round(total / calls / 1e3, 2),
+                        "max_us":   round(longest / 1e3, 2)}
+    return {"timers": timers, "counters": dict(sorted(_counters.items()))}
+
+
+def print_report():
+    if not ENABLED:
+        return
+    r = report()
+    print(f"{'timer':28s} {'calls':>9s} {'total ms':>10s} {'mean us':>9s} {'max us':>9s}")
+    for name, t in r["timers"].items():
+        print(f"{name:28s} {t['calls']:9d} {t['total_ms']:10.1f} "
+              f"{t['mean_us']:9.1f} {t['max_us']:9.1f}")
+    for name, total in r["counters"].items():
+        calls = _timers.get(name.rsplit(".", 1)[0], [0])[0]
+        per_call = f"  ({total / calls:.1f} per call)" if calls else ""
+        print(f"{name:28s} {total:9d}{per_call}")
+
+
+def reset():
+    """Forget all timers, counters and events."""
+    global _dropped, _tick
+    _timers.clear()
+    _counters.clear()
+    _events.clear()
+    _dropped = 0
+    _tick    = None
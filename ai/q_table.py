@@ -0,0 +1,114 @@
+# ai/q_table.py
+
+import random
+import numpy as np
+
+from ai.rl_utils import DIRECTIONS, N_STATES, pack_state, action_index
+
+
+class DenseQTable:
+    """
+    Tabular Q-values as one fixed float32 array of shape (N_STATES, 4):
+    rows are pack_state ids, columns are DIRECTIONS (N, E, S, W).
+    That's 128 KB however long we train, versus a dict-of-dicts that keeps
+    growing and splits a state's values across every tile it was seen on.
+
+    Methods take either make_state tuples or packed ids for states, and
+    direction indices for actions.
+
+    seen marks the entries the dict version would hold: moves that were
+    updated, and every valid move of a state choose_action exploited in.
+    The bootstrap max_a' Q[s'][a'] only looks at those (0.0 when there are
+    none), so never-tried moves don't pull negative values up to 0.
+    """
+    def __init__(self, values=None, seen=None):
+        if values is None:
+            values = np.zeros((N_STATES, len(DIRECTIONS)), dtype=np.float32)
+            seen   = np.zeros(values.shape, dtype=bool) if seen is None else seen
+        if values.shape != (N_STATES, len(DIRECTIONS)):
+            raise ValueError(f"Q-table must be {N_STATES}x{len(DIRECTIONS)}, got {values.shape}")
+        self.values = values
+        self.seen   = np.ones(values.shape, dtype=bool) if seen is None else seen
+
+    @staticmethod
+    def _id(state):
+        return state if isinstance(state, (int, np.integer)) else pack_state(state)
+
+    def _best_next(self, next_states):
+        """max over the seen moves of each next state (0.0 if none), like max(..., default=0.0)."""
+        q = np.where(self.seen[next_states], self.values[next_states], -np.inf).max(axis=-1)
+        return np.where(np.isfinite(q), q, 0.0).astype(np.float32)
+
+    # ─── Single steps (same semantics as rl_utils.choose_action / update_q) ──
+
+    def choose_action(self, pacman_pos, state, graph, epsilon):
+        """
+        Epsilon-greedy over the valid neighbour moves.
+        Returns the neighbour tile to move to, like rl_utils.choose_action.
+        """
+        valid = graph[pacman_pos]
+
+        # explore
+        if random.random() < epsilon:
+            return random.choice(valid)
+
+        # exploit: highest Q among the moves that don't hit a wall
+        # (which, as with the dict's setdefault, now count as seen)
+        s = self._id(state)
+        self.seen[s, [action_index(pacman_pos, n) for n in valid]] = True
+        row = self.values[s]
+        return max(valid, key=lambda n: row[action_index(pacman_pos, n)])
+
+    def update(self, state, action, reward, next_state, alpha, gamma):
+        """
+        Tabular Q-learning on one transition:
+          Q[s][a] += alpha * (reward + gamma * max_a' Q[s'][a'] - Q[s][a])
+        action is a DIRECTIONS index (see rl_utils.action_index).
+        """
+        s, n = self._id(state), self._id(next_state)
+        self.seen[s, action] = True
+        old = self.values[s, action]
+        self.values[s, action] = old + alpha * (reward + gamma * self._best_next(n) - old)
+
+    # ─── Batches ──────────────────────────────────────────────────────────────
+
+    def update_batch(self, states, actions, rewards, next_states, alpha, gamma, dones=None):
+        """
+        Q-learning on a batch of transitions given as arrays of packed ids,
+        action indices and rewards. Every TD error is taken from the table as
+        it was before the batch, and repeated (s, a) pairs add up, so this
+        matches a sequential update_q loop only when the pairs are distinct.
+        dones (optional) drops the bootstrap term for terminal transitions.
+        """
+        s = np.asarray(states)
+        a = np.asarray(actions)
+        self.seen[s, a] = True
+        best_next = self._best_next(np.asarray(next_states))
+        if dones is not None:
+            best_next = best_next * (1.0 - np.asarray(dones, dtype=np.float32))
+
+        td = np.asarray(rewards, dtype=np.float32) + gamma * best_next - self.values[s, a]
+        np.add.at(self.values, (s, a), alpha * td)
+
+    def greedy_batch(self, states, valid_mask=None):
+        """
+        Best action index for each packed state id. valid_mask, an (N, 4)
+        bool array in DIRECTIONS order, rules out moves into walls.
+        """
+        q = self.values[np.asarray(states)]
+        if valid_mask is not None:
+            q = np.where(valid_mask, q, -np.inf)
+        return q.argmax(axis=1)
+
+    # ─── Persistence ──────────────────────────────────────────────────────────
+
+    def save(self, filename):
+        """Write the (N_STATES, 4) array as a .npy file, NaN where not seen."""
+        np.save(filename, np.where(self.seen, self.values, np.nan).astype(np.float32))
+
+    @classmethod
+    def load(cls, filename):
+        """Read a save()d table (files without NaNs load as all seen)."""
+        values = np.load(filename).astype(np.float32, copy=False)
+        seen = ~np.isnan(values)
+        return cls(np.where(seen, values, 0.0).astype(np.float32), seen)
@@ -1,7 +1,21 @@
 # ai/rl_utils.py
 
 import random
+import numpy as np
 
+from ai import profiling
+
+# Compass moves in make_state's direction codes (0=N,1=E,2=S,3=W); the tabular
+# agents index actions by these instead of by absolute neighbour tiles
+DIRECTIONS = [(-1,  0),
+              ( 0,  1),
+              ( 1,  0),
+              ( 0, -1)]
+
+# make_state = 3 distance bins + 3 directions (4 values each) + the power flag
+N_STATES = 4 ** 6 * 2   # 8192
+
+@profiling.timed("encode.make_state")
 def make_state(pacman_pos,
                ghost_positions,
                food_positions,
@@ -17,10 +31,14 @@ def make_state(pacman_pos,
 
     pr, pc = pacman_pos
 
+    def dist_to(target):
+        d = lookup_table.distance(pacman_pos, target)
+        return d if d >= 0 else float('inf')
+
     # 1) Nearest dot
     if food_positions:
         dot_dists = {
-            f: lookup_table[pacman_pos].get(f, float('inf'))
+            f: dist_to(f)
             for f in food_positions
         }
         target_dot, d_dot = min(dot_dists.items(), key=lambda x: x[1])
@@ -29,7 +47,7 @@ def make_state(pacman_pos,
 
     # 2) Super-fruit distance
     if super_fruit_pos is not None:
-        d_fruit = lookup_table[pacman_pos].get(super_fruit_pos, float('inf'))
+        d_fruit = dist_to(super_fruit_pos)
         target_fruit = super_fruit_pos
     else:
         d_fruit = float('inf')
@@ -38,7 +56,7 @@ def make_state(pacman_pos,
     # 3) Nearest ghost
     if ghost_positions:
         ghost_dists = [
-            lookup_table[pacman_pos].get(g, float('inf'))
+            dist_to(g)
             for g in ghost_positions
         ]
         d_ghost = min(ghost_dists)
@@ -87,6 +105,112 @@ def make_state(pacman_pos,
     )
 
 
+def pack_state(state):
+    """
+    make_state tuple -> int id in [0, N_STATES), for array-backed Q-tables.
+    Mixed-radix: each field is one base-4 digit, the power flag the last bit.
+    """
+    dot_bin, fruit_bin, ghost_bin, dot_dir, fruit_dir, ghost_dir, pm_flag = state
+    sid = 0
+    for field in (dot_bin, fruit_bin, ghost_bin, dot_dir, fruit_dir, ghost_dir):
+        sid = sid * 4 + field
+    return sid * 2 + pm_flag
+
+
+@profiling.timed("encode.make_state_batch")
+def make_state_batch(maze, pacman, pellets, ghosts, fruit=None, power=None):
+    """
+    make_state for N games at once, straight to pack_state ids.
+    Everything is given as MazeIndex node ids, which is how VecPacmanEnv
+    stores its games, so make_state_batch(env.maze, env.pacman, env.pellets,
+    env.ghost_pos, env.fruit, env.hunter) encodes a whole batch.
+
+    - pacman : (N,)   node ids
+    - pellets: (N, V) bool pellet masks
+    - ghosts : (N, G) node ids (-1 = no ghost in that slot)
+    - fruit  : (N,)   node id of the super-fruit (-1 = gone), default all gone
+    - power  : (N,)   power-mode flags, default off
+
+    Distances are gathered from maze.dist instead of looped over. When several
+    pellets are equally close the lowest node id is the target; make_state
+    takes whichever its set yields first, so dot_dir can differ on ties.
+    Returns an (N,) int64 array of state ids.
+    """
+    pacman  = np.asarray(pacman, dtype=np.int64)
+    pellets = np.asarray(pellets, dtype=bool)
+    ghosts  = np.asarray(ghosts, dtype=np.int64).reshape(len(pacman), -1)
+    N = len(pacman)
+    fruit = np.full(N, -1, dtype=np.int64) if fruit is None else np.asarray(fruit, dtype=np.int64)
+    power = np.zeros(N, dtype=np.int64) if power is None else np.asarray(power, dtype=np.int64)
+
+    # Chunked so the (chunk, V) distance gather stays cache-sized
+    out = np.empty(N, dtype=np.int64)
+    step = max(1, (1 << 18) // max(1, len(maze.nodes)))
+    for lo in range(0, N, step):
+        hi = min(N, lo + step)
+        out[lo:hi] = _state_ids(maze, pacman[lo:hi], pellets[lo:hi],
+                                ghosts[lo:hi], fruit[lo:hi], power[lo:hi])
+    return out
+
+
+# Stands in for make_state's float('inf'). Read as uint16, the -1 that marks
+# an unreachable pair in maze.dist is already this value.
+_FAR = np.uint16(np.iinfo(np.uint16).max)
+
+def _state_ids(maze, pacman, pellets, ghosts, fruit, power):
+    rows = np.arange(len(pacman))
+    dist = maze.dist[pacman].view(np.uint16)            # (n, V) from each Pac-Man
+
+    # 1) Nearest dot (no food left: distance 0, target is Pac-Man himself)
+    dot_d   = dist | ((~pellets).astype(np.uint16) * _FAR)   # np.where is ~10x slower here
+    dot     = dot_d.argmin(axis=1)
+    has_dot = pellets.any(axis=1)
+    d_dot   = np.where(has_dot, dot_d[rows, dot], 0)
+    dot     = np.where(has_dot, dot, pacman)
+
+    # 2) Super-fruit
+    has_fruit = fruit >= 0
+    d_fruit   = np.where(has_fruit, dist[rows, np.maximum(fruit, 0)], _FAR)
+    fruit_t   = np.where(has_fruit, fruit, pacman)
+
+    # 3) Nearest ghost (first one listed wins ties, like list.index)
+    present   = ghosts >= 0
+    ghost_d   = np.where(present, dist[rows[:, None], np.maximum(ghosts, 0)], _FAR)
+    first     = ghost_d.argmin(axis=1)
+    has_ghost = present.any(axis=1)
+    # all-unreachable ghosts still point at the first present one
+    first     = np.where(ghost_d[rows, first] == _FAR, present.argmax(axis=1), first)
+    d_ghost   = np.where(has_ghost, ghost_d[rows, first], _FAR)
+    ghost_t   = np.where(has_ghost, ghosts[rows, first], pacman)
+
+    # 4) Bucket distances, 5) directions, 6) power flag, then pack_state
+    sid = np.zeros(len(pacman), dtype=np.int64)
+    for d in (d_dot, d_fruit, d_ghost):
+        sid = sid * 4 + _bucket_batch(d)
+    for t in (dot, fruit_t, ghost_t):
+        sid = sid * 4 + _direction_batch(maze, pacman, t)
+    return sid * 2 + (power != 0)
+
+
+def _bucket_batch(d):
+    """make_state's bucket() over an array of distances."""
+    return np.where(d == 0, 0, np.where(d <= 3, 1, np.where(d <= 7, 2, 3)))
+
+
+def _direction_batch(maze, pacman, target):
+    """make_state's direction_to() (0=N,1=E,2=S,3=W) from node ids."""
+    dr = maze.rows[target] - maze.rows[pacman]
+    dc = maze.cols[target] - maze.cols[pacman]
+    vertical = np.abs(dr) > np.abs(dc)
+    return np.where(vertical, np.where(dr < 0, 0, 2),
+                    np.where(dc > 0, 1, np.where(dc == 0, 0, 3)))
+
+
+def action_index(pacman_pos, new_pos):
+    """Index into DIRECTIONS of the move from pacman_pos to the neighbour new_pos."""
+    return DIRECTIONS.index((new_pos[0] - pacman_pos[0], new_pos[1] - pacman_pos[1]))
+
+
 def choose_action(pacman_pos, state, graph, Q, epsilon):
     """
     Epsilon-greedy over the valid neighbor moves.
@@ -1,9 +1,8 @@
 import heapq
 from collections import deque
 from heapq import heappop, heappush  # Min-heap for priority queue
-from ai.lookup_table import load_lookup_table
-
-lookup_table = load_lookup_table()  # Load precomputed distances
+from ai.maze_index import get_maze_index
+from ai import profiling
 
 def build_graph(maze):
     """
@@ -49,12 +48,13 @@ def build_graph(maze):
 
 # Smarter A * search which includes considerations about food density, ghost proximity
 
-def heuristic(a, b):
-    # If the distance is precomputed, use it; otherwise fallback to Manhattan
-    if lookup_table and a in lookup_table and b in lookup_table[a]:
-        return lookup_table[a][b]
-    else:
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+def heuristic(a, b, lookup_table=None):
+    # If the distance is precomputed for this maze, use it; otherwise fallback to Manhattan
+    if lookup_table is not None:
+        d = lookup_table.distance(a, b)
+        if d >= 0:
+            return d
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
 def is_threat_clear(tile, ghost, game_map):
     """
@@ -87,7 +87,7 @@ def get_food_density(graph, position, food_positions):
     food_count = sum(1 for neighbor in graph[position] if neighbor in food_positions)
     return -10 * food_count  # Negative cost encourages food-rich areas
 
-def compute_ghost_penalty(tile, ghost_positions, game_map, radius=5):
+def compute_ghost_penalty(tile, ghost_positions, game_map, radius=5, lookup_table=None):
     """
     Calculates the penalty for a given tile based on its distance to ghosts.
     If a wall or super fruit blocks the ghost, no penalty is applied.
@@ -95,7 +95,7 @@ def compute_ghost_penalty(tile, ghost_positions, game_map, radius=5):
     penalty = 0  # Default penalty (no ghost nearby)
     
     for ghost in ghost_positions:
-        distance = heuristic(tile, ghost)  # Compute Manhattan distance to ghost
+        distance = heuristic(tile, ghost, lookup_table)  # Maze distance to ghost
         
         # If there's no clear threat, skip the penalty
         if not is_threat_clear(tile, ghost, game_map):
@@ -113,7 +113,8 @@ def compute_ghost_penalty(tile, ghost_positions, game_map, radius=5):
         
     return penalty
 
-def smarter_a_star(graph, start, goal, ghost_positions, game_map):
+@profiling.timed("search.smarter_a_star")
+def smarter_a_star(graph, start, goal, ghost_positions, game_map, danger=None):
     """
     Smarter A* Search Algorithm for Pac-Man that considers:
     - Food clusters (higher reward)
@@ -125,29 +126,55 @@ def smarter_a_star(graph, start, goal, ghost_positions, game_map):
     - start: Pac-Man's starting position
     - food_positions: Set of food pellet locations
     - ghost_positions: Set of ghost positions
+    - danger: this tick's DangerField, if the caller already has one
 
     Returns:
     - A list of (row, col) positions representing the best path
     """
-    open_list = []
-    heappush(open_list, (0, start, []))  # (f_score, current_tile, path)
-    visited = set()
-
-    while open_list:
-        f_score, current, path = heappop(open_list)  # Get tile with lowest f_score
-
-        if current in goal:
-            return path + [current]  # If we reached a frontier, return the path
-
-        visited.add(current)
+    lookup_table = get_maze_index(graph)  # distances for *this* maze
+    nodes, index = lookup_table.nodes, lookup_table.index
+    s = index[start]
+    reach = lookup_table.dist[s].tolist()
+    goal_ids = {g for g in (index.get(g) for g in goal) if g is not None and reach[g] >= 0}
+    if not goal_ids:
+        return []  # No goal is reachable from here
+
+    if danger is None:
+        # Only the penalties are needed, not the whole DangerField
+        from ai.danger import ghost_penalty  # ai.danger imports this module
+        penalty = ghost_penalty(lookup_table, ghost_positions, game_map)
+    else:
+        penalty = danger.penalty.tolist()  # Dynamic ghost danger, per tile
+    h = lookup_table.heuristic_row(list(goal)[0])  # Estimated remaining cost
 
-        for neighbor in graph[current]:  # Check all adjacent tiles
-            if neighbor not in visited:
-                ghost_penalty = compute_ghost_penalty(neighbor, ghost_positions, game_map)  # Dynamic ghost danger
-                g_score = len(path) + 1 + ghost_penalty  # Path cost
-                h_score = heuristic(neighbor, list(goal)[0])  # Estimated remaining cost
-                heappush(open_list, (g_score + h_score, neighbor, path + [current]))
+    depth, came_from, closed = _search_tables(len(nodes), s)
+    open_list = [(0, s)]  # (f_score, node id)
 
+    while open_list:
+        _, current = heappop(open_list)  # Get tile with lowest f_score
+        if closed[current]:
+            continue  # Stale duplicate, this tile was already expanded
+
+        if current in goal_ids:
+            if profiling.ENABLED:
+                profiling.count("search.smarter_a_star.expanded", closed.count(True))
+            return _rebuild_path(nodes, came_from, current)  # If we reached a frontier, return the path
+
+        closed[current] = True
+        d = depth[current] + 1
+
+        for neighbor in lookup_table.neighbours[current]:  # Check all adjacent tiles
+            if closed[neighbor]:
+                continue
+            if depth[neighbor] < 0 or d < depth[neighbor]:
+                depth[neighbor]     = d
+                came_from[neighbor] = current
+                heappush(open_list, (d + penalty[neighbor] + h[neighbor], neighbor))
+            elif d == depth[neighbor] and _lex_smaller(came_from, current, came_from[neighbor]):
+                came_from[neighbor] = current
+
+    if profiling.ENABLED:
+        profiling.count("search.smarter_a_star.expanded", closed.count(True))
     return []  # No path found
 
 def compute_partial_mst(graph, start_pos, food_positions):
@@ -159,6 +186,8 @@ def compute_partial_mst(graph, start_pos, food_positions):
     if not food_positions:
         return 0, 0  # No food, no density
 
+    index = get_maze_index(graph)
+
     visited = set()
     min_heap = [(0, start_pos)]  # (cost, position)
     total_cost = 0
@@ -179,10 +208,11 @@ def compute_partial_mst(graph, start_pos, food_positions):
         # Expand neighbors
         for neighbor in graph.get(node, []):
             if neighbor not in visited:
-                heapq.heappush(min_heap, (len(a_star(graph, node, neighbor)), neighbor))
+                heapq.heappush(min_heap, (index.path_len(node, neighbor), neighbor))
 
     return total_cost, food_count
 
+@profiling.timed("search.a_star")
 def a_star(graph, start, goal):
     """
     A* Search Algorithm for shortest pathfinding using a graph.
@@ -195,24 +225,72 @@ def a_star(graph, start, goal):
     Returns:
     - A list of (row, col) positions representing the shortest path.
     """
-    open_list = []
-    heappush(open_list, (0, start, []))  # (f(n), current_position, path_so_far)
-    visited = set()
-
-    while open_list:
-        f_score, current, path = heappop(open_list)
-
-        if current == goal:
-            return path + [current]  # Return full path
-
-        visited.add(current)
+    lookup_table = get_maze_index(graph)  # distances for *this* maze
+    nodes, index = lookup_table.nodes, lookup_table.index
+    s, t = index[start], index.get(goal)
+    if t is None or lookup_table.dist[s, t] < 0:
+        return []  # Goal isn't reachable from here
 
-        for neighbor in graph[current]:  # Iterate over directly connected nodes
-            if neighbor not in visited:
-                g_score = len(path) + 1
-                h_score = heuristic(neighbor, goal)
-                f_score = g_score + h_score
-
-                heappush(open_list, (f_score, neighbor, path + [current]))
+    h = lookup_table.heuristic_row(goal)
+    depth, came_from, closed = _search_tables(len(nodes), s)
+    open_list = [(0, s)]  # (f(n), node id)
 
-    return []  # Return empty path if no valid path found
\ No newline at end of file
+    while open_list:
+        _, current = heappop(open_list)
+        if closed[current]:
+            continue  # Stale duplicate, this node was already expanded
+
+        if current == t:
+            if profiling.ENABLED:
+                profiling.count("search.a_star.expanded", closed.count(True))
+            return _rebuild_path(nodes, came_from, current)  # Return full path
+
+        closed[current] = True
+        g_score = depth[current] + 1
+
+        for neighbor in lookup_table.neighbours[current]:  # Iterate over directly connected nodes
+            if closed[neighbor]:
+                continue
+            if depth[neighbor] < 0 or g_score < depth[neighbor]:
+                depth[neighbor]     = g_score
+                came_from[neighbor] = current
+                heappush(open_list, (g_score + h[neighbor], neighbor))
+            elif g_score == depth[neighbor] and _lex_smaller(came_from, current, came_from[neighbor]):
+                came_from[neighbor] = current
+
+    if profiling.ENABLED:
+        profiling.count("search.a_star.expanded", closed.count(True))
+    return []  # Return empty path if no valid path found
+
+
+# ─── Search helpers ──────────────────────────────────────────────────────────────
+# Both searches run over integer node ids (row-major, so id order == tuple order)
+# and keep one parent pointer per node instead of a path copy per heap entry.
+
+def _search_tables(n_nodes, start):
+    """Fresh depth / came_from / closed tables with only the start node reached."""
+    depth     = [-1] * n_nodes
+    came_from = [-1] * n_nodes
+    closed    = [False] * n_nodes
+    depth[start] = 0
+    return depth, came_from, closed
+
+def _lex_smaller(came_from, a, b):
+    """
+    Is the path ending at a lexicographically smaller than the one ending at b?
+    (Both are the same length.) The old list-carrying search broke ties between
+    equally good routes by comparing the paths themselves, so we do the same:
+    climb both chains to their common ancestor and compare where they split.
+    """
+    while came_from[a] != came_from[b]:
+        a, b = came_from[a], came_from[b]
+    return a < b
+
+def _rebuild_path(nodes, came_from, current):
+    """Follow parent pointers back to the start and return the (row, col) path."""
+    path = []
+    while current != -1:
+        path.append(nodes[current])
+        current = came_from[current]
+    path.reverse()
+    return path
@@ -0,0 +1,156 @@
+# ai/state_encoder.py
+
+import numpy as np
+import torch
+
+from ai.lookup_table import lookup_cache
+from ai import profiling
+
+# Plane order of the DQN observation (same as train_dqn.build_state_tensor)
+WALLS, PELLETS, FRUIT, GHOSTS, THREAT, PACMAN = range(6)
+N_PLANES = 6
+
+THREAT_RADIUS = 3   # maze distance at which a tile counts as threatened
+
+
+class StateEncoder:
+    """
+    Builds the 6×H×W DQN observation for one map without redoing the whole
+    thing every step:
+      - the wall plane is written once, it never changes
+      - each tile's threat stencil (tiles within THREAT_RADIUS maze steps,
+        i.e. DangerField.threat_mask) is precomputed, so the threat plane is
+        an OR of G rows instead of a distance pass per ghost
+      - encode() keeps the previous frame in a persistent buffer and only
+        touches the cells that changed (eaten pellet, fruit, ghosts, Pac-Man)
+
+    encode_batch() does the same for every game of a VecPacmanEnv at once,
+    writing into one preallocated (N, 6, H, W) buffer.
+    """
+    def __init__(self, game_map, device=None):
+        self.game_map = game_map
+        self.device   = device
+        self.maze     = lookup_cache.get(game_map)
+        self.H, self.W = len(game_map), len(game_map[0])
+
+        maze = self.maze
+        # Flat cell (r * W + c) of every node id
+        self.cell = (maze.rows * self.W + maze.cols).astype(np.int64)
+
+        self.walls = np.array([[ch == "#" for ch in row] for row in game_map], dtype=np.float32)
+
+        # stencil[v] = flat threat plane of a lone ghost standing on node v
+        near = (maze.dist >= 0) & (maze.dist <= THREAT_RADIUS)
+        self.stencil = np.zeros((len(maze.nodes), self.H * self.W), dtype=bool)
+        for v in range(len(maze.nodes)):
+            self.stencil[v, self.cell[near[v]]] = True
+
+        self.state = np.zeros((N_PLANES, self.H, self.W), dtype=np.float32)
+        self.state[WALLS] = self.walls
+        self._flat = self.state.reshape(N_PLANES, -1)   # view onto the same buffer
+        self._last = None     # (pacman, ghosts, pellet count, fruit) of the last encode
+        self._batch = None
+
+    # ─── Single game ─────────────────────────────────────────────────────────
+
+    @profiling.timed("encode.state_encoder.reset")
+    def reset(self, pacman_pos, ghost_positions, food_positions, super_fruit_pos):
+        """Write every dynamic plane from scratch (start of an episode)."""
+        flat = self._flat
+        flat[PELLETS:].fill(0.0)
+
+        for (r, c) in food_positions:
+            flat[PELLETS, r * self.W + c] = 1.0
+        if super_fruit_pos:
+            flat[FRUIT, super_fruit_pos[0] * self.W + super_fruit_pos[1]] = 1.0
+        self._set_ghosts(ghost_positions)
+        flat[PACMAN, pacman_pos[0] * self.W + pacman_pos[1]] = 1.0
+
+        self._last = (pacman_pos, list(ghost_positions), len(food_positions), super_fruit_pos)
+        return self._tensor()
+
+    @profiling.timed("encode.state_encoder")
+    def encode(self, pacman_pos, ghost_positions, food_positions, super_fruit_pos):
+        """
+        Observation after one step, as a fresh (1, 6, H, W) tensor.
+        Falls back to reset() when the pellets don't add up (new episode,
+        or more than the one under Pac-Man went missing).
+        """
+        if self._last is None:
+            return self.reset(pacman_pos, ghost_positions, food_positions, super_fruit_pos)
+        last_pac, last_ghosts, last_food, last_fruit = self._last
+        flat, W = self._flat, self.W
+
+        # Pellets only ever disappear from under Pac-Man
+        cell = pacman_pos[0] * W + pacman_pos[1]
+        eaten = last_food - len(food_positions)
+        if eaten == 1 and pacman_pos not in food_positions:
+            flat[PELLETS, cell] = 0.0
+        elif eaten != 0:
+            return self.reset(pacman_pos, ghost_positions, food_positions, super_fruit_pos)
+
+        if super_fruit_pos != last_fruit:
+            if last_fruit:
+                flat[FRUIT, last_fruit[0] * W + last_fruit[1]] = 0.0
+            if super_fruit_pos:
+                flat[FRUIT, super_fruit_pos[0] * W + super_fruit_pos[1]] = 1.0
+
+        if list(ghost_positions) != last_ghosts:
+            for (r, c) in last_ghosts:
+                flat[GHOSTS, r * W + c] = 0.0
+            self._set_ghosts(ghost_positions)
+
+        if pacman_pos != last_pac:
+            flat[PACMAN, last_pac[0] * W + last_pac[1]] = 0.0
+            flat[PACMAN, cell] = 1.0
+
+        self._last = (pacman_pos, list(ghost_positions), len(food_positions), super_fruit_pos)
+        return self._tensor()
+
+    def _set_ghosts(self, ghost_positions):
+        """Ghost plane cells plus the threat plane from the ghosts' stencils."""
+        flat, index = self._flat, self.maze.index
+        ids = []
+        for g in ghost_positions:
+            flat[GHOSTS, g[0] * self.W + g[1]] = 1.0
+            if g in index:
+                ids.append(index[g])
+        flat[THREAT] = self.stencil[ids].any(axis=0) if ids else 0.0
+
+    def _tensor(self):
+        """Copy of the buffer (the buffer itself is overwritten next step)."""
+        out = torch.from_numpy(self.state.copy()).unsqueeze(0)
+        return out.to(self.device) if self.device is not None else out
+
+    # ─── Vectorised games ────────────────────────────────────────────────────
+
+    @profiling.timed("encode.state_encoder.batch")
+    def encode_batch(self, env, out=None):
+        """
+        (N, 6, H, W) float32 observations for every game of a VecPacmanEnv
+        built on the same map. Written into a reused buffer (or `out`), so
+        copy it if you keep it past the next call.
+        """
+        N, HW = env.n_envs, self.H * self.W
+        if out is None:
+            if self._batch is None or len(self._batch) != N:
+                self._batch = np.zeros((N, N_PLANES, self.H, self.W), dtype=np.float32)
+                self._batch[:, WALLS] = self.walls
+            out = self._batch
+        else:
+            out[:, WALLS] = self.walls
+        flat = out.reshape(N, N_PLANES, HW)
+        rows = env._arange_n
+        flat[:, PELLETS:] = 0.0
+
+        flat[:, PELLETS, self.cell] = env.pellets
+
+        has_fruit = env.fruit >= 0
+        flat[rows[has_fruit], FRUIT, self.cell[env.fruit[has_fruit]]] = 1.0
+
+        ghosts = env.ghost_pos
+        flat[rows[:, None], GHOSTS, self.cell[ghosts]] = 1.0
+        flat[:, THREAT] = self.stencil[ghosts].any(axis=1)
+
+        flat[rows, PACMAN, self.cell[env.pacman]] = 1.0
+        return out
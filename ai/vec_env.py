@@ -0,0 +1,185 @@
+# ai/vec_env.py
+
+import numpy as np
+
+from ai.search          import build_graph
+from ai.maze_index      import get_maze_index
+from ai.ghosts          import GhostTeam
+import ai.ghosts        as gh_module
+from game.score_tracker import event_points
+
+# Action mapping (same order as train_dqn.py): up, down, left, right
+ACTIONS = [(-1,  0),
+           ( 1,  0),
+           ( 0, -1),
+           ( 0,  1)]
+
+
+class VecPacmanEnv:
+    """
+    N independent games of Pac-Man stepped together with NumPy array ops.
+
+    Follows the same rules and scoring as ai/env.py:step_environment, but keeps
+    every piece of per-game state in arrays instead of module globals:
+      - pacman, prev_pos, prev2_pos : (N,)   node ids (-1 = none)
+      - pellets                     : (N, V) bool pellet bitmask
+      - fruit                       : (N,)   node id of the super-fruit (-1 = eaten)
+      - hunter, hunter_timer        : (N,)   power-mode flag and countdown
+      - ghosts                      : a GhostTeam for all N games, whose arrays
+                                      are also exposed as ghost_pos, ghost_mode,
+                                      ghost_counter and ghost_wander (N, G)
+      - score, steps, done          : (N,)
+
+    Actions are indices into ACTIONS; moving into a wall leaves Pac-Man in place.
+    Finished games are not reset automatically, call reset(ids) for them.
+
+    Ghosts default to the line-up PacmanEnv and step_environment play
+    against (ai.ghosts.ghosts: a lone Blinky from (1, W-2)). personalities
+    and starts go to GhostTeam instead; personalities alone gives one ghost
+    per 'G' tile, e.g. the four classic ghosts on a map with four houses.
+    The scalar Ghost always chases Pac-Man's own tile, so only a Blinky
+    behaves the same in both.
+    """
+    def __init__(self, game_map, n_envs=64, hunter_duration=50, seed=None,
+                 personalities=None, starts=None):
+        self.game_map        = game_map
+        self.n_envs          = n_envs
+        self.hunter_duration = hunter_duration
+        self.rng             = np.random.default_rng(seed)
+
+        # ─── Static maze tables (node ids are row-major over open tiles) ──────
+        graph, start, fruit = build_graph(game_map)
+        self.graph = graph
+        self.maze  = get_maze_index(graph)
+        self.nodes = self.maze.nodes
+        self.index = self.maze.index
+        V = len(self.nodes)
+
+        # move[v, a] -> node reached by taking action a from v (v if blocked)
+        self.move = np.empty((V, len(ACTIONS)), dtype=np.int32)
+        for v, (r, c) in enumerate(self.nodes):
+            for a, (dr, dc) in enumerate(ACTIONS):
+                self.move[v, a] = self.index.get((r + dr, c + dc), v)
+
+        # ─── Initial layout ──────────────────────────────────────────────────
+        self.start_node = self.index[start]
+        self.fruit_node = self.index[fruit] if fruit is not None else -1
+        self.start_pellets = np.zeros(V, dtype=bool)
+        for r, row in enumerate(game_map):
+            for c, ch in enumerate(row):
+                if ch == ".":
+                    self.start_pellets[self.index[(r, c)]] = True
+
+        # The scalar envs' line-up unless told otherwise (see ai/ghosts.py:GhostTeam)
+        if personalities is None and starts is None:
+            personalities = [g.name for g in gh_module.ghosts]
+            starts        = [g.start_pos for g in gh_module.ghosts]
+        self.ghosts = GhostTeam(game_map, n_envs, personalities, rng=self.rng, starts=starts)
+
+        # ─── Per-game state ─────────────────────────────────────────────────
+        N = n_envs
+        self.pacman        = np.empty(N, dtype=np.int32)
+        self.prev_pos      = np.empty(N, dtype=np.int32)
+        self.prev2_pos     = np.empty(N, dtype=np.int32)
+        self.pellets       = np.empty((N, V), dtype=bool)
+        self.fruit         = np.empty(N, dtype=np.int32)
+        self.hunter        = np.empty(N, dtype=bool)
+        self.hunter_timer  = np.empty(N, dtype=np.int32)
+        self.ghost_pos     = self.ghosts.pos       # same arrays, updated in place
+        self.ghost_mode    = self.ghosts.mode
+        self.ghost_counter = self.ghosts.counter
+        self.ghost_wander  = self.ghosts.wander
+        self.score         = np.empty(N, dtype=np.float32)
+        self.steps         = np.empty(N, dtype=np.int32)
+        self.done          = np.empty(N, dtype=bool)
+
+        self._arange_n = np.arange(N)
+        self.reset()
+
+    def reset(self, env_ids=None):
+        """Reset all games, or only the ones listed in env_ids."""
+        ids = slice(None) if env_ids is None else np.asarray(env_ids)
+
+        self.pacman[ids]        = self.start_node
+        self.prev_pos[ids]      = -1
+        self.prev2_pos[ids]     = -1
+        self.pellets[ids]       = self.start_pellets
+        self.fruit[ids]         = self.fruit_node
+        self.hunter[ids]        = False
+        self.hunter_timer[ids]  = 0
+        self.ghosts.reset(env_ids)
+        self.score[ids]         = 0.0
+        self.steps[ids]         = 0
+        self.done[ids]          = False
+
+    def valid_actions(self):
+        """(N, 4) bool mask of actions that do not walk into a wall."""
+        return self.move[self.pacman] != self.pacman[:, None]
+
+    def step(self, actions):
+        """
+        Advance every game by one timestep.
+        actions: (N,) ints indexing ACTIONS
+        returns: (rewards, dones) as (N,) float32 / bool arrays
+        """
+        actions = np.asarray(actions)
+        rewards = np.zeros(self.n_envs, dtype=np.float32)
+
+        # 0) back-and-forth penalty, then shift history
+        new_pos = self.move[self.pacman, actions]
+        rewards[new_pos == self.prev2_pos] += event_points("backtrack")
+        self.prev2_pos[:] = self.prev_pos
+        self.prev_pos[:]  = new_pos
+
+        # 1) step penalty, 2) move Pac-Man
+        rewards += event_points("step")
+        self.pacman[:] = new_pos
+
+        # 3) food pellet
+        ate = self.pellets[self._arange_n, new_pos]
+        self.pellets[self._arange_n, new_pos] = False
+        rewards[ate] += event_points("food")
+
+        # 4) super-fruit
+        fruit = self.fruit == new_pos
+        rewards[fruit] += event_points("super_fruit")
+        self.fruit[fruit]        = -1
+        self.hunter[fruit]       = True
+        self.hunter_timer[fruit] = self.hunter_duration
+
+        # 5) hunter countdown
+        self.hunter_timer[self.hunter] -= 1
+        self.hunter &= self.hunter_timer > 0
+
+        # 6) move ghosts
+        self.ghosts.step(self.pacman, self.hunter)
+
+        # 7) collision
+        hit = (self.ghost_pos == new_pos[:, None]).any(axis=1)
+        rewards[hit & self.hunter]  += event_points("ghost_eaten")
+        rewards[hit & ~self.hunter] += event_points("collision")
+        done = hit & ~self.hunter
+
+        # 8) level-complete
+        done |= ~self.pellets.any(axis=1)
+
+        self.score += rewards
+        self.steps += 1
+        self.done[:] = done
+        return rewards, done.copy()
+
+    def get_game(self, i):
+        """
+        Tuple view of game i in the same layout step_environment uses:
+          (pacman_pos, ghost_positions, food_positions,
+           super_fruit_pos, ghost_hunter, hunter_timer)
+        """
+        nodes = self.nodes
+        return (
+            nodes[self.pacman[i]],
+            [nodes[g] for g in self.ghost_pos[i]],
+            {nodes[v] for v in np.flatnonzero(self.pellets[i])},
+            nodes[self.fruit[i]] if self.fruit[i] >= 0 else None,
+            bool(self.hunter[i]),
+            int(self.hunter_timer[i]),
+        )
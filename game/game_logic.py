@@ -1,12 +1,15 @@
 import random
 from ai.search import smarter_a_star, a_star
-from ai.path_manager import get_exploration_path, escape_path, risk_aware_bfs
+from ai.danger import DangerField
+from ai.path_manager import get_exploration_path, escape_path, risk_aware_bfs, FrontierTracker
 from game.settings import PATH_INDEX
 from game.score_tracker import update_score, reset_score
-from ai.ghosts import Ghost, update_ghosts
+from ai.ghosts import Ghost, update_ghosts, reset_ghosts
 from maps.level1 import game_map
+from ai import profiling
 
 visited = set()  # Keeps track of explored tiles
+frontier = None  # FrontierTracker mirroring `visited` for the current maze
 path_index = 0
 commitment_counter = 0 # tracks how long pacman commits to an action
 current_action = "food" # Default to begin food collection
@@ -15,19 +18,48 @@ ghost_hunter = False
 hunter_timer = 0 
 HUNTER_DURATION = 50
 
+def reset_game(new_map=None):
+    """
+    Clears the rule-based agent's memory (explored tiles, commitment, hunter
+    state), the ghosts and the score, so several games can run in one process.
+    new_map switches the map used for line-of-sight checks (level1 by default).
+    """
+    global visited, frontier, path_index, commitment_counter, current_action
+    global escape_priority, ghost_hunter, hunter_timer, game_map
+
+    visited = set()
+    frontier = None
+    path_index = 0
+    commitment_counter = 0
+    current_action = "food"
+    escape_priority = 0
+    ghost_hunter = False
+    hunter_timer = 0
+    if new_map is not None:
+        game_map = new_map
+    reset_ghosts()
+    reset_score()
+
+@profiling.timed("game.update_game")
 def update_game(graph, pacman_pos, ghost_positions, food_positions, super_fruit_pos):
     """
     Updates Pac-Man’s movement while tracking explored tiles and avoiding ghosts.
     """
-    global visited, commitment_counter, current_action, escape_priority
+    global visited, frontier, commitment_counter, current_action, escape_priority
     global ghost_hunter, hunter_timer
 
     # Mark Pac-Man’s current position as visited
     visited.add(pacman_pos)
+    if frontier is None or frontier.graph is not graph:
+        frontier = FrontierTracker(graph, visited)
+    frontier.visit(pacman_pos)
+
+    # Ghost distances for this frame, shared by every decision below
+    danger = DangerField.for_graph(graph, ghost_positions, game_map)
     
     # Calculate Priorities
     food_priority, super_fruit_priority, escape_priority = calculate_priorities(
-        pacman_pos, ghost_positions, food_positions, super_fruit_pos, escape_priority, graph
+        pacman_pos, ghost_positions, food_positions, super_fruit_pos, escape_priority, graph, danger
     )
     
     # Apply Commitment Factor -> Deafult and priorit list (asc) looking for food -> superfruit -> safety
@@ -47,14 +79,15 @@ def update_game(graph, pacman_pos, ghost_positions, food_positions, super_fruit_
     # Decide Pac-Man's Next Move and subsequent next path
     print("Current Action:", current_action)
     if current_action == "escape":
-        path = escape_path(graph, pacman_pos, ghost_positions)
+        path = escape_path(graph, pacman_pos, ghost_positions, danger=danger)
     elif current_action == "super_fruit" and super_fruit_pos:
-        path = risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_positions)
+        path = risk_aware_bfs(graph, pacman_pos, super_fruit_pos, ghost_positions, food_positions, danger=danger)
     else:
-        path = get_exploration_path(graph, pacman_pos, visited, ghost_positions, food_positions)
+        path = get_exploration_path(graph, pacman_pos, visited, ghost_positions, food_positions,
+                                    danger=danger, frontier=frontier)
 
-    # Move Pac-Man along the path
-    if path:
+    # Move Pac-Man along the path (a one-tile path means stay put)
+    if len(path) > 1:
         update_score("step") # update his score for each step
         pacman_pos = path.pop(1)
         if ghost_hunter: # Logic for pacman hunter state managaement
@@ -89,12 +122,14 @@ def update_game(graph, pacman_pos, ghost_positions, food_positions, super_fruit_
 
     return pacman_pos, ghost_positions, food_positions, super_fruit_pos, ghost_hunter
 
-def calculate_priorities(pacman_pos, ghost_positions, food_positions, super_fruit_pos, last_escape_priority, graph):
+def calculate_priorities(pacman_pos, ghost_positions, food_positions, super_fruit_pos, last_escape_priority, graph,
+                         danger=None):
     """
     Calculates Pac-Man's three main priorities dynamically:
     1. Food priority decreases as food is collected.
     2. Super fruit priority increases as food decreases.
     3. Escape priority is based on ghost proximity and valid paths (avoiding inflation).
+    danger: this tick's DangerField (built here if not given)
     """
 
     # --- Food Priority ---
@@ -103,9 +138,13 @@ def calculate_priorities(pacman_pos, ghost_positions, food_positions, super_frui
     else:
         food_priority = 0  # No food left to collect
     
+    if danger is None:
+        danger = DangerField.for_graph(graph, ghost_positions, game_map)
+    index = danger.maze
+
     # --- Super Fruit Priority ---
     if super_fruit_pos:
-        distance_to_fruit = len(a_star(graph, pacman_pos, super_fruit_pos))
+        distance_to_fruit = index.path_len(pacman_pos, super_fruit_pos)
         base_fruit_priority = 10 + (30 / (distance_to_fruit + 1))  # Closer = higher priority
         super_fruit_priority = base_fruit_priority + (15 - len(food_positions) / 5)  # Becomes more important later
     else:
@@ -115,9 +154,8 @@ def calculate_priorities(pacman_pos, ghost_positions, food_positions, super_frui
     escape_priority = 10  # Base priority (prevents it from ever being zero)
     total_threat = 0  # Accumulates the total threat from all ghosts
 
-    for ghost in ghost_positions:
-        # Distance to ghost using a_star
-        distance = len(a_star(graph, pacman_pos, ghost))
+    # Path length to each ghost (counted like len(a_star(...))), read off the field
+    for distance in danger.ghost_path_len[:, index.index[pacman_pos]].tolist():
         
         # Weighted contribution: closer ghosts contribute more, further ghosts contribute less
         if distance == 1:
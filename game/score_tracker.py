@@ -10,6 +10,27 @@ def reset_score():
     global score
     score = 0
 
+def event_points(event):
+    """
+    Returns how many points a single event is worth, without touching the
+    global score. Shared by update_score and the batched environments.
+    """
+    if event == "food":
+        return 10
+    elif event == "super_fruit":
+        return 50
+    elif event == "ghost_eaten":
+        return 200
+    elif event == "collision":
+        return -500
+    elif event == "step":
+        return STEP_PENALTY  # Penalise each move to discourage wandering or osilation
+    elif event == "backtrack":
+        return BACKTRACK_PENALTY # Penalise oscilation
+    elif event == "level_complete":
+        return 2000
+    return 0
+
 def update_score(event):
     """
     Updates the global score based on an event.
@@ -22,20 +43,7 @@ def update_score(event):
         The updated score.
     """
     global score
-    if event == "food":
-        score += 10
-    elif event == "super_fruit":
-        score += 50
-    elif event == "ghost_eaten":
-        score += 200
-    elif event == "collision":
-        score -= 500
-    elif event == "step":
-        score += STEP_PENALTY  # Penalise each move to discourage wandering or osilation
-    elif event == "backtrack":
-        score += BACKTRACK_PENALTY # Penalise oscilation
-    elif event == "level_complete":
-        score += 2000
+    score += event_points(event)
 
     return score
 
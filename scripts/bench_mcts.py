@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# bench_mcts.py
+#
+# MCTSAgent vs the rule-based priorities agent (game_logic.update_game),
+# playing the same games (GameModel rules, same seeds) headlessly, against
+# the ghosts the priorities agent was built for: ai.ghosts' line-up, the
+# same lone Blinky PacmanEnv and VecPacmanEnv play by default.
+#
+# The priorities agent is timed first; MCTS then plays once with that same
+# per-move time budget ("matched") and once per --budgets-ms value. MCTS
+# spends some time outside its search loop (tree reuse, the last iteration
+# past the deadline, talking to --workers), so the matched run searches for
+# the budget minus that overhead, measured on a probe game. Any MCTS row
+# whose ms/move still ends up over its budget is marked with a *.
+#
+#   python -m scripts.bench_mcts [--map level1] [--episodes 10] [--budgets-ms 1 5 20]
+#                                [--workers 1] [--json results.json]
+
+import io
+import json
+import time
+import argparse
+import importlib
+import contextlib
+import statistics
+
+from ai.game_state import GameModel, step
+from ai.mcts       import MCTSAgent
+from ai.vec_env    import ACTIONS
+import game.game_logic as logic
+
+
+# ─── Players ─────────────────────────────────────────────────────────────────
+
+class PrioritiesPlayer:
+    """
+    update_game used as a policy: it plans on the state we hand it and we
+    keep only Pac-Man's move. Its own ghost update is switched off, since
+    the GameModel moves the ghosts.
+    """
+    def __init__(self, model):
+        self.model = model
+
+    def reset(self):
+        logic.reset_game(self.model.game_map)
+
+    def choose_action(self, state):
+        model = self.model
+        pacman_pos, ghosts, food, fruit, _, _ = model.to_tuple(state)
+        new_pos, *_ = logic.update_game(model.team.graph, pacman_pos, ghosts, food, fruit)
+
+        move = (new_pos[0] - pacman_pos[0], new_pos[1] - pacman_pos[1])
+        if move in ACTIONS:
+            return ACTIONS.index(move)
+        # Staying put: walk into a wall if there is one, else take any move
+        legal = model.legal_actions(state)
+        walls = [a for a in range(len(ACTIONS)) if a not in legal]
+        return (walls or legal)[0]
+
+
+@contextlib.contextmanager
+def rules_headless():
+    """No ghost moves or per-frame prints from update_game while benchmarking."""
+    update_ghosts = logic.update_ghosts
+    logic.update_ghosts = lambda graph, pacman_pos, ghost_hunter: []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logic.update_ghosts = update_ghosts
+
+
+def play(model, player, seed, max_steps):
+    """One game; returns (score, cleared, steps, seconds spent choosing moves)."""
+    state = model.initial_state(seed)
+    player.reset()
+    think = 0.0
+    while not state.done and state.steps < max_steps:
+        t0 = time.perf_counter()
+        action = player.choose_action(state)
+        think += time.perf_counter() - t0
+        state, _, _ = step(state, action)
+    return state.score, state.pellets == 0, state.steps, think
+
+
+def run(label, model, player, args):
+    scores, cleared, steps, think = [], 0, 0, 0.0
+    for ep in range(args.episodes):
+        s, c, n, t = play(model, player, args.seed + ep, args.max_steps)
+        scores.append(s)
+        cleared += c
+        steps += n
+        think += t
+    row = {
+        "agent":       label,
+        "mean_score":  round(statistics.mean(scores), 1),
+        "std_score":   round(statistics.pstdev(scores), 1),
+        "cleared":     cleared / args.episodes,
+        "ms_per_move": round(1000 * think / max(steps, 1), 3),
+        "steps":       steps,
+    }
+    return row
+
+
+def print_row(row):
+    over = " *" if not row.get("within_budget", True) else ""
+    print(f"{row['agent']:24s} {row['mean_score']:9.1f} {row['std_score']:8.1f} "
+          f"{100 * row['cleared']:7.0f}% {row['ms_per_move']:10.3f}{over}")
+
+
+def search_time(model, args, budget):
+    """
+    time_ms that keeps MCTS's whole ms/move within budget: one probe game at
+    time_ms=budget shows how far past it a move runs, and that much comes off.
+    """
+    with MCTSAgent(model, time_ms=budget, rollout_depth=args.depth,
+                   workers=args.workers, seed=args.seed) as agent:
+        _, _, steps, think = play(model, agent, args.seed, args.max_steps)
+    overhead = 1000 * think / max(steps, 1) - budget
+    return max(budget - max(overhead, 0.0), 0.001)   # time_ms=0 would mean no time limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCTS vs priorities agent at matched time budgets")
+    parser.add_argument("--map",        default="level1", help="module under maps/")
+    parser.add_argument("--episodes",   type=int, default=10)
+    parser.add_argument("--max-steps",  type=int, default=500)
+    parser.add_argument("--budgets-ms", type=float, nargs="*", default=[1, 5, 20])
+    parser.add_argument("--workers",    type=int, default=1, help="root-parallel MCTS processes")
+    parser.add_argument("--depth",      type=int, default=20, help="MCTS rollout depth")
+    parser.add_argument("--seed",       type=int, default=0)
+    parser.add_argument("--json",       default=None)
+    args = parser.parse_args()
+
+    game_map = importlib.import_module(f"maps.{args.map}").game_map
+    model = GameModel(game_map)   # ai.ghosts' line-up
+
+    print(f"{args.map}: {args.episodes} games of up to {args.max_steps} steps, "
+          f"{len(model.ghost_start)} ghosts\n")
+    print(f"{'agent':24s} {'score':>9s} {'std':>8s} {'cleared':>8s} {'ms/move':>10s}")
+
+    with rules_headless():
+        rules = run("priorities", model, PrioritiesPlayer(model), args)
+    print_row(rules)
+
+    results = [rules]
+    matched = rules["ms_per_move"]
+    budgets = [("matched", matched, search_time(model, args, matched))] + \
+              [(f"{b:g}ms", b, b) for b in args.budgets_ms]
+    for name, budget, time_ms in budgets:
+        with MCTSAgent(model, time_ms=time_ms, rollout_depth=args.depth,
+                       workers=args.workers, seed=args.seed) as agent:
+            row = run(f"mcts {name}", model, agent, args)
+        row["budget_ms"]     = budget
+        row["search_ms"]     = round(time_ms, 3)
+        row["within_budget"] = row["ms_per_move"] <= budget
+        results.append(row)
+        print_row(row)
+
+    if not all(r.get("within_budget", True) for r in results):
+        print("\n* ms/move over the row's budget: not a like-for-like comparison")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"map": args.map, "episodes": args.episodes, "workers": args.workers,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
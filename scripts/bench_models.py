@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# bench_models.py
+#
+# Size and CPU speed of every DQN architecture in ai/dqn/model.py, per map:
+#   - parameters, in total and in fc_shared
+#   - forward latency (median) and samples/sec at each batch size, under
+#     torch.inference_mode, the way the actors run it
+#   - training samples/sec: forward + backward + Adam step at the learner's
+#     batch size
+# Each network is built for the map's board size; DQNCNN's fc_shared grows
+# with the board (64·H·W inputs), CompactDQN's doesn't. Compare ms/batch
+# against your per-step budget.
+#
+#   python -m scripts.bench_models [--maps level1 level2] [--batches 1 32 256]
+#                                  [--threads 1] [--json results.json]
+
+import json
+import time
+import argparse
+import importlib
+import statistics
+
+import torch
+
+from ai.dqn.model     import ARCHITECTURES, build_model
+from ai.state_encoder import N_PLANES
+
+
+def n_params(module):
+    return sum(p.numel() for p in module.parameters())
+
+
+def latency(fn, min_time=0.5, min_reps=5):
+    """Median seconds per fn() call, after a warm-up call."""
+    fn()
+    times = []
+    t_end = time.perf_counter() + min_time
+    while len(times) < min_reps or time.perf_counter() < t_end:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench(arch, H, W, batches, train_batch):
+    net = build_model(arch, N_PLANES, 4, H, W)
+    row = {
+        "arch":      arch,
+        "params":    n_params(net),
+        "fc_shared": n_params(net.fc_shared),
+        "inference": {},
+    }
+
+    net.eval()
+    for b in batches:
+        x = (torch.rand(b, N_PLANES, H, W) > 0.5).float()
+        def forward():
+            with torch.inference_mode():
+                net(x)
+        sec = latency(forward)
+        row["inference"][b] = {"ms": round(1000 * sec, 3), "samples_per_sec": round(b / sec, 1)}
+
+    net.train()
+    opt = torch.optim.Adam(net.parameters(), lr=1e-4)
+    x = (torch.rand(train_batch, N_PLANES, H, W) > 0.5).float()
+    def update():
+        q_col, q_esc = net(x)
+        loss = q_col.pow(2).mean() + q_esc.pow(2).mean()
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+    row["train_samples_per_sec"] = round(train_batch / latency(update), 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DQN architectures: parameters and CPU latency")
+    parser.add_argument("--maps",        nargs="*", default=["level1", "level2"], help="modules under maps/")
+    parser.add_argument("--arch",        nargs="*", default=sorted(ARCHITECTURES))
+    parser.add_argument("--batches",     type=int, nargs="*", default=[1, 32, 256])
+    parser.add_argument("--train-batch", type=int, default=32, help="learner batch size")
+    parser.add_argument("--threads",     type=int, default=None, help="torch CPU threads (default: torch's)")
+    parser.add_argument("--json",        default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"CPU, {torch.get_num_threads()} thread(s)\n")
+
+    results = []
+    for name in args.maps:
+        game_map = importlib.import_module(f"maps.{name}").game_map
+        H, W = len(game_map), len(game_map[0])
+        print(f"{name} ({H}×{W})")
+        header = f"  {'arch':10s} {'params':>11s} {'fc_shared':>11s}"
+        for b in args.batches:
+            header += f" {f'ms@{b}':>9s} {f'smp/s@{b}':>11s}"
+        print(header + f" {'train smp/s':>12s}")
+
+        for arch in args.arch:
+            row = bench(arch, H, W, args.batches, args.train_batch)
+            row["map"] = name
+            results.append(row)
+            line = f"  {arch:10s} {row['params']:11,d} {row['fc_shared']:11,d}"
+            for b in args.batches:
+                inf = row["inference"][b]
+                line += f" {inf['ms']:9.3f} {inf['samples_per_sec']:11.0f}"
+            print(line + f" {row['train_samples_per_sec']:12.0f}")
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"threads": torch.get_num_threads(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
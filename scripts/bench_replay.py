@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# bench_replay.py
+#
+# Throughput of the prioritized replay machinery at 1M capacity:
+#   1) SumTree alone: batched priority updates and proportional sampling
+#   2) PrioritizedReplayBuffer vs ReplayBuffer: full sample() calls on a
+#      filled buffer (gather + unpack included), plus update_priorities()
+#
+#   python -m scripts.bench_replay [--capacity 1000000] [--fill 50000] [--batch 32 256]
+
+import argparse
+import time
+
+import numpy as np
+
+from ai.dqn.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer, SumTree
+
+OBS_SHAPE = (6, 15, 15)   # build_state_tensor planes
+
+
+def rate(fn, iters):
+    """Calls per second of fn() over `iters` calls (after one warm-up call)."""
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    return iters / (time.perf_counter() - t0)
+
+
+def fill(buffer, n, rng):
+    """Push n random transitions, chained like real episodes (next_state → state)."""
+    state = rng.integers(0, 2, size=OBS_SHAPE, dtype=np.uint8)
+    for i in range(n):
+        next_state = rng.integers(0, 2, size=OBS_SHAPE, dtype=np.uint8)
+        done = (i % 200) == 199
+        buffer.push(state, int(rng.integers(4)), float(rng.normal()), next_state, done)
+        state = rng.integers(0, 2, size=OBS_SHAPE, dtype=np.uint8) if done else next_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prioritized replay throughput")
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--fill",     type=int, default=50_000,
+                        help="transitions pushed before timing sample() (0 = skip)")
+    parser.add_argument("--batch",    type=int, nargs="+", default=[32, 256])
+    parser.add_argument("--iters",    type=int, default=2000)
+    parser.add_argument("--seed",     type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    # 1) Sum-tree on its own, every leaf live
+    tree = SumTree(args.capacity)
+    tree.update(np.arange(args.capacity), rng.random(args.capacity))
+    print(f"SumTree, {args.capacity:,} leaves")
+    for b in args.batch:
+        idx = rng.integers(0, args.capacity, size=b)
+        pri = rng.random(b)
+        vals = rng.random(b) * tree.total()
+        upd = rate(lambda: tree.update(idx, pri), args.iters)
+        fnd = rate(lambda: tree.find(vals), args.iters)
+        print(f"  batch {b:4d}: update {upd:9.0f}/s ({upd * b / 1e6:5.2f}M prio/s)"
+              f"   find {fnd:9.0f}/s ({fnd * b / 1e6:5.2f}M draws/s)")
+
+    if args.fill <= 0:
+        return
+
+    # 2) Whole buffers, same transitions in each
+    uniform = ReplayBuffer(args.capacity)
+    per     = PrioritizedReplayBuffer(args.capacity)
+    t0 = time.perf_counter()
+    fill(uniform, args.fill, np.random.default_rng(args.seed))
+    fill(per,     args.fill, np.random.default_rng(args.seed))
+    print(f"\nBuffers, capacity {args.capacity:,}, {args.fill:,} transitions "
+          f"(filled in {time.perf_counter() - t0:.1f}s)")
+
+    for b in args.batch:
+        uni_s = rate(lambda: uniform.sample(b), args.iters)
+
+        def per_step():
+            batch = per.sample(b)
+            per.update_priorities(batch[-1], rng.normal(size=b))
+
+        per_s = rate(lambda: per.sample(b), args.iters)
+        both  = rate(per_step, args.iters)
+        print(f"  batch {b:4d}: uniform sample {uni_s:8.0f}/s   "
+              f"prioritized sample {per_s:8.0f}/s   sample+update {both:8.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
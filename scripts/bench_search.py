@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# bench_search.py
+#
+# Compares the parent-pointer searches in ai/search.py with the list-carrying
+# versions from the baseline commit (kept below) on level1 and level2:
+#   1) checks both return identical paths on every sampled query
+#   2) times the same queries through each and prints the speed-up
+#
+#   python -m scripts.bench_search [--pairs 2000] [--repeat 3]
+
+import argparse
+import random
+import time
+from heapq import heappop, heappush
+
+from ai.search       import a_star, smarter_a_star, build_graph, is_threat_clear
+from ai.maze_index   import get_maze_index
+from ai.lookup_table import compute_distance_lookup
+from maps.level1    import game_map as level1
+from maps.level2    import game_map as level2
+
+MAPS = {"level1": level1, "level2": level2}
+
+
+# ─── Baseline implementations (reference only) ────────────────────────────────
+# ai/search.py as of the baseline commit (70ff776), unchanged apart from the
+# distance table: there it was a module global loaded from
+# data/distance_lookup.pkl, built for level1 only. Here every call gets the
+# dict-of-dicts table ai/lookup_table.py's compute_distance_lookup builds for
+# the maze being searched, the fastest the old code could run on it.
+
+def baseline_heuristic(a, b, lookup_table):
+    # If the distance is precomputed, use it; otherwise fallback to Manhattan
+    if lookup_table and a in lookup_table and b in lookup_table[a]:
+        return lookup_table[a][b]
+    else:
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def baseline_compute_ghost_penalty(tile, ghost_positions, game_map, lookup_table):
+    penalty = 0  # Default penalty (no ghost nearby)
+
+    for ghost in ghost_positions:
+        distance = baseline_heuristic(tile, ghost, lookup_table)
+
+        # If there's no clear threat, skip the penalty
+        if not is_threat_clear(tile, ghost, game_map):
+            continue  # Ignore this ghost if it's blocked
+
+        if distance == 0:
+            penalty += 100  # Tile directly occupied by ghost (very high penalty)
+        elif distance == 1:
+            penalty += 50   # Immediate neighbor of ghost (high risk)
+        elif distance == 2:
+            penalty += 20   # Near ghost (medium risk)
+        elif distance == 3:
+            penalty += 10   # Further from ghost (low risk)
+
+    return penalty
+
+
+def baseline_a_star(graph, start, goal, lookup_table):
+    open_list = []
+    heappush(open_list, (0, start, []))  # (f(n), current_position, path_so_far)
+    visited = set()
+
+    while open_list:
+        f_score, current, path = heappop(open_list)
+
+        if current == goal:
+            return path + [current]  # Return full path
+
+        visited.add(current)
+
+        for neighbor in graph[current]:  # Iterate over directly connected nodes
+            if neighbor not in visited:
+                g_score = len(path) + 1
+                h_score = baseline_heuristic(neighbor, goal, lookup_table)
+                f_score = g_score + h_score
+
+                heappush(open_list, (f_score, neighbor, path + [current]))
+
+    return []  # Return empty path if no valid path found
+
+
+def baseline_smarter_a_star(graph, start, goal, ghost_positions, game_map, lookup_table):
+    open_list = []
+    heappush(open_list, (0, start, []))  # (f_score, current_tile, path)
+    visited = set()
+
+    while open_list:
+        f_score, current, path = heappop(open_list)  # Get tile with lowest f_score
+
+        if current in goal:
+            return path + [current]  # If we reached a frontier, return the path
+
+        visited.add(current)
+
+        for neighbor in graph[current]:  # Check all adjacent tiles
+            if neighbor not in visited:
+                ghost_penalty = baseline_compute_ghost_penalty(neighbor, ghost_positions, game_map,
+                                                               lookup_table)  # Dynamic ghost danger
+                g_score = len(path) + 1 + ghost_penalty  # Path cost
+                h_score = baseline_heuristic(neighbor, list(goal)[0], lookup_table)  # Estimated remaining cost
+                heappush(open_list, (g_score + h_score, neighbor, path + [current]))
+
+    return []  # No path found
+
+
+# ─── Benchmark ─────────────────────────────────────────────────────────────────
+
+def make_queries(graph, n_pairs, seed):
+    """Random (start, goal, ghosts) triples drawn from the maze's open tiles."""
+    rng   = random.Random(seed)
+    nodes = sorted(graph)
+    return [(rng.choice(nodes), rng.choice(nodes), rng.sample(nodes, 2))
+            for _ in range(n_pairs)]
+
+
+def time_calls(fn, queries, repeat):
+    """Best-of-`repeat` wall time for running fn over every query."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for q in queries:
+            fn(*q)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Old vs new A* timings")
+    parser.add_argument("--pairs",  type=int, default=2000, help="queries per map")
+    parser.add_argument("--repeat", type=int, default=3,    help="timing repeats (best is kept)")
+    parser.add_argument("--seed",   type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':8s} {'search':15s} {'old (ms)':>10s} {'new (ms)':>10s} {'speed-up':>9s}")
+    for name, game_map in MAPS.items():
+        graph, _, _ = build_graph(game_map)
+        get_maze_index(graph)  # build / load the tables outside the timings
+        table   = compute_distance_lookup(graph)
+        queries = make_queries(graph, args.pairs, args.seed)
+
+        cases = [
+            ("a_star",
+             [(graph, s, g, table) for s, g, _ in queries], baseline_a_star,
+             [(graph, s, g) for s, g, _ in queries], a_star),
+            ("smarter_a_star",
+             [(graph, s, {g}, ghosts, game_map, table) for s, g, ghosts in queries],
+             baseline_smarter_a_star,
+             [(graph, s, {g}, ghosts, game_map) for s, g, ghosts in queries], smarter_a_star),
+        ]
+        for label, old_calls, old_fn, new_calls, new_fn in cases:
+            # 1) identical output
+            for old, new in zip(old_calls, new_calls):
+                if old_fn(*old) != new_fn(*new):
+                    raise SystemExit(f"{name}/{label}: paths differ for start={new[1]} goal={new[2]}")
+
+            # 2) timings (per query)
+            t_old = time_calls(old_fn, old_calls, args.repeat) / len(old_calls) * 1000
+            t_new = time_calls(new_fn, new_calls, args.repeat) / len(new_calls) * 1000
+            print(f"{name:8s} {label:15s} {t_old:10.4f} {t_new:10.4f} {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
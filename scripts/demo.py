@@ -1,26 +1,34 @@
 # demo.py
-import pygame, pickle
+import pygame
 from maps.level1 import game_map
 from ai.path_manager import get_initial_path
 from game.rendering import draw_game
 from game.score_tracker import reset_score, get_score
 from game.game_logic import update_game            # for rule‑based fallback
 from ai.env import step_environment
-from ai.rl_utils import make_state, choose_action
-from ai.lookup_table import load_lookup_table
+from ai.rl_utils import make_state
+from ai.q_table import DenseQTable
+from ai.lookup_table import lookup_cache
 from ai.ghosts import reset_ghosts
 
 # ───── CONFIG ────────────────────────────────────────────────
 USE_RL = True           # toggle between RL and rule‑based
-MODEL_FILE = "data/q_table.pkl"
+USE_DQN = False         # with USE_RL: play the exported DQN instead of the Q-table
+MODEL_FILE = "data/q_table.npy"
+DQN_FILE = "checkpoints/dqn_final.ts"   # from: python -m scripts.export_dqn checkpoints/dqn_final.pt
 FPS = 10
 
 # ───── LOAD MODELS & TABLES ───────────────────────────────────
-if USE_RL:
-    with open(MODEL_FILE, "rb") as f:
-        Q = pickle.load(f)
+if USE_RL and USE_DQN:
+    from ai.dqn.export import load_policy
+    from ai.state_encoder import StateEncoder, THREAT
+    from ai.vec_env import ACTIONS
+    dqn = load_policy(DQN_FILE)          # greedy, CPU, TorchScript
+    encoder = StateEncoder(game_map)
+elif USE_RL:
+    Q = DenseQTable.load(MODEL_FILE)
     epsilon = 0.0        # always exploit
-lookup_table = load_lookup_table()
+lookup_table = lookup_cache.get(game_map)
 
 # ───── PYGAME SETUP ───────────────────────────────────────────
 pygame.init()
@@ -44,15 +52,22 @@ while running:
 
     if USE_RL:
         # 1) Compute current state & choose action
-        state  = make_state(
-            pacman_pos,
-            ghost_positions,
-            food_positions,
-            super_fruit_pos,
-            ghost_hunter,
-            lookup_table
-        )
-        action = choose_action(state, graph, Q, epsilon)
+        if USE_DQN:
+            state  = encoder.encode(pacman_pos, ghost_positions, food_positions, super_fruit_pos)
+            valid  = [(pacman_pos[0] + dr, pacman_pos[1] + dc) in graph[pacman_pos] for dr, dc in ACTIONS]
+            threat = encoder.state[THREAT, pacman_pos[0], pacman_pos[1]] > 0
+            dr, dc = ACTIONS[dqn.act(state, valid, ghost_hunter, threat)]
+            action = (pacman_pos[0] + dr, pacman_pos[1] + dc)
+        else:
+            state  = make_state(
+                pacman_pos,
+                ghost_positions,
+                food_positions,
+                super_fruit_pos,
+                ghost_hunter,
+                lookup_table
+            )
+            action = Q.choose_action(pacman_pos, state, graph, epsilon)
 
         # 2) Step environment under that action
         (pacman_pos,
@@ -61,7 +76,8 @@ while running:
          super_fruit_pos,
          ghost_hunter,
          hunter_timer,
-         done) = step_environment(
+         done,
+         _) = step_environment(
              graph,
              action,
              ghost_positions,
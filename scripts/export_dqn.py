@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# export_dqn.py
+#
+# Turn a train_dqn.py checkpoint (raw state_dict) into a TorchScript file
+# that scripts/demo.py can play from on CPU, optionally with fc_shared as
+# dynamic int8. --compare times one greedy move for eager, scripted and
+# scripted+int8 versions of the same weights, and checks how often they
+# agree with eager on real observations.
+#
+#   python -m scripts.export_dqn checkpoints/dqn_final.pt [--out dqn.ts] [--quantize]
+#                                [--arch classic] [--map level1] [--compare] [--threads 1]
+
+import os
+import time
+import argparse
+import importlib
+import statistics
+
+import numpy as np
+import torch
+
+from ai.dqn.export    import load_checkpoint, quantize_fc, script, export, ScriptedPolicy
+from ai.dqn.inference import pacman_threat
+from ai.state_encoder import StateEncoder
+from ai.vec_env       import VecPacmanEnv
+
+
+def sample_observations(game_map, n, seed=0):
+    """n observations from random play, with their valid masks and flags."""
+    env, encoder = VecPacmanEnv(game_map, n, seed=seed), StateEncoder(game_map)
+    rng = np.random.default_rng(seed)
+    for _ in range(int(rng.integers(5, 40))):
+        valid = env.valid_actions()
+        env.step(np.array([rng.choice(np.flatnonzero(v)) for v in valid]))
+        env.reset(np.flatnonzero(env.done))
+    obs = encoder.encode_batch(env).copy()
+    return obs, env.valid_actions(), env.hunter.copy(), pacman_threat(obs, encoder.cell[env.pacman])
+
+
+def time_moves(policy, obs, valid, power, threat, reps=2000):
+    """Median ms for one policy.act() call on a single observation."""
+    states = [torch.from_numpy(obs[i:i + 1]) for i in range(len(obs))]
+    times = []
+    for k in range(reps):
+        i = k % len(states)
+        t0 = time.perf_counter()
+        policy.act(states[i], valid[i], power[i], threat[i])
+        times.append(time.perf_counter() - t0)
+    return 1000 * statistics.median(times[reps // 10:])   # drop warm-up calls
+
+
+def compare(net, args, board, game_map):
+    obs, valid, power, threat = sample_observations(game_map, 256, args.seed)
+    meta = {"arch": args.arch, "board": list(board)}
+    variants = [
+        ("eager",         ScriptedPolicy(net, dict(meta, quantized=False))),
+        ("scripted",      ScriptedPolicy(script(net, board), dict(meta, quantized=False))),
+        ("scripted+int8", ScriptedPolicy(script(quantize_fc(net), board), dict(meta, quantized=True))),
+    ]
+    reference = variants[0][1].act_batch(obs, valid, power, threat)
+
+    print(f"\nGreedy move latency, CPU, {torch.get_num_threads()} thread(s), {args.arch} on {board[0]}×{board[1]}")
+    print(f"  {'version':14s} {'ms/move':>9s} {'agrees w/ eager':>16s}")
+    for name, policy in variants:
+        ms = time_moves(policy, obs, valid, power, threat)
+        agree = (policy.act_batch(obs, valid, power, threat) == reference).mean()
+        print(f"  {name:14s} {ms:9.3f} {100 * agree:15.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a DQN checkpoint to TorchScript for CPU play")
+    parser.add_argument("checkpoint", help="state_dict saved by train_dqn.py")
+    parser.add_argument("--out",      default=None, help="output file (default: checkpoint with .ts)")
+    parser.add_argument("--arch",     default="classic", help="architecture the checkpoint was trained with")
+    parser.add_argument("--map",      default="level1", help="module under maps/ (sets the board size)")
+    parser.add_argument("--quantize", action="store_true", help="fc_shared as dynamic int8")
+    parser.add_argument("--compare",  action="store_true", help="time eager / scripted / int8 moves")
+    parser.add_argument("--threads",  type=int, default=None, help="torch CPU threads (default: torch's)")
+    parser.add_argument("--seed",     type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    game_map = importlib.import_module(f"maps.{args.map}").game_map
+    board = (len(game_map), len(game_map[0]))
+
+    net = load_checkpoint(args.checkpoint, args.arch, board)
+    out = args.out or os.path.splitext(args.checkpoint)[0] + (".int8.ts" if args.quantize else ".ts")
+    meta = export(net, out, args.arch, board, args.quantize)
+    print(f"Wrote {out} ({os.path.getsize(out) / 1e6:.1f} MB, {meta})")
+
+    if args.compare:
+        compare(net, args, board, game_map)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,29 @@
 #!/usr/bin/env python3
 # hyperparam_search.py
-
+#
+#   python -m scripts.hyperparam_search [--workers N] [--pruner median|asha|none]
+#                                       [--storage data/optuna_journal.log] [--study NAME]
+#
+# Trials run in N worker processes that share one Optuna storage: a journal
+# file by default, or any RDB URL such as sqlite:///data/optuna.db. Every
+# WINDOW episodes a trial reports its running average so the pruner can
+# stop hopeless configurations early. Re-running with the same storage and
+# study name resumes the search.
+
+import os
 import random
 import statistics
-import pickle
+import argparse
+import multiprocessing as mp
 import optuna
+from optuna.trial import TrialState
 
 # Project imports — adjust paths if necessary
 from maps.level1             import game_map
-from ai.path_manager         import get_initial_path
-from game.score_tracker      import reset_score, get_score, STEP_PENALTY
-from ai.lookup_table         import load_lookup_table
-from ai.rl_utils             import make_state, choose_action, update_q
-from ai.env                  import step_environment
-import ai.ghosts              as gh_module
+from ai.env                  import PacmanEnv
+from ai.lookup_table         import lookup_cache
+from ai.q_table              import DenseQTable
+from ai.actor_pool           import play_episode
 
 # ─── Hyperparameter search settings ──────────────────────────────────────────
 
@@ -22,93 +32,46 @@ EPISODES   = 500     # episodes per trial
 WINDOW     = 50      # average last WINDOW returns
 MAX_STEPS  = 1000    # cap per-episode steps
 
+DEFAULT_STORAGE = "data/optuna_journal.log"
+DEFAULT_STUDY   = "pacman_q_learning"
+
 # ─── Objective function ──────────────────────────────────────────────────────
 
-def run_training(alpha, gamma, eps_decay, step_penalty):
+def run_training(alpha, gamma, eps_decay, step_penalty, trial=None, seed=0):
     """
     Run a short Q-learning run with the given hyperparameters.
-    Returns the average return over the final WINDOW episodes.
+    Returns the average return over the final WINDOW episodes, scored with
+    the game's default points: step_penalty only shapes what the agent
+    learns from, so trials with different penalties stay comparable.
+    With a trial, the running average is reported every WINDOW episodes
+    and optuna.TrialPruned is raised once the pruner gives up on it.
     """
-    # 1) Override global step penalty
-    STEP_PENALTY = step_penalty
+    random.seed(seed)  # choose_action and the ghosts use `random`
+
+    # 1) The step penalty goes to this env's rewards, not a stray local
+    env = PacmanEnv(game_map, rewards={"step": step_penalty})
 
     # 2) Setup
     returns = []
     epsilon = 1.0
-    Q = {}
-    lookup = load_lookup_table()
+    Q = DenseQTable()
+    lookup = lookup_cache.get(game_map)
 
     # 3) Episodes
     for ep in range(EPISODES):
-        reset_score()
-        # Reset ghosts back to their house
-        for ghost in gh_module.ghosts:
-            ghost.respawn()
-
-        # Initialize game state
-        path, pacman_pos, ghost_positions, food_positions, super_fruit_pos, graph = \
-            get_initial_path(game_map)
-        ghost_hunter = False
-        hunter_timer = 0
-
-        state = make_state(
-            pacman_pos,
-            ghost_positions,
-            food_positions,
-            super_fruit_pos,
-            ghost_hunter,
-            lookup
-        )
-
-        done = False
-        prev_score = 0
-        steps = 0
-
-        # 4) Time-step loop
-        while not done and steps < MAX_STEPS:
-            # a) ε-greedy action
-            action = choose_action(pacman_pos, state, graph, Q, epsilon)
-
-            # b) advance environment
-            (pacman_pos,
-             ghost_positions,
-             food_positions,
-             super_fruit_pos,
-             ghost_hunter,
-             hunter_timer,
-             done) = step_environment(
-                   graph,
-                   action,
-                   ghost_positions,
-                   food_positions,
-                   super_fruit_pos,
-                   ghost_hunter,
-                   hunter_timer
-             )
-
-            # c) compute reward & update Q
-            curr = get_score()
-            reward = curr - prev_score
-            prev_score = curr
-
-            next_state = make_state(
-                pacman_pos,
-                ghost_positions,
-                food_positions,
-                super_fruit_pos,
-                ghost_hunter,
-                lookup
-            )
-            update_q(Q, state, action, reward, next_state, alpha, gamma)
-            state = next_state
-
-            steps += 1
-
-        # end episode
-        returns.append(get_score())
+        play_episode(env, Q, epsilon, lookup, MAX_STEPS, alpha=alpha, gamma=gamma)
+
+        # end episode, scored without the trial's step penalty
+        returns.append(env.game_score)
         # decay ε
         epsilon = max(0.1, epsilon * eps_decay)
 
+        # 4) Intermediate value for the pruner
+        if trial is not None and (ep + 1) % WINDOW == 0:
+            trial.report(statistics.mean(returns[-WINDOW:]), step=ep + 1)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
     # mean of last WINDOW returns
     return statistics.mean(returns[-WINDOW:])
 
@@ -120,23 +83,81 @@ def objective(trial):
     eps_decay   = trial.suggest_float("eps_decay",    0.990,  0.9995)
     step_penalty= trial.suggest_float("step_penalty",-0.5,   0.0)
 
-    perf = run_training(alpha, gamma, eps_decay, step_penalty)
+    perf = run_training(alpha, gamma, eps_decay, step_penalty,
+                        trial=trial, seed=trial.number)
     return perf
 
 
+# ─── Storage, pruner & workers ───────────────────────────────────────────────
+
+def make_storage(spec):
+    """RDB URLs (sqlite:///…) pass straight through; anything else is a journal file."""
+    if "://" in spec:
+        return spec
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:   # optuna < 4
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(spec))
+
+
+def make_pruner(name):
+    if name == "median":
+        # Let a few trials finish, and every trial run a couple of windows, first
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=2 * WINDOW)
+    if name == "asha":
+        return optuna.pruners.SuccessiveHalvingPruner(min_resource=2 * WINDOW)
+    return optuna.pruners.NopPruner()
+
+
+def run_worker(study_name, storage, pruner, n_trials):
+    """One search process: pull trials from the shared study until n_trials are done."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(study_name=study_name, storage=make_storage(storage),
+                              pruner=make_pruner(pruner))
+    stop = optuna.study.MaxTrialsCallback(
+        n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))
+    study.optimize(objective, n_trials=n_trials, callbacks=[stop])
+
+
 # ─── Run the study ─────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=N_TRIALS)
+    parser = argparse.ArgumentParser(description="Optuna search over the tabular Q-learning knobs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--trials",  type=int, default=N_TRIALS)
+    parser.add_argument("--pruner",  choices=("median", "asha", "none"), default="median")
+    parser.add_argument("--storage", default=DEFAULT_STORAGE,
+                        help="journal file path or RDB URL (e.g. sqlite:///data/optuna.db)")
+    parser.add_argument("--study",   default=DEFAULT_STUDY)
+    args = parser.parse_args()
+
+    os.makedirs("data", exist_ok=True)
+    study = optuna.create_study(study_name=args.study, storage=make_storage(args.storage),
+                                direction="maximize", pruner=make_pruner(args.pruner),
+                                load_if_exists=True)
+
+    if args.workers > 1:
+        workers = [mp.Process(target=run_worker,
+                              args=(args.study, args.storage, args.pruner, args.trials))
+                   for _ in range(args.workers)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    else:
+        run_worker(args.study, args.storage, args.pruner, args.trials)
+
+    study = optuna.load_study(study_name=args.study, storage=make_storage(args.storage))
+    states = [t.state for t in study.trials]
+    print(f"\n{states.count(TrialState.COMPLETE)} complete, "
+          f"{states.count(TrialState.PRUNED)} pruned")
 
     print("\n🏆 Best hyperparameters:")
     for k, v in study.best_params.items():
         print(f"  {k:12s} = {v:.4f}")
     print(f"Best avg return (last {WINDOW} eps): {study.best_value:.2f}")
 
-    # Save full trial data
+    # Save full trial data (the storage file keeps the whole study as well)
     df = study.trials_dataframe()
     df.to_csv("data/optuna_trials.csv", index=False)
-    with open("data/optuna_study.pkl", "wb") as f:
-        pickle.dump(study, f)
@@ -1,11 +1,22 @@
+# train.py
+#
+#   python -m scripts.train [--workers N]
+#
+# --workers N > 1 plays the episodes in N actor processes (ai/actor_pool.py)
+# while this process applies the Q updates.
+
+import argparse
 import pickle
 from maps.level1 import game_map
 from ai.path_manager import get_initial_path
 from game.score_tracker import reset_score, get_score
-from ai.rl_utils import make_state, choose_action, update_q
+from ai.rl_utils import make_state, action_index
+from ai.q_table import DenseQTable
 from ai.env import step_environment
-from ai.lookup_table import load_lookup_table
+from ai.lookup_table import lookup_cache
 from ai.ghosts import reset_ghosts
+from ai.actor_pool import train_parallel
+from ai import profiling
 
 # Hyperparameters
 NUM_EPISODES = 5000
@@ -16,115 +27,142 @@ EPSILON      = 1.0      # initial exploration
 EPS_DECAY    = 0.9995    # decay per episode
 MIN_EPSILON  = 0.1
 
-episode_returns = []
-
-# Q and lookup distance table
-Q = {}
-lookup_table = load_lookup_table()
-
-# tracking best and worst games
-best_score  = float("-inf")
-worst_score = float("inf")
-best_traj   = None
-worst_traj  = None
-
-for ep in range(NUM_EPISODES):
-    # 1) Reset everything
-    reset_score()
-    reset_ghosts()
-    path, pacman_pos, ghost_positions, food_positions, super_fruit_pos, graph = \
-        get_initial_path(game_map)
-    ghost_hunter = False
-    hunter_timer = 0
-    step_count = 0
-    prev_score = 0
-
-    state = make_state(
-        pacman_pos,
-        ghost_positions,
-        food_positions,
-        super_fruit_pos,
-        ghost_hunter,
-        lookup_table
-    )
-
-    # Trajectory for this episode
-    current_traj = []
-
-    # 2) Inner loop
-    done = False
-    while step_count < MAX_STEPS and not done:
-        # 2a) Choose & execute action
-        action = choose_action(pacman_pos, state, graph, Q, EPSILON)
-
-
-        (pacman_pos,
-        ghost_positions,
-        food_positions,
-        super_fruit_pos,
-        ghost_hunter,
-        hunter_timer,
-        done) = step_environment(
-            graph,
-            action,
-            ghost_positions,
-            food_positions,
-            super_fruit_pos,
-            ghost_hunter,
-            hunter_timer
-        )
-
-        # Record a snapshot
-        current_traj.append({
-            "pacman_pos":   pacman_pos,
-            "ghosts":       ghost_positions.copy(),
-            "food":         food_positions.copy(),
-            "fruit":        super_fruit_pos,
-            "ghost_hunter": ghost_hunter
-        })
-
-        # 2b) Observe reward
-        curr_score = get_score()
-        reward = curr_score - prev_score
-        prev_score = curr_score
-
-        # 2c) New state & Q‑update
-        next_state = make_state(
-            pacman_pos, ghost_positions, food_positions,
-            super_fruit_pos, ghost_hunter, lookup_table
-        )
-        update_q(Q, state, action, reward, next_state, ALPHA, GAMMA)
-        state = next_state
 
-        step_count += 1
+def train_serial():
+    episode_returns = []
 
-    # End of episode: compare scores
-    total = get_score()
-    if total > best_score:
-        best_score = total
-        best_traj  = current_traj.copy()
-    if total < worst_score:
-        worst_score = total
-        worst_traj  = current_traj.copy()
+    # Q and lookup distance table
+    Q = DenseQTable()
+    lookup_table = lookup_cache.get(game_map)
 
-    # 3) End of episode
-    episode_returns.append((total, done, step_count))
-    print(f"Episode {ep:3d} | Score {int(total):4d} | Steps {step_count} | ε={EPSILON:.3f}")
+    # tracking best and worst games
+    best_score  = float("-inf")
+    worst_score = float("inf")
+    best_traj   = None
+    worst_traj  = None
 
-    # Decay ε
-    EPSILON = max(MIN_EPSILON, EPSILON * EPS_DECAY)
+    epsilon = EPSILON
 
-# 4) Save Q‑table for demo.py
-with open("data/worst_traj.pkl", "wb") as f: 
-    pickle.dump(worst_traj, f)
+    for ep in range(NUM_EPISODES):
+        # 1) Reset everything
+        reset_score()
+        reset_ghosts()
+        path, pacman_pos, ghost_positions, food_positions, super_fruit_pos, graph = \
+            get_initial_path(game_map)
+        ghost_hunter = False
+        hunter_timer = 0
+        step_count = 0
+        prev_score = 0
 
-with open("data/best_traj.pkl", "wb") as f: 
-    pickle.dump(best_traj, f)
+        state = make_state(
+            pacman_pos,
+            ghost_positions,
+            food_positions,
+            super_fruit_pos,
+            ghost_hunter,
+            lookup_table
+        )
 
-with open("data/q_table.pkl","wb") as f:
-    pickle.dump(Q, f)
+        # Trajectory for this episode
+        current_traj = []
 
-with open("data/returns.pkl", "wb") as f:
-    pickle.dump([r[0] for r in episode_returns], f)    
+        # 2) Inner loop
+        done = False
+        while step_count < MAX_STEPS and not done:
+            profiling.tick()
+            # 2a) Choose & execute action
+            action = Q.choose_action(pacman_pos, state, graph, epsilon)
+            move   = action_index(pacman_pos, action)
 
 
+            (pacman_pos,
+            ghost_positions,
+            food_positions,
+            super_fruit_pos,
+            ghost_hunter,
+            hunter_timer,
+            done,
+            _) = step_environment(
+                graph,
+                action,
+                ghost_positions,
+                food_positions,
+                super_fruit_pos,
+                ghost_hunter,
+                hunter_timer
+            )
+
+            # Record a snapshot
+            current_traj.append({
+                "pacman_pos":   pacman_pos,
+                "ghosts":       ghost_positions.copy(),
+                "food":         food_positions.copy(),
+                "fruit":        super_fruit_pos,
+                "ghost_hunter": ghost_hunter
+            })
+
+            # 2b) Observe reward
+            curr_score = get_score()
+            reward = curr_score - prev_score
+            prev_score = curr_score
+
+            # 2c) New state & Q‑update
+            next_state = make_state(
+                pacman_pos, ghost_positions, food_positions,
+                super_fruit_pos, ghost_hunter, lookup_table
+            )
+            Q.update(state, move, reward, next_state, ALPHA, GAMMA)
+            state = next_state
+
+            step_count += 1
+
+        # End of episode: compare scores
+        total = get_score()
+        if total > best_score:
+            best_score = total
+            best_traj  = current_traj.copy()
+        if total < worst_score:
+            worst_score = total
+            worst_traj  = current_traj.copy()
+
+        # 3) End of episode
+        episode_returns.append((total, done, step_count))
+        print(f"Episode {ep:3d} | Score {int(total):4d} | Steps {step_count} | ε={epsilon:.3f}")
+        profiling.end_episode(ep)  # per-episode trace when PACMAN_PROFILE=1
+
+        # Decay ε
+        epsilon = max(MIN_EPSILON, epsilon * EPS_DECAY)
+
+    profiling.print_report()
+    return Q, episode_returns, best_traj, worst_traj
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabular Q-learning on level 1")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="actor processes (1 = original single-process loop)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        Q, episode_returns, best_traj, worst_traj = train_parallel(
+            game_map, NUM_EPISODES, ALPHA, GAMMA, EPS_DECAY,
+            min_eps=MIN_EPSILON, eps_start=EPSILON, max_steps=MAX_STEPS,
+            n_workers=args.workers, record=True)
+    else:
+        Q, episode_returns, best_traj, worst_traj = train_serial()
+
+    # 4) Save Q‑table for demo.py
+    with open("data/worst_traj.pkl", "wb") as f: 
+        pickle.dump(worst_traj, f)
+
+    with open("data/best_traj.pkl", "wb") as f: 
+        pickle.dump(best_traj, f)
+
+    Q.save("data/q_table.npy")
+
+    with open("data/returns.pkl", "wb") as f:
+        pickle.dump([r[0] for r in episode_returns], f)    
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# tests/test_game_logic.py
+
+import game.game_logic as logic
+from ai.path_manager import get_initial_path, risk_aware_bfs
+from maps.level1     import game_map
+
+
+def test_risk_aware_bfs_starts_on_pacman():
+    _, pacman_pos, ghosts, food, fruit, graph = get_initial_path(game_map)
+    path = risk_aware_bfs(graph, pacman_pos, fruit, ghosts, food)
+    assert path[0] == pacman_pos and path[-1] == fruit
+    assert all(b in graph[a] for a, b in zip(path, path[1:]))
+    assert risk_aware_bfs(graph, fruit, fruit, ghosts, food) == [fruit]
+
+
+def test_update_game_moves_one_tile_along_the_fruit_path():
+    logic.reset_game(game_map)
+    _, pacman_pos, ghosts, food, fruit, graph = get_initial_path(game_map)
+    logic.current_action, logic.commitment_counter = "super_fruit", 1
+    expected = risk_aware_bfs(graph, pacman_pos, fruit, ghosts, food)[1]
+    new_pos, *_ = logic.update_game(graph, pacman_pos, ghosts, food, fruit)
+    assert new_pos == expected and new_pos in graph[pacman_pos]
+
+
+def test_update_game_stays_put_on_a_one_tile_path():
+    logic.reset_game(game_map)
+    _, _, ghosts, food, fruit, graph = get_initial_path(game_map)
+    logic.current_action, logic.commitment_counter = "super_fruit", 1
+    new_pos, *_ = logic.update_game(graph, fruit, ghosts, food, fruit)
+    assert new_pos == fruit
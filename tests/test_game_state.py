@@ -0,0 +1,29 @@
+# tests/test_game_state.py
+
+import random
+
+from ai.env        import PacmanEnv
+from ai.game_state import GameModel, unpack_ghost
+from ai.vec_env    import VecPacmanEnv
+from maps.level1   import game_map
+
+
+def test_default_model_matches_default_envs():
+    model = GameModel(game_map)
+    vec   = VecPacmanEnv(game_map, 2, seed=0)
+    assert model.kind == vec.ghosts.kind.tolist()
+    assert len(model.snapshot(vec, 1).ghosts) == len(PacmanEnv(game_map).ghosts)
+
+
+def test_snapshot_of_scalar_game():
+    random.seed(0)
+    model, env = GameModel(game_map), PacmanEnv(game_map)
+    for _ in range(5):
+        env.step(sorted(env.graph[env.pacman_pos])[0])
+        state = model.snapshot(env)
+        assert state.steps == env.steps
+        assert state.score == env.score
+        assert model.nodes[state.pacman] == env.pacman_pos
+        assert [model.nodes[unpack_ghost(g)[0]] for g in state.ghosts] == \
+               [g.position for g in env.ghosts]
+    assert state.steps == 5
@@ -0,0 +1,23 @@
+# tests/test_lookup_table.py
+
+import ai.lookup_table as lt
+from maps.level1 import game_map
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path, monkeypatch):
+    def disk_full(lookup, filename):
+        with open(filename, 'wb') as f:
+            f.write(b'partial')
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(lt, "save_lookup_table", disk_full)
+    table = lt.LookupCache(str(tmp_path)).get(game_map)
+    assert table.distance(table.nodes[0], table.nodes[0]) == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_built_table_is_saved(tmp_path):
+    cache = lt.LookupCache(str(tmp_path))
+    table = cache.get(game_map)
+    assert [str(p) for p in tmp_path.iterdir()] == [cache.path_for(lt.map_hash(game_map))]
+    assert lt.LookupCache(str(tmp_path)).get(game_map).nodes == table.nodes
@@ -0,0 +1,34 @@
+# tests/test_mcts.py
+
+import ai.ghosts as gh_module
+from ai.game_state import GameModel, step
+from ai.mcts       import MCTSAgent
+from maps.level1   import game_map
+
+
+def scalar_lineup_model():
+    """GameModel with the scalar game's ghosts: a lone Blinky, not the 'G' tiles."""
+    return GameModel(game_map, [g.name for g in gh_module.ghosts],
+                     starts=[g.start_pos for g in gh_module.ghosts])
+
+
+def test_parallel_search_keeps_custom_starts():
+    model = scalar_lineup_model()
+    state = model.initial_state(seed=0)
+    with MCTSAgent(model, iterations=20, workers=2, seed=0) as agent:
+        for _ in range(3):
+            action = agent.choose_action(state)
+            assert action in model.legal_actions(state)
+            state, _, done = step(state, action)
+            if done:
+                break
+        assert agent.last_iterations == 40   # both workers searched
+
+
+def test_close_tolerates_dead_workers():
+    agent = MCTSAgent(scalar_lineup_model(), iterations=5, workers=2, seed=0)
+    for _, proc in agent.workers:
+        proc.kill()
+        proc.join()
+    agent.close()
+    assert agent.workers == []
@@ -0,0 +1,52 @@
+# tests/test_q_table.py
+
+import random
+
+import numpy as np
+
+from ai.q_table  import DenseQTable
+from ai.rl_utils import update_q
+
+
+def negative_trajectory(n=2000, n_states=12, seed=0):
+    """(state, action, reward, next_state) over a few states, mostly step penalties."""
+    rng = random.Random(seed)
+    s = rng.randrange(n_states)
+    out = []
+    for _ in range(n):
+        a = rng.randrange(4)
+        r = rng.choice([-1.0, -1.0, -1.0, -5.0, 10.0])
+        n_ = rng.randrange(n_states)
+        out.append((s, a, r, n_))
+        s = n_
+    return out
+
+
+def test_update_matches_dict_q_learning():
+    Q_dict, Q = {}, DenseQTable()
+    for s, a, r, n in negative_trajectory():
+        update_q(Q_dict, s, a, r, n, 0.1, 0.9)
+        Q.update(s, a, r, n, 0.1, 0.9)
+
+    for s, row in Q_dict.items():
+        for a, v in row.items():
+            assert Q.seen[s, a]
+            assert np.isclose(Q.values[s, a], v, atol=1e-4)
+    assert Q.seen.sum() == sum(len(row) for row in Q_dict.values())
+
+
+def test_update_batch_ignores_unseen_moves():
+    Q = DenseQTable()
+    Q.update(5, 0, -3.0, 6, 1.0, 0.9)                  # Q[5][0] = -3, only seen move of 5
+    Q.update_batch([1, 2], [0, 1], [-1.0, -1.0], [5, 7], 1.0, 0.9)
+    assert np.isclose(Q.values[1, 0], -1.0 + 0.9 * -3.0)  # not pulled up by 5's unseen zeros
+    assert np.isclose(Q.values[2, 1], -1.0)               # nothing seen in 7: bootstrap 0.0
+
+
+def test_save_load_keeps_seen(tmp_path):
+    Q = DenseQTable()
+    Q.update(3, 2, -1.0, 4, 0.5, 0.9)
+    Q.save(tmp_path / "q.npy")
+    loaded = DenseQTable.load(tmp_path / "q.npy")
+    assert (loaded.seen == Q.seen).all()
+    assert (loaded.values == Q.values).all()
@@ -0,0 +1,19 @@
+# tests/test_search.py
+
+import pytest
+
+from ai.search       import a_star, smarter_a_star, build_graph
+from ai.lookup_table import compute_distance_lookup
+from maps.level1     import game_map as level1
+from maps.level2     import game_map as level2
+from scripts.bench_search import baseline_a_star, baseline_smarter_a_star, make_queries
+
+
+@pytest.mark.parametrize("game_map", [level1, level2], ids=["level1", "level2"])
+def test_paths_match_the_baseline_search(game_map):
+    graph, _, _ = build_graph(game_map)
+    table = compute_distance_lookup(graph)
+    for start, goal, ghosts in make_queries(graph, 200, seed=1):
+        assert a_star(graph, start, goal) == baseline_a_star(graph, start, goal, table)
+        assert smarter_a_star(graph, start, {goal}, ghosts, game_map) == \
+               baseline_smarter_a_star(graph, start, {goal}, ghosts, game_map, table)
@@ -2,14 +2,23 @@
 
 import os
 import random
+import argparse
 import numpy as np
 import torch
 
 from ai.dqn.agent import DQNAgent
+from ai.dqn.model import ARCHITECTURES
 from ai.dqn.utils import get_device
 from ai.dqn.replay_buffer import ReplayBuffer
 from ai.env import step_environment
 from ai.path_manager import get_initial_path
+from ai.danger import DangerField
+from ai.lookup_table import lookup_cache
+from ai.state_encoder import StateEncoder, THREAT
+from ai.vec_env import VecPacmanEnv
+from ai.dqn.inference import BatchedPolicy, pacman_threat
+from ai.dqn.apex import train_apex
+from ai import profiling
 from game.score_tracker import reset_score, get_score
 from maps.level1 import game_map  # hard-coded for now
 
@@ -18,6 +27,8 @@ SEED              = 42
 NUM_EPISODES      = 500
 MAX_STEPS         = 1000
 LEVEL_CLEAR_BONUS = 2000     # big reward on clearing all pellets
+N_STEP            = 3        # n-step returns
+DOUBLE_DQN        = True     # online net picks the bootstrap action, target net scores it
 # (other hyperparams live inside DQNAgent defaults)
 # ─────────────────────────────────────────────────────────────────────
 
@@ -39,14 +50,17 @@ ACTIONS = [(-1,  0),  # up
            ( 0, -1),  # left
            ( 0,  1)]  # right
 
-def build_state_tensor(pacman_pos, ghost_positions, food_positions, super_fruit_pos):
+@profiling.timed("encode.build_state_tensor")
+def build_state_tensor(pacman_pos, ghost_positions, food_positions, super_fruit_pos, danger=None):
     """
-    Build a (6×15×15) tensor of floats in [0,1]:
+    Build a (6×15×15) tensor of floats in [0,1] from scratch.
+    (Training uses StateEncoder, which keeps these same planes up to date
+    incrementally; this stays as the plain reference version.)
       0: walls
       1: pellets
       2: super-fruit
       3: ghosts
-      4: threat map (Manhattan ≤ 3)
+      4: threat map (maze distance ≤ 3, from this tick's DangerField)
       5: Pac-Man
     """
     C, H, W = 6, len(game_map), len(game_map[0])
@@ -70,12 +84,11 @@ def build_state_tensor(pacman_pos, ghost_positions, food_positions, super_fruit_
     for (r, c) in ghost_positions:
         state[3, r, c] = 1.0
 
-    # 4) threat map: Manhattan distance ≤ 3
-    for (gr, gc) in ghost_positions:
-        for r in range(H):
-            for c in range(W):
-                if abs(gr - r) + abs(gc - c) <= 3:
-                    state[4, r, c] = 1.0
+    # 4) threat map: tiles a ghost can reach in ≤ 3 steps
+    if danger is None:
+        danger = DangerField(lookup_cache.get(game_map), ghost_positions, game_map)
+    threat = danger.threat_mask(3)
+    state[4, danger.maze.rows[threat], danger.maze.cols[threat]] = 1.0
 
     # 5) Pac-Man
     state[5, pacman_pos[0], pacman_pos[1]] = 1.0
@@ -83,8 +96,10 @@ def build_state_tensor(pacman_pos, ghost_positions, food_positions, super_fruit_
     # To torch tensor
     return torch.from_numpy(state).unsqueeze(0).to(device)  # (1,6,15,15)
 
-def main():
-    agent = DQNAgent(seed=SEED)
+def main(arch="classic"):
+    agent = DQNAgent(seed=SEED, arch=arch, n_step=N_STEP, double=DOUBLE_DQN)
+    encoder = StateEncoder(game_map, device)
+    valid_masks = {}   # tile -> legal-move mask
     all_returns = []
 
     for ep in range(1, NUM_EPISODES + 1):
@@ -93,24 +108,29 @@ def main():
         path, pacman_pos, ghosts, food, fruit, graph = get_initial_path(game_map)
         ghost_hunter, hunter_timer = False, 0
 
-        state = build_state_tensor(pacman_pos, ghosts, food, fruit)
+        state = encoder.reset(pacman_pos, ghosts, food, fruit)
         total_reward = 0
 
         for step in range(1, MAX_STEPS + 1):
-            # 1) Compute legal‐move mask
-            neighbours = set(graph[pacman_pos])
-            valid_mask = torch.tensor(
-                [ (pacman_pos[0]+dr, pacman_pos[1]+dc) in neighbours
-                  for dr,dc in ACTIONS ],
-                dtype=torch.bool, device=device
-            )
+            profiling.tick()
+            # 1) Legal-move mask (built once per tile, the maze never changes)
+            valid_mask = valid_masks.get(pacman_pos)
+            if valid_mask is None:
+                neighbours = set(graph[pacman_pos])
+                valid_mask = valid_masks[pacman_pos] = torch.tensor(
+                    [ (pacman_pos[0]+dr, pacman_pos[1]+dc) in neighbours
+                      for dr,dc in ACTIONS ],
+                    dtype=torch.bool, device=device
+                )
 
             # 2) Forward pass
-            with torch.no_grad():
+            with torch.inference_mode():
                 q_col, q_esc = agent.online(state)
 
-            # 3) Select action
-            threat = (valid_mask.sum() > 0)  # crude: if any threat channel active
+            # 3) Select action (threatened = Pac-Man's tile is on the threat plane,
+            #    read from the encoder's host-side buffer so it costs no device sync)
+            threat = encoder.state[THREAT, pacman_pos[0], pacman_pos[1]] > 0
+            head = int(threat and not ghost_hunter)   # 1 = escape head acts
             action_idx = agent.select_action(
                 q_col, q_esc, valid_mask, ghost_hunter, threat
             )
@@ -119,7 +139,7 @@ def main():
 
             # 4) Step environment
             (pacman_pos, ghosts, food, fruit,
-             ghost_hunter, hunter_timer, done) = step_environment(
+             ghost_hunter, hunter_timer, done, _) = step_environment(
                  graph, new_pos, ghosts, food, fruit, ghost_hunter, hunter_timer
              )
 
@@ -132,22 +152,27 @@ def main():
             if done and not food:
                 reward += LEVEL_CLEAR_BONUS
 
-            # 6) Build next state
-            next_state = build_state_tensor(pacman_pos, ghosts, food, fruit)
+            # 6) Build next state (and which head would act in it)
+            next_state = encoder.encode(pacman_pos, ghosts, food, fruit)
+            next_threat = encoder.state[THREAT, pacman_pos[0], pacman_pos[1]] > 0
+            next_head = int(next_threat and not ghost_hunter)
 
             # 7) Store & optimise
-            agent.buffer.push(state, action_idx, reward, next_state, done)
+            agent.buffer.push(state, action_idx, reward, next_state, done, head, next_head)
             loss = agent.optimise_model()
 
             state = next_state
 
             if done:
                 break
+        else:
+            agent.buffer.flush()   # out of steps: store the last n-step returns unfinished
 
         all_returns.append(total_reward)
         agent.epsilon = max(0.1, agent.epsilon * 0.995)  # decay
 
         print(f"Episode {ep:3d} | Return {total_reward:5.0f} | Steps {step} | ε {agent.epsilon:.3f}")
+        profiling.end_episode(ep)  # per-episode trace when PACMAN_PROFILE=1
 
         # Checkpoint every 10 episodes
         if ep % 10 == 0:
@@ -156,6 +181,95 @@ def main():
 
     # Final save
     torch.save(agent.online.state_dict(), os.path.join(CKPT_DIR, "dqn_final.pt"))
+    profiling.print_report()
+
+def main_vectorised(n_envs, arch="classic"):
+    """
+    Same training, but experience comes from n_envs games stepped together
+    (VecPacmanEnv): one encode_batch, one forward pass and one device sync
+    pick the moves for all of them. Every finished game counts as an
+    episode, and we still do one optimise step per transition stored.
+    """
+    agent = DQNAgent(seed=SEED, arch=arch, n_step=N_STEP, double=DOUBLE_DQN)
+    encoder = StateEncoder(game_map, device)
+    policy = BatchedPolicy(agent, encoder)
+    env = VecPacmanEnv(game_map, n_envs, seed=SEED)
+
+    returns = np.zeros(n_envs, dtype=np.float32)
+    obs = encoder.encode_batch(env).copy()
+    slots = np.full(n_envs, -1, dtype=np.int64)   # replay frame holding each game's obs
+    ep = 0
+
+    while ep < NUM_EPISODES:
+        profiling.tick()
+        heads = pacman_threat(obs, encoder.cell[env.pacman]) & ~env.hunter
+        actions = policy.act(env, obs)
+        rewards, dones = env.step(actions)
+        rewards[dones & ~env.pellets.any(axis=1)] += LEVEL_CLEAR_BONUS
+        returns += rewards
+        next_obs = encoder.encode_batch(env)
+        next_heads = pacman_threat(next_obs, encoder.cell[env.pacman]) & ~env.hunter
+
+        slots = agent.buffer.push_batch(obs, actions, rewards, next_obs, dones, slots,
+                                        heads=heads, next_heads=next_heads)
+        for _ in range(n_envs):
+            agent.optimise_model()
+
+        finished = np.flatnonzero(dones | (env.steps >= MAX_STEPS))
+        agent.buffer.flush(finished[~dones[finished]])   # out of steps, not over
+        for i in finished:
+            ep += 1
+            agent.epsilon = max(0.1, agent.epsilon * 0.995)  # decay
+            print(f"Episode {ep:3d} | Return {returns[i]:5.0f} | Steps {env.steps[i]} | ε {agent.epsilon:.3f}")
+            profiling.end_episode(ep)
+
+            if ep % 10 == 0:
+                fname = os.path.join(CKPT_DIR, f"dqn_ep{ep:03d}_ret{int(returns[i])}.pt")
+                torch.save(agent.online.state_dict(), fname)
+            if ep == NUM_EPISODES:
+                break
+        if len(finished):
+            env.reset(finished)
+            returns[finished] = 0.0
+            slots[finished]   = -1
+            next_obs = encoder.encode_batch(env)
+        obs[:] = next_obs
+
+    torch.save(agent.online.state_dict(), os.path.join(CKPT_DIR, "dqn_final.pt"))
+    profiling.print_report()
+
+def main_apex(n_actors, envs_per_actor, publish_every, arch="classic"):
+    """
+    Ape-X style: n_actors processes play envs_per_actor games each and fill
+    a shared replay buffer while this process trains from it non-stop
+    (see ai/dqn/apex.py). Each actor explores with its own fixed ε.
+    """
+    agent = DQNAgent(seed=SEED, arch=arch, n_step=N_STEP, double=DOUBLE_DQN)
+    stats = train_apex(agent, game_map, n_actors, envs_per_actor, publish_every,
+                       num_episodes=NUM_EPISODES, max_steps=MAX_STEPS,
+                       clear_bonus=LEVEL_CLEAR_BONUS, ckpt_dir=CKPT_DIR, seed=SEED)
+    print(f"{stats['updates']} updates ({stats['updates_per_sec']}/s), "
+          f"{stats['transitions']} transitions ({stats['transitions_per_sec']}/s) "
+          f"in {stats['seconds']}s")
+
+    torch.save(agent.online.state_dict(), os.path.join(CKPT_DIR, "dqn_final.pt"))
+    profiling.print_report()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the two-headed DQN on level1")
+    parser.add_argument("--envs", type=int, default=1,
+                        help="games played at once (per actor with --actors); "
+                             "> 1 batches inference over a VecPacmanEnv")
+    parser.add_argument("--actors", type=int, default=0,
+                        help="actor processes feeding a separate learner (Ape-X style)")
+    parser.add_argument("--publish-every", type=int, default=100,
+                        help="learner updates between weight copies to the actors")
+    parser.add_argument("--arch", choices=sorted(ARCHITECTURES), default="classic",
+                        help="network, see ai/dqn/model.py (scripts/bench_models.py compares them)")
+    args = parser.parse_args()
+    if args.actors > 0:
+        main_apex(args.actors, args.envs, args.publish_every, args.arch)
+    elif args.envs > 1:
+        main_vectorised(args.envs, args.arch)
+    else:
+        main(args.arch)